@@ -122,9 +122,9 @@ async function renderOverview() {
 
     // Fetch some summary data (we'll fetch orders and products count for now)
     const [ordersRes, productsRes, dlqRes] = await Promise.all([
-        fetch(`${API_BASE_URL}/orders?limit=1`),
-        fetch(`${API_BASE_URL}/products?limit=1`),
-        fetch(`${API_BASE_URL}/dlq?limit=1`)
+        fetch(`${API_BASE_URL}/orders?limit=1&total=estimate`),
+        fetch(`${API_BASE_URL}/products?limit=1&total=cached`),
+        fetch(`${API_BASE_URL}/dlq?limit=1&total=cached`)
     ]);
     
     const ordersData = await ordersRes.json();
@@ -440,11 +440,13 @@ async function renderStoreLoad() {
     pageTitle.innerText = 'Store Load Monitoring';
     pageSubtitle.innerText = 'Real-time performance and load metrics by store hub.';
     
-    // Fetch metrics for multiple stores
+    // Fetch metrics for multiple stores in one request
     const stores = [1, 2, 3];
-    const metrics = await Promise.all(stores.map(id => 
-        fetch(`${API_BASE_URL}/orders/store/${id}/load`).then(r => r.json()).catch(() => null)
-    ));
+    const query = stores.map(id => `store_ids=${id}`).join('&');
+    const snapshot = await fetch(`${API_BASE_URL}/orders/stores/load?${query}`)
+        .then(r => r.json()).catch(() => []);
+    const byStore = Object.fromEntries(snapshot.map(m => [m.store_id, m]));
+    const metrics = stores.map(id => byStore[id] || null);
 
     contentArea.innerHTML = `
         <div class="load-grid">
@@ -1,9 +1,13 @@
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.schemas.order import OrderResponse
 from app.schemas.base import BaseSchema
+from app.core.repository import CountStrategy
+from app.services.dlq_service import dlq_service
 from app.services.order_service import order_service
 
 router = APIRouter()
@@ -16,12 +20,43 @@ class FailedOrderResponse(BaseSchema):
     error_message: str
     retry_count: int
     status: str
+    error_class: str
+    next_retry_at: Optional[datetime] = None
     created_at: str
 
 
 class FailedOrderListResponse(BaseSchema):
     items: List[FailedOrderResponse]
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
+    next_cursor: Optional[str] = None
+
+
+class DLQReplayRequest(BaseSchema):
+    store_id: Optional[int] = None
+    error_class: Optional[Literal["stock_out", "transient", "invalid", "unknown"]] = (
+        None
+    )
+    min_age_seconds: Optional[float] = Field(None, ge=0)
+    max_age_seconds: Optional[float] = Field(None, ge=0)
+    limit: int = Field(200, ge=1, le=1000)
+
+
+class DLQReplayResult(BaseSchema):
+    failed_order_id: int
+    status: str
+    retry_count: int
+    order_id: Optional[int] = None
+    error_class: Optional[str] = None
+    next_retry_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class DLQReplayResponse(BaseSchema):
+    results: List[DLQReplayResult]
+    attempted: int
+    resolved: int
+    failed: int
+    abandoned: int
 
 
 @router.get("/", response_model=FailedOrderListResponse)
@@ -29,11 +64,20 @@ async def list_dlq(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page; overrides skip"
+    ),
+    total: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute total: exact, cached, estimate or none",
+    ),
 ):
     """
-    List failed orders in the Dead Letter Queue.
+    List failed orders in the Dead Letter Queue, newest first.
     """
-    items, total = await order_service.list_failed_orders(db, skip=skip, limit=limit)
+    items, total_count, next_cursor = await order_service.list_failed_orders(
+        db, skip=skip, limit=limit, cursor=cursor, count_strategy=total
+    )
     # Convert created_at to string for simplicity in this schema
     resp_items = []
     for item in items:
@@ -45,10 +89,38 @@ async def list_dlq(
                 "error_message": item.error_message,
                 "retry_count": item.retry_count,
                 "status": item.status,
+                "error_class": item.error_class,
+                "next_retry_at": item.next_retry_at,
                 "created_at": item.created_at.isoformat(),
             }
         )
-    return {"items": resp_items, "total": total}
+    return {"items": resp_items, "total": total_count, "next_cursor": next_cursor}
+
+
+@router.post("/replay", response_model=DLQReplayResponse)
+async def replay_dlq(
+    filters: DLQReplayRequest, db: AsyncSession = Depends(deps.get_db)
+):
+    """
+    Replay unresolved DLQ entries in bulk, optionally filtered by store,
+    error class and age (seconds since the failure was recorded). Rows are
+    updated in place; failures are rescheduled with exponential backoff.
+    """
+    results = await dlq_service.replay(
+        db,
+        store_id=filters.store_id,
+        error_class=filters.error_class,
+        min_age_seconds=filters.min_age_seconds,
+        max_age_seconds=filters.max_age_seconds,
+        limit=filters.limit,
+    )
+    return {
+        "results": results,
+        "attempted": len(results),
+        "resolved": sum(r["status"] == "resolved" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "abandoned": sum(r["status"] == "abandoned" for r in results),
+    }
 
 
 @router.post("/{failed_order_id}/replay", response_model=OrderResponse)
@@ -58,4 +130,4 @@ async def replay_failed_order(
     """
     Attempt to replay a failed order.
     """
-    return await order_service.replay_failed_order(db, failed_order_id=failed_order_id)
+    return await dlq_service.replay_failed_order(db, failed_order_id=failed_order_id)
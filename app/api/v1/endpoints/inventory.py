@@ -1,15 +1,27 @@
-from typing import List, Optional
+import json
+from datetime import datetime
+from typing import List, Optional, Union
 from fastapi import APIRouter, Depends, Query, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.schemas.inventory import (
     InventoryResponse,
     InventoryListResponse,
     AggregateStockResponse,
+    AggregateStockBatchRequest,
+    AggregateStockBatchResponse,
     InventorySnapshotListResponse,
+    InventorySnapshotBucketListResponse,
+    InventorySnapshotSeriesResponse,
+    InventoryBucketConfig,
+    InventorySyncRequest,
+    InventorySyncResponse,
 )
+from app.models.inventory import SnapshotResolution
 from app.services.inventory_service import inventory_service
 from app.core.logging import add_cache_headers
+from app.core.repository import CountStrategy
 
 router = APIRouter()
 
@@ -20,14 +32,33 @@ async def list_store_inventory(
     db: AsyncSession = Depends(deps.get_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    total: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute total: exact, cached, estimate or none",
+    ),
 ):
     """
     List all inventory items for a specific store.
     """
-    items, total = await inventory_service.get_inventory_by_store(
-        db, store_id=store_id, skip=skip, limit=limit
+    items, total_count = await inventory_service.get_inventory_by_store(
+        db, store_id=store_id, skip=skip, limit=limit, count_strategy=total
+    )
+    return {"items": items, "total": total_count, "skip": skip, "limit": limit}
+
+
+@router.post("/sync", response_model=InventorySyncResponse)
+async def sync_inventory(
+    sync_in: InventorySyncRequest,
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Bulk warehouse stock update for one store. Lines that fail (unknown
+    product, duplicate line, quantity below reserved stock) are reported and
+    skipped; the rest are applied together.
+    """
+    return await inventory_service.sync_inventory(
+        db, store_id=sync_in.store_id, items=sync_in.items
     )
-    return {"items": items, "total": total, "skip": skip, "limit": limit}
 
 
 @router.get("/check", response_model=InventoryResponse)
@@ -63,18 +94,57 @@ async def detect_low_stock(
     )
 
 
+@router.post("/aggregate", response_model=AggregateStockBatchResponse)
+async def aggregate_stock_batch(
+    body: AggregateStockBatchRequest,
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Available stock for many products at once (e.g. a catalog page), across
+    all stores or in one store. Shares its cache with the single-product
+    endpoint.
+    """
+    quantities = await inventory_service.get_available_stock_many(
+        db, product_ids=body.product_ids, store_id=body.store_id
+    )
+    return {"store_id": body.store_id, "quantities": quantities}
+
+
 @router.get("/aggregate/{product_id}", response_model=AggregateStockResponse)
 async def aggregate_product_stock(
     product_id: int,
     response: Response,
+    store_id: Optional[int] = Query(None, description="Limit to one store"),
     db: AsyncSession = Depends(deps.get_db),
 ):
     """
-    Get the total available stock for a product across all stores.
+    Get the total available stock for a product across all stores, or in
+    one store.
     """
-    total = await inventory_service.get_total_available_stock(db, product_id=product_id)
+    total = await inventory_service.get_total_available_stock(
+        db, product_id=product_id, store_id=store_id
+    )
     add_cache_headers(response, max_age=60)
-    return {"product_id": product_id, "total_available_quantity": total}
+    return {
+        "product_id": product_id,
+        "store_id": store_id,
+        "total_available_quantity": total,
+    }
+
+
+@router.put("/{inventory_id}/buckets", response_model=InventoryResponse)
+async def configure_inventory_buckets(
+    inventory_id: int,
+    config: InventoryBucketConfig,
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Split a hot inventory row into stock buckets (bucket_count > 1) or merge
+    it back (bucket_count = 1). Reported quantities are unaffected.
+    """
+    return await inventory_service.configure_buckets(
+        db, inventory_id=inventory_id, bucket_count=config.bucket_count
+    )
 
 
 @router.get("/debug/reserved", response_model=List[InventoryResponse])
@@ -87,47 +157,113 @@ async def debug_reserved_stock(
     """
     from sqlalchemy import select
     from app.models.inventory import Inventory
+    from app.repositories.inventory_repo import inventory_repo
 
-    query = select(Inventory).filter(Inventory.reserved_quantity > 0)
+    query = select(Inventory).filter(
+        (Inventory.reserved_quantity > 0) | (Inventory.bucket_count > 1)
+    )
     if store_id:
         query = query.filter(Inventory.store_id == store_id)
 
     result = await db.execute(query)
-    return list(result.scalars().all())
+    items = list(result.scalars().all())
+    await inventory_repo.load_buckets(db, items)
+    return items
 
 
-@router.get("/snapshots", response_model=InventorySnapshotListResponse)
+@router.get(
+    "/snapshots",
+    response_model=Union[
+        InventorySnapshotListResponse, InventorySnapshotBucketListResponse
+    ],
+)
 async def list_inventory_snapshots(
     db: AsyncSession = Depends(deps.get_db),
     store_id: Optional[int] = Query(None),
+    resolution: SnapshotResolution = Query(
+        SnapshotResolution.RAW,
+        description="raw, minute or hour buckets; auto picks the finest tier covering `since`",
+    ),
+    since: Optional[datetime] = Query(None, description="Oldest timestamp (inclusive)"),
+    until: Optional[datetime] = Query(None, description="Newest timestamp (exclusive)"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page; overrides skip"
+    ),
+    total: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute total: exact, cached, estimate or none",
+    ),
 ):
     """
     Retrieve historical inventory snapshots for timeline visualization.
+
+    Older history is only kept as minute / hour buckets (min, max and last
+    quantity per inventory row), so long windows should ask for a coarser
+    resolution.
     """
-    from app.schemas.inventory import (
-        InventorySnapshotListResponse,
-        InventorySnapshotResponse,
+    served, items, total_count, next_cursor = await inventory_service.get_snapshots(
+        db,
+        store_id=store_id,
+        resolution=resolution,
+        since=since,
+        until=until,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        count_strategy=total,
     )
+    # Rows already carry exactly the response columns
+    return {
+        "resolution": served.value,
+        "items": items,
+        "total": total_count,
+        "skip": skip,
+        "limit": limit,
+        "next_cursor": next_cursor,
+    }
 
-    items, total = await inventory_service.get_snapshots(
-        db, store_id=store_id, skip=skip, limit=limit
-    )
 
-    # Manual mapping to include product name from joined relationship
-    resp_items = []
-    for item in items:
-        resp_items.append(
-            InventorySnapshotResponse(
-                id=item.id,
-                inventory_id=item.inventory_id,
-                product_name=item.inventory.product.name,
-                quantity=item.quantity,
-                reserved_quantity=item.reserved_quantity,
-                timestamp=item.timestamp,
-                reason=item.reason,
-            )
+@router.get(
+    "/snapshots/series",
+    response_class=StreamingResponse,
+    responses={200: {"model": InventorySnapshotSeriesResponse}},
+)
+async def stream_inventory_snapshot_series(
+    store_id: Optional[int] = Query(None),
+    product_id: Optional[int] = Query(None),
+    inventory_id: Optional[int] = Query(None),
+    resolution: SnapshotResolution = Query(
+        SnapshotResolution.AUTO,
+        description="raw, minute or hour buckets; auto picks the finest tier covering `since`",
+    ),
+    since: Optional[datetime] = Query(None, description="Oldest timestamp (inclusive)"),
+    until: Optional[datetime] = Query(None, description="Newest timestamp (exclusive)"),
+):
+    """
+    Snapshot history as columnar series for charting: per inventory row,
+    parallel `timestamps` / `quantity` / `reserved_quantity` arrays, oldest
+    point first. The body is streamed one series at a time.
+    """
+    if resolution == SnapshotResolution.AUTO:
+        resolution = inventory_service.pick_snapshot_resolution(
+            since, datetime.utcnow()
         )
 
-    return {"items": resp_items, "total": total, "skip": skip, "limit": limit}
+    async def body():
+        yield f'{{"resolution":"{resolution.value}","series":['
+        separator = ""
+        async for series in inventory_service.stream_snapshot_series(
+            resolution=resolution,
+            store_id=store_id,
+            product_id=product_id,
+            inventory_id=inventory_id,
+            since=since,
+            until=until,
+        ):
+            yield separator + json.dumps(series, separators=(",", ":"))
+            separator = ","
+        yield "]}"
+
+    return StreamingResponse(body(), media_type="application/json")
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter
+from app.core.jobs import job_runtime
+from app.schemas.base import BaseSchema
+
+router = APIRouter()
+
+
+class JobStatsResponse(BaseSchema):
+    name: str
+    kind: Literal["periodic", "continuous"]
+    singleton: bool
+    interval_seconds: Optional[float] = None
+    state: str
+    runs: int
+    failures: int
+    restarts: int
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_rows: Optional[int] = None
+    total_rows: int
+    lag_seconds: Optional[float] = None
+    last_error: Optional[str] = None
+    next_run_at: Optional[datetime] = None
+
+
+@router.get("/", response_model=List[JobStatsResponse])
+async def list_jobs():
+    """
+    Background jobs of this process: state, last run, rows processed and lag
+    (how far behind its work the job is).
+    """
+    return job_runtime.stats()
@@ -1,15 +1,22 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.schemas.order import (
     OrderCreate,
     OrderResponse,
     OrderListResponse,
+    OrderSummaryListResponse,
+    OrderBatchResponse,
+    OrderBulkTransitionRequest,
+    OrderBulkTransitionResponse,
+    OrderTransitionRequest,
     StoreLoadMetrics,
 )
 from app.models.order import OrderStatus
 from app.services.order_service import order_service
+from app.services.order_transition_service import order_transition_service
+from app.core.repository import CountStrategy
 
 router = APIRouter()
 
@@ -22,6 +29,57 @@ async def create_order(order_in: OrderCreate, db: AsyncSession = Depends(deps.ge
     return await order_service.create_order(db, order_in=order_in)
 
 
+@router.post("/batch", response_model=OrderBatchResponse)
+async def create_orders_batch(
+    orders_in: List[OrderCreate] = Body(..., max_length=1000),
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Bulk order ingestion for B2B and partner channels. Each order gets its own
+    result: created, idempotent (key already used) or failed with a DLQ reference.
+    """
+    results = await order_service.create_orders_batch(db, orders_in=orders_in)
+    return {
+        "results": results,
+        "created": sum(r["status"] == "created" for r in results),
+        "idempotent": sum(r["status"] == "idempotent" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+    }
+
+
+@router.post("/transitions", response_model=OrderBulkTransitionResponse)
+async def transition_orders(
+    body: OrderBulkTransitionRequest, db: AsyncSession = Depends(deps.get_db)
+):
+    """
+    Move many orders to the same status in one transaction (e.g. a packer
+    confirming or packing a wave of orders). Invalid moves are reported per
+    order and do not block the others.
+    """
+    results = await order_transition_service.transition_many(
+        db, order_ids=body.order_ids, status=body.status, notes=body.notes
+    )
+    return {
+        "results": results,
+        "transitioned": sum(r["status"] == "transitioned" for r in results),
+        "rejected": sum(r["status"] == "rejected" for r in results),
+    }
+
+
+@router.get("/stores/load", response_model=List[StoreLoadMetrics])
+async def get_stores_load(
+    store_ids: Optional[List[int]] = Query(
+        None, description="Stores to include; all active stores when omitted"
+    ),
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Load metrics for many stores at once, for routing and dashboards.
+    Computed in one grouped query and shared between callers for a few seconds.
+    """
+    return await order_service.get_stores_load(db, store_ids=store_ids)
+
+
 @router.get("/store/{store_id}/load", response_model=StoreLoadMetrics)
 async def get_store_load(store_id: int, db: AsyncSession = Depends(deps.get_db)):
     """
@@ -30,22 +88,83 @@ async def get_store_load(store_id: int, db: AsyncSession = Depends(deps.get_db))
     return await order_service.get_store_load(db, store_id=store_id)
 
 
-@router.get("/", response_model=OrderListResponse)
-async def read_orders(
-    db: AsyncSession = Depends(deps.get_db),
+def order_list_params(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     user_id: Optional[int] = Query(None, description="Filter by user"),
     store_id: Optional[int] = Query(None, description="Filter by store"),
     status: Optional[OrderStatus] = Query(None, description="Filter by status"),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor of the previous page; overrides skip"
+    ),
+    total: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute total: exact, cached, estimate or none",
+    ),
+) -> dict:
+    """Filters and paging shared by the full and summary order listings."""
+    return {
+        "skip": skip,
+        "limit": limit,
+        "user_id": user_id,
+        "store_id": store_id,
+        "status": status,
+        "cursor": cursor,
+        "count_strategy": total,
+    }
+
+
+async def _order_page(db: AsyncSession, params: dict, *, summary: bool) -> dict:
+    orders, total_count, next_cursor = await order_service.get_orders(
+        db, **params, summary=summary
+    )
+    return {
+        "items": orders,
+        "total": total_count,
+        "skip": params["skip"],
+        "limit": params["limit"],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/", response_model=OrderListResponse)
+async def read_orders(
+    params: dict = Depends(order_list_params),
+    db: AsyncSession = Depends(deps.get_db),
 ):
     """
     Retrieve orders with pagination and multi-dimensional filtering.
+    Pass the returned next_cursor back as `cursor` to page deep without OFFSET.
+    Use GET /orders/summary for tables; GET /orders/{id} returns the full order.
+    """
+    return await _order_page(db, params, summary=False)
+
+
+@router.get("/summary", response_model=OrderSummaryListResponse)
+async def read_order_summaries(
+    params: dict = Depends(order_list_params),
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Same filters and paging as GET /orders/, but only the order columns and
+    an item count per order; items and timeline are not loaded.
+    """
+    return await _order_page(db, params, summary=True)
+
+
+@router.post("/{order_id}/transition", response_model=OrderResponse)
+async def transition_order(
+    order_id: int,
+    body: OrderTransitionRequest,
+    db: AsyncSession = Depends(deps.get_db),
+):
+    """
+    Move one order to a new status: confirming stops its reservation from
+    expiring, packing consumes the reserved stock, cancelling releases it.
     """
-    orders, total = await order_service.get_orders(
-        db, skip=skip, limit=limit, user_id=user_id, store_id=store_id, status=status
+    return await order_transition_service.transition(
+        db, order_id=order_id, status=body.status, notes=body.notes
     )
-    return {"items": orders, "total": total, "skip": skip, "limit": limit}
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
@@ -5,6 +5,7 @@ from app.api import deps
 from app.schemas.product import ProductResponse, ProductListResponse
 from app.services.product_service import product_service
 from app.core.logging import add_cache_headers
+from app.core.repository import CountStrategy
 
 router = APIRouter()
 
@@ -24,11 +25,15 @@ async def read_products(
     ),
     sort_by: str = Query("id", description="Field to sort by (id, name, price)"),
     sort_desc: bool = Query(False, description="Sort in descending order"),
+    total: CountStrategy = Query(
+        CountStrategy.EXACT,
+        description="How to compute total: exact, cached, estimate or none",
+    ),
 ):
     """
     Retrieve products with pagination, sorting, and filtering.
     """
-    products, total = await product_service.get_products(
+    products, total_count = await product_service.get_products(
         db,
         skip=skip,
         limit=limit,
@@ -37,9 +42,10 @@ async def read_products(
         category_id=category_id,
         sort_by=sort_by,
         sort_desc=sort_desc,
+        count_strategy=total,
     )
     add_cache_headers(response, max_age=60)
-    return {"items": products, "total": total, "skip": skip, "limit": limit}
+    return {"items": products, "total": total_count, "skip": skip, "limit": limit}
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import users, orders, products, inventory, dlq
+from app.api.v1.endpoints import users, orders, products, inventory, dlq, jobs
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
 api_router.include_router(products.router, prefix="/products", tags=["products"])
 api_router.include_router(inventory.router, prefix="/inventory", tags=["inventory"])
 api_router.include_router(dlq.router, prefix="/dlq", tags=["dlq"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
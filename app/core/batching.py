@@ -0,0 +1,83 @@
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Groups items submitted under the same key for up to `window_ms`, then
+    hands them to `handler(key, items)` in one call. The handler returns one
+    result per item, in order; each submitter receives its own result. If the
+    handler raises, every submitter of that batch gets the exception.
+    A batch is flushed early once it reaches `max_size` items.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Hashable, List[T]], Awaitable[List[R]]],
+        window_ms: float,
+        max_size: int = 100,
+    ):
+        self.handler = handler
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self._pending: Dict[Hashable, List[Tuple[T, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.Task] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, key: Hashable, item: T) -> R:
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_size:
+            timer = self._timers.pop(key, None)
+            if timer:
+                timer.cancel()
+            self._spawn(self._flush(key))
+        elif key not in self._timers:
+            self._timers[key] = self._spawn(self._flush_later(key))
+
+        return await future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+        return task
+
+    async def _flush_later(self, key: Hashable) -> None:
+        await asyncio.sleep(self.window)
+        # Once the window has elapsed the flush must not be cancelled any more
+        self._timers.pop(key, None)
+        await self._flush(key)
+
+    async def _flush(self, key: Hashable) -> None:
+        batch = self._pending.pop(key, [])
+        if not batch:
+            return
+
+        try:
+            results = await self.handler(key, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +8,101 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Stock reservation engine used at checkout:
+    #   "row_lock"           - SELECT ... FOR UPDATE, validate and reserve in memory
+    #   "conditional_update" - one guarded UPDATE ... RETURNING per cart
+    RESERVATION_STRATEGY: str = "row_lock"
+
+    # Split-counter inventory: rows with bucket_count > 1 reserve from buckets
+    INVENTORY_SHARDING_ENABLED: bool = False
+    INVENTORY_SHARD_REGISTRY_TTL_SECONDS: float = 5.0
+    INVENTORY_REBALANCE_INTERVAL_SECONDS: float = 5.0
+
+    # Expired reservation release: the in-process scheduler frees stock at the
+    # moment of expiry; the periodic sweep is a safety net for anything it missed
+    RESERVATION_RELEASE_CHUNK_SIZE: int = 500
+    RESERVATION_SCHEDULER_ENABLED: bool = True
+    RESERVATION_SCHEDULER_BATCH_SIZE: int = 100
+    RESERVATION_SWEEP_INTERVAL_SECONDS: float = 300.0
+
+    # Singleton background jobs: advisory-lock leader election across processes.
+    # Each job's leader holds one pool connection for as long as it leads.
+    JOB_LEADER_RETRY_SECONDS: float = 15.0
+    JOB_LEADER_HEARTBEAT_SECONDS: float = 10.0
+
+    # Background job runtime: restart backoff for crashed jobs, grace period on shutdown
+    JOB_RESTART_BASE_SECONDS: float = 1.0
+    JOB_RESTART_MAX_SECONDS: float = 60.0
+    JOB_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+
+    # Inventory snapshots: buffered writer and deterministic sampling per reason,
+    # {reason: {"every_n": N, "min_interval_seconds": S}}. Reasons without a
+    # policy are always captured, as are moves across SNAPSHOT_THRESHOLDS.
+    SNAPSHOT_FLUSH_INTERVAL_MS: float = 500.0
+    SNAPSHOT_POLICIES: Dict[str, Dict[str, float]] = {
+        "stock_reservation": {"every_n": 5, "min_interval_seconds": 0.0},
+    }
+    SNAPSHOT_THRESHOLDS: List[int] = [0, 10]
+
+    # Snapshot compaction: raw rows older than this are rolled into minute
+    # buckets, minute buckets older than this into hour buckets
+    SNAPSHOT_RAW_RETENTION_HOURS: float = 24.0
+    SNAPSHOT_MINUTE_RETENTION_DAYS: float = 7.0
+    SNAPSHOT_COMPACTION_BATCH_SIZE: int = 5000
+    SNAPSHOT_COMPACTION_INTERVAL_SECONDS: float = 600.0
+
+    # In-process availability index: free stock per product and store, kept
+    # current by this process's commits and reconciled with the database
+    AVAILABILITY_INDEX_ENABLED: bool = True
+    AVAILABILITY_RECONCILE_INTERVAL_SECONDS: float = 30.0
+    # Aggregate stock reads the index can't answer are cached for this long
+    AGGREGATE_CACHE_SIZE: int = 10000
+    AGGREGATE_CACHE_TTL_SECONDS: float = 2.0
+
+    # List endpoint totals: TTL for ?total=cached counts
+    COUNT_CACHE_SIZE: int = 1024
+    COUNT_CACHE_TTL_SECONDS: float = 30.0
+
+    # Store load metrics served from the in-process tracker for at most this
+    # long before being re-read from the database (0 disables the tracker)
+    STORE_LOAD_MAX_STALENESS_SECONDS: float = 10.0
+    # Multi-store load snapshot shared by all callers for this long
+    STORE_LOAD_SNAPSHOT_TTL_SECONDS: float = 2.0
+
+    # Recently completed idempotency keys -> order id, answered from memory
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_CACHE_TTL_SECONDS: float = 900.0
+
+    # Group commit: queue checkouts per store for this long and run them in
+    # one transaction. 0 disables micro-batching.
+    CHECKOUT_BATCH_WINDOW_MS: float = 0.0
+    CHECKOUT_BATCH_MAX_SIZE: int = 200
+
+    # Dead Letter Queue writer: bounded in-process queue, batched inserts,
+    # overflow / DB-failure spill file
+    DLQ_QUEUE_MAX_SIZE: int = 10000
+    DLQ_FLUSH_BATCH_SIZE: int = 500
+    DLQ_FLUSH_INTERVAL_MS: float = 200.0
+    DLQ_SPILL_PATH: str = "dlq_spill.jsonl"
+    DLQ_SPILL_REPLAY_INTERVAL_SECONDS: float = 30.0
+
+    # Dead Letter Queue replay: bounded concurrency, exponential backoff
+    # (base * 2^retry_count, capped) for automatic retries
+    DLQ_REPLAY_CONCURRENCY: int = 8
+    DLQ_REPLAY_BATCH_SIZE: int = 200
+    DLQ_REPLAY_LEASE_SECONDS: float = 300.0
+    DLQ_RETRY_BASE_SECONDS: float = 30.0
+    DLQ_RETRY_MAX_SECONDS: float = 3600.0
+    DLQ_MAX_RETRIES: int = 8
+    DLQ_RETRY_INTERVAL_SECONDS: float = 30.0
+
+    # DLQ retention: batched deletes (or partition drops), optional gzip archive dir
+    DLQ_RETENTION_DAYS: int = 30
+    DLQ_RETENTION_BATCH_SIZE: int = 5000
+    DLQ_RETENTION_PAUSE_MS: float = 200.0
+    DLQ_ARCHIVE_DIR: Optional[str] = None
+    DLQ_PARTITION_MONTHS_AHEAD: int = 2
+
     class Config:
         env_file = ".env"
 
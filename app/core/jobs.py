@@ -0,0 +1,285 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import engine
+
+
+@asynccontextmanager
+async def advisory_lock(name: str) -> AsyncIterator[Optional[AsyncConnection]]:
+    """
+    Try to take the session-level advisory lock for `name` on a dedicated
+    connection. Yields the connection if the lock was taken (it is held until
+    the block exits or the connection drops), None otherwise.
+    """
+    async with engine.connect() as conn:
+        acquired = (
+            await conn.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": name}
+            )
+        ).scalar()
+        # Session-level lock: it outlives the transaction, so don't sit idle in one
+        await conn.commit()
+        try:
+            yield conn if acquired else None
+        finally:
+            if acquired:
+                await conn.execute(
+                    text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": name}
+                )
+                await conn.commit()
+
+
+async def run_as_leader(name: str, job: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run a singleton job in one process at a time. Every process calls this;
+    the one holding the job's advisory lock runs `job`, the others retry
+    every JOB_LEADER_RETRY_SECONDS and take over once the leader exits or
+    its connection dies. Returns when `job` returns; errors of the job or
+    the lock connection propagate.
+
+    The leader pings its lock connection every JOB_LEADER_HEARTBEAT_SECONDS
+    and stops the job if the ping fails. A dropped connection frees the
+    lock at once, though, so a new leader may start while the old one is
+    still running until its next heartbeat: runs can overlap for up to one
+    heartbeat interval. Singleton jobs must therefore be idempotent and
+    safe to run concurrently (row locks, SKIP LOCKED); the election only
+    keeps them from running everywhere all the time.
+
+    Each leader pins one pool connection (the lock connection) for as long
+    as it leads, on top of whatever the job itself checks out.
+    """
+    while True:
+        async with advisory_lock(f"job:{name}") as conn:
+            if conn is not None:
+                logger.info("job_leader_acquired", job=name)
+                task = asyncio.create_task(job())
+                try:
+                    while not task.done():
+                        await asyncio.wait(
+                            {task}, timeout=settings.JOB_LEADER_HEARTBEAT_SECONDS
+                        )
+                        if not task.done():
+                            await conn.execute(text("SELECT 1"))
+                            await conn.commit()
+                    return task.result()
+                finally:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+
+        await asyncio.sleep(settings.JOB_LEADER_RETRY_SECONDS)
+
+
+class Job:
+    """A registered background job and its live stats."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Optional[int]]],
+        *,
+        interval: Optional[float],
+        singleton: bool,
+        lag: Optional[Callable[[], float]],
+        on_stop: Optional[Callable[[], Awaitable[None]]],
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval  # None: continuous
+        self.singleton = singleton
+        self.lag = lag
+        self.on_stop = on_stop
+        self.task: Optional[asyncio.Task] = None
+
+        self.state = "pending"
+        self.runs = 0
+        self.failures = 0
+        self.restarts = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_rows: Optional[int] = None
+        self.total_rows = 0
+        self.last_error: Optional[str] = None
+        self.next_run_at: Optional[datetime] = None
+
+    @property
+    def kind(self) -> str:
+        return "continuous" if self.interval is None else "periodic"
+
+    def stats(self) -> dict:
+        if self.lag is not None:
+            lag = self.lag()
+        elif self.next_run_at is not None:
+            # Time since the current or next run was due
+            lag = (datetime.utcnow() - self.next_run_at).total_seconds()
+        else:
+            lag = None
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "singleton": self.singleton,
+            "interval_seconds": self.interval,
+            "state": self.state,
+            "runs": self.runs,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "last_started_at": self.last_started_at,
+            "last_finished_at": self.last_finished_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_rows": self.last_rows,
+            "total_rows": self.total_rows,
+            "lag_seconds": round(max(lag, 0.0), 1) if lag is not None else None,
+            "last_error": self.last_error,
+            "next_run_at": self.next_run_at,
+        }
+
+
+class JobRuntime:
+    """
+    Supervises the process's background jobs for the app lifespan.
+
+    - periodic jobs run `func` every `interval` seconds (measured from the
+      end of the previous run); `func` returns the number of rows it
+      processed. A failed run is recorded and retried at the next interval.
+    - continuous jobs run `func` once and are expected to loop until
+      cancelled.
+
+    A job whose loop dies is restarted with exponential backoff
+    (JOB_RESTART_BASE_SECONDS up to JOB_RESTART_MAX_SECONDS). Singleton jobs
+    run under advisory-lock leader election, so normally only one process
+    runs them (see run_as_leader for the overlap window).
+    On shutdown idle jobs are cancelled, runs in progress get
+    JOB_SHUTDOWN_TIMEOUT_SECONDS to finish, then `on_stop` hooks run.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._stopping: Optional[asyncio.Event] = None
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Optional[int]]],
+        *,
+        interval: Optional[float] = None,
+        singleton: bool = False,
+        lag: Optional[Callable[[], float]] = None,
+        on_stop: Optional[Callable[[], Awaitable[None]]] = None,
+    ) -> None:
+        if name in self._jobs:
+            raise ValueError(f"Job {name} is already registered")
+        self._jobs[name] = Job(
+            name, func, interval=interval, singleton=singleton, lag=lag, on_stop=on_stop
+        )
+
+    def start(self) -> None:
+        self._stopping = asyncio.Event()
+        for job in self._jobs.values():
+            job.task = asyncio.create_task(self._supervise(job), name=f"job:{job.name}")
+        logger.info("job_runtime_started", jobs=list(self._jobs))
+
+    async def stop(self) -> None:
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        tasks = [job.task for job in self._jobs.values() if job.task]
+        for job in self._jobs.values():
+            if job.task and (job.interval is None or job.state != "running"):
+                job.task.cancel()
+
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(
+                tasks, timeout=settings.JOB_SHUTDOWN_TIMEOUT_SECONDS
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        for job in self._jobs.values():
+            job.state = "stopped"
+            job.task = None
+            if job.on_stop:
+                try:
+                    await job.on_stop()
+                except Exception as e:
+                    logger.error("job_stop_hook_failed", job=job.name, error=str(e))
+        self._stopping = None
+        logger.info("job_runtime_stopped", cancelled_mid_run=len(pending))
+
+    def stats(self) -> List[dict]:
+        return [job.stats() for job in self._jobs.values()]
+
+    async def _supervise(self, job: Job) -> None:
+        delay = settings.JOB_RESTART_BASE_SECONDS
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            try:
+                if job.singleton:
+                    job.state = "standby"
+                    await run_as_leader(job.name, lambda: self._body(job))
+                else:
+                    await self._body(job)
+                if self._stopping.is_set():
+                    return
+                error = "job exited"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e)
+
+            if time.monotonic() - started > settings.JOB_RESTART_MAX_SECONDS:
+                delay = settings.JOB_RESTART_BASE_SECONDS
+            job.restarts += 1
+            job.last_error = error
+            job.state = "backoff"
+            logger.error("job_crashed", job=job.name, error=error, restart_in=delay)
+            if await self._sleep(delay):
+                return
+            delay = min(delay * 2, settings.JOB_RESTART_MAX_SECONDS)
+
+    async def _body(self, job: Job) -> None:
+        if job.interval is None:
+            job.state = "running"
+            job.last_started_at = datetime.utcnow()
+            await job.func()
+            return
+
+        while not self._stopping.is_set():
+            job.state = "running"
+            job.last_started_at = datetime.utcnow()
+            started = time.monotonic()
+            try:
+                rows = await job.func()
+            except Exception as e:
+                job.failures += 1
+                job.last_error = str(e)
+                logger.error("job_run_failed", job=job.name, error=str(e))
+            else:
+                job.runs += 1
+                job.last_rows = rows
+                job.total_rows += rows or 0
+                job.last_error = None
+            job.last_finished_at = datetime.utcnow()
+            job.last_duration_ms = round((time.monotonic() - started) * 1000, 1)
+            job.next_run_at = job.last_finished_at + timedelta(seconds=job.interval)
+            job.state = "sleeping"
+            if await self._sleep(job.interval):
+                return
+
+    async def _sleep(self, seconds: float) -> bool:
+        """Sleep unless the runtime stops first; True when stopping."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+job_runtime = JobRuntime()
@@ -0,0 +1,46 @@
+import base64
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Opaque keyset cursor: the sort key of the last row of a page. Datetimes
+    are stored as ISO strings and converted back by `decode_cursor`.
+    """
+    raw = json.dumps(
+        [v.isoformat() if hasattr(v, "isoformat") else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by `encode_cursor`, converting each value with
+    the matching callable (e.g. `int`, `datetime.fromisoformat`).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError("cursor arity mismatch")
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(
+    rows: List[T], limit: int, key: Callable[[T], Sequence[Any]]
+) -> Tuple[List[T], Optional[str]]:
+    """
+    Trim rows fetched with `limit + 1` to one page. The cursor for the next
+    page is returned only when the extra row shows there is one.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(key(page[-1]))
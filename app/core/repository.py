@@ -1,7 +1,11 @@
-from typing import Any, Generic, Type, TypeVar, Optional, List, Union
+import json
+from enum import Enum
+from typing import Any, Generic, Iterable, Type, TypeVar, Optional, List, Set, Union
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Select, Table, func, select, text
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.db.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -9,14 +13,97 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+class CountStrategy(str, Enum):
+    """How list endpoints compute `total`."""
+
+    EXACT = "exact"  # count(*) on every call
+    CACHED = "cached"  # exact count, reused for COUNT_CACHE_TTL_SECONDS
+    ESTIMATE = "estimate"  # planner estimate, no scan
+    NONE = "none"  # skip the total altogether
+
+
+# Shared by all repositories; keyed by the compiled count statement
+_count_cache: TTLCache[int] = TTLCache(
+    maxsize=settings.COUNT_CACHE_SIZE, ttl=settings.COUNT_CACHE_TTL_SECONDS
+)
+
+
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
+    async def count(
+        self,
+        db: AsyncSession,
+        query: Select,
+        strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Optional[int]:
+        """
+        Total rows matched by `query` (a filtered select without ORDER BY or
+        LIMIT) using the requested strategy. Returns None for NONE.
+        """
+        if strategy == CountStrategy.NONE:
+            return None
+        if strategy == CountStrategy.ESTIMATE:
+            return await self._estimate_count(db, query)
+
+        count_query = select(func.count()).select_from(query.subquery())
+        key = None
+        if strategy == CountStrategy.CACHED:
+            compiled = count_query.compile()
+            key = (str(compiled), tuple(sorted(compiled.params.items())))
+            cached = _count_cache.get(key)
+            if cached is not None:
+                return cached
+
+        total = (await db.execute(count_query)).scalar_one()
+        if key is not None:
+            _count_cache.set(key, total)
+        return total
+
+    async def _estimate_count(self, db: AsyncSession, query: Select) -> int:
+        """
+        Unfiltered: pg_class.reltuples, kept current by (auto)vacuum/analyze.
+        Filtered, or a table never analyzed: the planner's row estimate for
+        the query, read from EXPLAIN without executing it.
+        """
+        froms = query.get_final_froms()
+        if (
+            query.whereclause is None
+            and len(froms) == 1
+            and isinstance(froms[0], Table)
+        ):
+            reltuples = (
+                await db.execute(
+                    text(
+                        "SELECT reltuples FROM pg_class "
+                        "WHERE oid = CAST(:table AS regclass)"
+                    ),
+                    {"table": froms[0].name},
+                )
+            ).scalar()
+            if reltuples is not None and reltuples >= 0:
+                return int(reltuples)
+
+        conn = await db.connection()
+        sql = query.compile(
+            dialect=conn.dialect, compile_kwargs={"literal_binds": True}
+        )
+        plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
     async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
         result = await db.execute(select(self.model).filter(self.model.id == id))
         return result.scalars().first()
 
+    async def get_existing_ids(self, db: AsyncSession, ids: Iterable[Any]) -> Set[Any]:
+        result = await db.execute(
+            select(self.model.id).filter(self.model.id.in_(set(ids)))
+        )
+        return set(result.scalars().all())
+
     async def get_multi(
         self, db: AsyncSession, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
@@ -36,7 +123,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db: AsyncSession,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, dict[str, Any]],
     ) -> ModelType:
         obj_data = db_obj.__dict__
         if isinstance(obj_in, dict):
@@ -1,113 +1,136 @@
-import asyncio
-from datetime import datetime
-from sqlalchemy import select, and_
 from app.db.session import async_session_factory
-from app.models.order import OrderItem, ReservationStatus, OrderStatus
-from app.models.inventory import Inventory
+from app.core.config import settings
+from app.core.jobs import JobRuntime
 from app.core.logging import logger
 
 
-async def cleanup_expired_reservations():
+async def cleanup_expired_reservations() -> int:
     """
-    Background worker to release stock from expired reservations.
+    Release stock from expired reservations. Runs in every process: chunks
+    are claimed with SKIP LOCKED, so concurrent sweeps split the backlog
+    instead of queueing on the same rows.
     """
-    logger.info("cleanup_worker_started")
-    while True:
-        try:
-            async with async_session_factory() as db:
-                # 1. Find expired active reservations
-                now = datetime.utcnow()
-                query = (
-                    select(OrderItem)
-                    .filter(
-                        and_(
-                            OrderItem.reservation_status == ReservationStatus.ACTIVE,
-                            OrderItem.reservation_expires_at <= now,
-                        )
-                    )
-                    .with_for_update()
-                )
+    from app.services.reservation_scheduler import reservation_scheduler
+    from app.services.reservation_service import reservation_service
 
-                result = await db.execute(query)
-                expired_items = result.scalars().all()
-
-                for item in expired_items:
-                    # 2. Revert reserved stock in inventory
-                    # We need the store_id from the Order
-                    order_query = select(OrderItem.order_id).filter(
-                        OrderItem.id == item.id
-                    )
-                    from app.models.order import Order
-
-                    order_res = await db.execute(
-                        select(Order).filter(Order.id == item.order_id)
-                    )
-                    order = order_res.scalar_one()
-
-                    inventory_query = (
-                        select(Inventory)
-                        .filter(
-                            and_(
-                                Inventory.product_id == item.product_id,
-                                Inventory.store_id == order.store_id,
-                            )
-                        )
-                        .with_for_update()
-                    )
-
-                    inv_res = await db.execute(inventory_query)
-                    inventory = inv_res.scalar_one_or_none()
-
-                    if inventory:
-                        inventory.reserved_quantity = max(
-                            0, inventory.reserved_quantity - item.quantity
-                        )
-                        item.reservation_status = ReservationStatus.RELEASED
-
-                        logger.info(
-                            "reservation_released",
-                            order_id=item.order_id,
-                            product_id=item.product_id,
-                            quantity=item.quantity,
-                        )
+    summary = await reservation_service.sweep_expired()
+    if reservation_scheduler.enabled:
+        # Pick up reservations created elsewhere that expire before next sweep
+        await reservation_scheduler.refill()
+    return summary["items"]
 
-                await db.commit()
 
-        except Exception as e:
-            logger.error("cleanup_worker_failed", error=str(e))
-            await asyncio.sleep(10)  # Wait before retry
+async def archive_old_failed_orders() -> int:
+    """
+    Retention policy: Delete failed orders older than DLQ_RETENTION_DAYS.
+    """
+    from app.services.dlq_retention import dlq_retention
 
-        await asyncio.sleep(60)  # Poll every minute
+    return await dlq_retention.run()
 
 
-async def archive_old_failed_orders():
+async def compact_inventory_snapshots() -> int:
     """
-    Retention policy: Delete failed orders older than 30 days.
+    Roll aged inventory snapshots into minute and hour buckets.
     """
-    from sqlalchemy import delete
-    from app.models.order import FailedOrder
-    from datetime import timedelta
-
-    while True:
-        try:
-            async with async_session_factory() as db:
-                retention_date = datetime.utcnow() - timedelta(days=30)
-                query = delete(FailedOrder).filter(
-                    FailedOrder.created_at <= retention_date
-                )
-                await db.execute(query)
+    from app.services.snapshot_compaction import snapshot_compaction
+
+    return await snapshot_compaction.run()
+
+
+async def rebalance_inventory_buckets() -> int:
+    """
+    Respread free stock of sharded inventory rows whose buckets are running dry,
+    so checkouts keep landing on a bucket that can serve them.
+    """
+    from app.services.inventory_service import inventory_service
+    from app.repositories.inventory_repo import inventory_repo
+
+    rebalanced = 0
+    async with async_session_factory() as db:
+        levels = await inventory_repo.get_bucket_levels(db)
+        await db.commit()
+        for row in levels:
+            total_free = row.parent_free + row.bucket_free
+            fair_share = total_free // (row.bucket_count + 1)
+            # Rebalance once any pool drops below a quarter of its fair share
+            if min(row.parent_free, row.min_bucket_free) * 4 < fair_share:
+                await inventory_service.rebalance_buckets(db, row.id)
                 await db.commit()
-                logger.info("dlq_cleanup_completed")
-        except Exception as e:
-            logger.error("dlq_cleanup_failed", error=str(e))
+                rebalanced += 1
+                logger.info(
+                    "inventory_buckets_rebalanced",
+                    inventory_id=row.id,
+                    total_free=total_free,
+                )
+    return rebalanced
+
+
+async def retry_failed_orders() -> int:
+    """
+    Replay DLQ entries whose backoff has elapsed. Each pass leases a bounded
+    batch, so several instances can run this job side by side.
+    """
+    from app.services.dlq_service import dlq_service
 
-        await asyncio.sleep(86400)  # Run daily
+    replayed = 0
+    async with async_session_factory() as db:
+        while results := await dlq_service.replay(db, due_only=True):
+            replayed += len(results)
+    return replayed
 
 
-def start_cleanup_worker():
+def register_jobs(runtime: JobRuntime) -> None:
     """
-    Initializes the background tasks.
+    Register the background jobs. Partitioned jobs run in every process;
+    singleton jobs run under leader election.
     """
-    loop = asyncio.get_event_loop()
-    loop.create_task(cleanup_expired_reservations())
-    loop.create_task(archive_old_failed_orders())
+    from app.services.availability_index import availability_index
+    from app.services.dlq_writer import dlq_writer
+    from app.services.reservation_scheduler import reservation_scheduler
+    from app.services.reservation_service import reservation_service
+    from app.services.snapshot_writer import snapshot_writer
+
+    runtime.register("dlq_writer", dlq_writer.run, on_stop=dlq_writer.flush)
+    runtime.register(
+        "snapshot_writer", snapshot_writer.run, on_stop=snapshot_writer.flush
+    )
+    if availability_index.enabled:
+        # First pass loads the index, later passes correct drift
+        runtime.register(
+            "availability_reconcile",
+            availability_index.reconcile,
+            interval=settings.AVAILABILITY_RECONCILE_INTERVAL_SECONDS,
+        )
+    runtime.register(
+        "dlq_retry", retry_failed_orders, interval=settings.DLQ_RETRY_INTERVAL_SECONDS
+    )
+    runtime.register(
+        "reservation_sweep",
+        cleanup_expired_reservations,
+        interval=settings.RESERVATION_SWEEP_INTERVAL_SECONDS,
+        lag=lambda: reservation_service.sweep_lag_seconds,
+    )
+    if reservation_scheduler.enabled:
+        runtime.register(
+            "reservation_scheduler",
+            reservation_scheduler.run,
+            lag=reservation_scheduler.lag_seconds,
+        )
+    # Run daily
+    runtime.register(
+        "dlq_archive", archive_old_failed_orders, interval=86400, singleton=True
+    )
+    runtime.register(
+        "snapshot_compaction",
+        compact_inventory_snapshots,
+        interval=settings.SNAPSHOT_COMPACTION_INTERVAL_SECONDS,
+        singleton=True,
+    )
+    if settings.INVENTORY_SHARDING_ENABLED:
+        runtime.register(
+            "inventory_rebalance",
+            rebalance_inventory_buckets,
+            interval=settings.INVENTORY_REBALANCE_INTERVAL_SECONDS,
+            singleton=True,
+        )
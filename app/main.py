@@ -1,15 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.router import api_router
 from app.core.logging import LoggingMiddleware
 from app.db.session import engine
 from app.core.db_events import setup_db_events
-from app.core.workers import start_cleanup_worker
+from app.core.jobs import job_runtime
+from app.core.workers import register_jobs
 
 # Import all models to ensure they are registered for relationships
 from app.models import user, store, product, inventory, order
 
-app = FastAPI(title="Quick Commerce Backend")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    register_jobs(job_runtime)
+    job_runtime.start()
+    yield
+    await job_runtime.stop()
+
+
+app = FastAPI(title="Quick Commerce Backend", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -1,7 +1,8 @@
+from enum import Enum
 from datetime import datetime
 from typing import Optional, List
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, Index, Text
+from sqlalchemy import ForeignKey, Index, String, Text
 from app.db.base import Base
 
 
@@ -16,15 +17,33 @@ class Inventory(Base):
     batch_id: Mapped[str] = mapped_column(nullable=True)
     location_id: Mapped[str] = mapped_column(nullable=True)
     last_snapshot_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    # Split-counter mode: > 1 spreads available stock over this many buckets
+    bucket_count: Mapped[int] = mapped_column(default=1, nullable=False)
 
     # Relationships
     product: Mapped["Product"] = relationship(back_populates="inventory_items")
     snapshots: Mapped[List["InventorySnapshot"]] = relationship(
         back_populates="inventory"
     )
+    # Never loaded implicitly: InventoryRepository.load_buckets attaches them
+    # to the sharded rows of a result
+    buckets: Mapped[List["InventoryBucket"]] = relationship(
+        back_populates="inventory",
+        lazy="raise",
+        order_by="InventoryBucket.bucket_index",
+    )
 
     __table_args__ = (
-        Index("ix_inventory_store_product", "store_id", "product_id"),
+        # One row per SKU and store; conflict target of the bulk sync upsert
+        Index("ix_inventory_store_product", "store_id", "product_id", unique=True),
+        # Product-first lookups across all stores (aggregate stock)
+        Index("ix_inventory_product_store", "product_id", "store_id"),
+        Index(
+            "ix_inventory_sharded",
+            "store_id",
+            "product_id",
+            postgresql_where="bucket_count > 1",
+        ),
         # Partial Index for fast low-stock queries (threshold < 10)
         Index(
             "ix_inventory_low_stock",
@@ -36,7 +55,22 @@ class Inventory(Base):
 
     @property
     def available_quantity(self) -> int:
-        return self.quantity - self.reserved_quantity
+        return self.total_quantity - self.total_reserved_quantity
+
+    # For sharded rows the columns above only hold the parent pool; the
+    # reported figures are the sum of the parent and all of its buckets.
+    @property
+    def total_quantity(self) -> int:
+        return self.quantity + sum(b.quantity for b in self._sharded_buckets())
+
+    @property
+    def total_reserved_quantity(self) -> int:
+        return self.reserved_quantity + sum(
+            b.reserved_quantity for b in self._sharded_buckets()
+        )
+
+    def _sharded_buckets(self) -> List["InventoryBucket"]:
+        return self.buckets if self.bucket_count > 1 else []
 
 
 class InventorySnapshot(Base):
@@ -53,3 +87,94 @@ class InventorySnapshot(Base):
 
     # Relationships
     inventory: Mapped["Inventory"] = relationship(back_populates="snapshots")
+
+    __table_args__ = (
+        # Keyset pagination over (timestamp, id), newest first
+        Index("ix_inventory_snapshots_timestamp_id", "timestamp", "id"),
+        # Per-row timeline series
+        Index(
+            "ix_inventory_snapshots_inventory_timestamp", "inventory_id", "timestamp"
+        ),
+    )
+
+
+class InventoryBucket(Base):
+    """
+    One sub-counter of a sharded (hot) inventory row. Checkouts reserve from a
+    random bucket so concurrent orders for the same SKU lock different rows.
+    """
+
+    __tablename__ = "inventory_buckets"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    inventory_id: Mapped[int] = mapped_column(
+        ForeignKey("inventory.id"), nullable=False
+    )
+    bucket_index: Mapped[int] = mapped_column(nullable=False)
+    quantity: Mapped[int] = mapped_column(default=0, nullable=False)
+    reserved_quantity: Mapped[int] = mapped_column(default=0, nullable=False)
+
+    inventory: Mapped["Inventory"] = relationship(back_populates="buckets")
+
+    __table_args__ = (
+        Index(
+            "ix_inventory_buckets_inventory_index",
+            "inventory_id",
+            "bucket_index",
+            unique=True,
+        ),
+    )
+
+    @property
+    def available_quantity(self) -> int:
+        return self.quantity - self.reserved_quantity
+
+
+class SnapshotResolution(str, Enum):
+    RAW = "raw"
+    MINUTE = "minute"
+    HOUR = "hour"
+    AUTO = "auto"  # Read side only: the finest tier covering the window
+
+
+class InventorySnapshotRollup(Base):
+    """
+    Snapshots of one inventory row compacted into a minute or hour bucket.
+    "last" columns hold the state as of last_timestamp, the newest snapshot
+    folded into the bucket.
+    """
+
+    __tablename__ = "inventory_snapshot_rollups"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    inventory_id: Mapped[int] = mapped_column(
+        ForeignKey("inventory.id"), nullable=False
+    )
+    resolution: Mapped[str] = mapped_column(String(8), nullable=False)
+    bucket_start: Mapped[datetime] = mapped_column(nullable=False)
+    samples: Mapped[int] = mapped_column(nullable=False)
+    quantity_min: Mapped[int] = mapped_column(nullable=False)
+    quantity_max: Mapped[int] = mapped_column(nullable=False)
+    quantity_last: Mapped[int] = mapped_column(nullable=False)
+    reserved_min: Mapped[int] = mapped_column(nullable=False)
+    reserved_max: Mapped[int] = mapped_column(nullable=False)
+    reserved_last: Mapped[int] = mapped_column(nullable=False)
+    last_timestamp: Mapped[datetime] = mapped_column(nullable=False)
+
+    __table_args__ = (
+        # Conflict target when compaction merges into an existing bucket
+        Index(
+            "ix_inventory_snapshot_rollups_bucket",
+            "resolution",
+            "inventory_id",
+            "bucket_start",
+            unique=True,
+        ),
+        # Timeline reads per tier, newest first
+        Index(
+            "ix_inventory_snapshot_rollups_start",
+            "resolution",
+            "bucket_start",
+            "inventory_id",
+        ),
+    )
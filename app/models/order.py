@@ -2,7 +2,7 @@ from enum import Enum
 from datetime import datetime
 from typing import List, Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from app.db.base import Base, TimestampMixin
 
 
@@ -41,6 +41,16 @@ class Order(Base, TimestampMixin):
         back_populates="order", lazy="selectin"
     )
 
+    __table_args__ = (
+        # Keyset pagination (id DESC) within the list filters
+        Index("ix_orders_user_id_id", "user_id", "id"),
+        Index("ix_orders_store_id_id", "store_id", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+        # Store load counters: open orders per status, and recent creations
+        Index("ix_orders_store_status", "store_id", "status"),
+        Index("ix_orders_store_created", "store_id", "created_at"),
+    )
+
 
 class OrderStatusHistory(Base):
     __tablename__ = "order_status_history"
@@ -66,14 +76,27 @@ class FailedOrder(Base, TimestampMixin):
     retry_count: Mapped[int] = mapped_column(default=0)
     status: Mapped[str] = mapped_column(
         default="failed"
-    )  # e.g., failed, retried, resolved
+    )  # failed, replaying, resolved, abandoned
+    error_class: Mapped[str] = mapped_column(
+        default="unknown", index=True
+    )  # stock_out, transient, invalid, unknown
+    next_retry_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        # Retry scheduler scan: due rows per status
+        Index("ix_failed_orders_status_next_retry", "status", "next_retry_at"),
+        # Retention: id range of rows past the cutoff
+        Index("ix_failed_orders_created_at_id", "created_at", "id"),
+    )
 
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"), nullable=False)
+    order_id: Mapped[int] = mapped_column(
+        ForeignKey("orders.id"), nullable=False, index=True
+    )
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
     quantity: Mapped[int] = mapped_column(nullable=False)
     price_at_order: Mapped[float] = mapped_column(nullable=False)
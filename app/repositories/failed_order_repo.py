@@ -0,0 +1,205 @@
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from sqlalchemy import and_, delete, func, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.repository import BaseRepository
+from app.models.order import FailedOrder
+
+# Monthly partitions of the partitioned layout: failed_orders_pYYYYMM
+_PARTITION_NAME = re.compile(r"^failed_orders_p(\d{4})(\d{2})$")
+
+
+def partition_name(month: date) -> str:
+    return f"failed_orders_p{month:%Y%m}"
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after the month of `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class FailedOrderRepository(BaseRepository[FailedOrder, BaseModel, BaseModel]):
+    async def claim_for_replay(
+        self,
+        db: AsyncSession,
+        *,
+        now: datetime,
+        lease_until: datetime,
+        limit: int,
+        due_only: bool = False,
+        store_id: Optional[int] = None,
+        error_class: Optional[str] = None,
+        created_before: Optional[datetime] = None,
+        created_after: Optional[datetime] = None,
+    ) -> List[Any]:
+        """
+        Lease up to `limit` DLQ rows for replay in one statement: candidates are
+        locked with SKIP LOCKED, flipped to 'replaying' and their next_retry_at
+        pushed to the lease end, so concurrent replayers never pick the same
+        row and a crashed replayer's rows become eligible again once the lease
+        runs out. Returns (id, payload, retry_count) rows.
+
+        due_only selects rows whose automatic retry is due; otherwise every
+        unresolved row matching the filters is eligible.
+        """
+        lease_expired = and_(
+            self.model.status == "replaying", self.model.next_retry_at <= now
+        )
+        if due_only:
+            filters = [
+                self.model.status.in_(["failed", "replaying"]),
+                self.model.next_retry_at <= now,
+            ]
+        else:
+            filters = [
+                or_(self.model.status.in_(["failed", "abandoned"]), lease_expired)
+            ]
+        if store_id is not None:
+            filters.append(self.model.store_id == store_id)
+        if error_class is not None:
+            filters.append(self.model.error_class == error_class)
+        if created_before is not None:
+            filters.append(self.model.created_at <= created_before)
+        if created_after is not None:
+            filters.append(self.model.created_at >= created_after)
+
+        candidates = (
+            select(self.model.id)
+            .filter(*filters)
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(candidates))
+            .values(status="replaying", next_retry_at=lease_until)
+            .returning(self.model.id, self.model.payload, self.model.retry_count)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        return sorted(result.all(), key=lambda row: row.id)
+
+    async def apply_outcomes(
+        self, db: AsyncSession, *, outcomes: List[Dict[str, Any]]
+    ) -> None:
+        """Write replay outcomes back in place (bulk UPDATE by primary key)."""
+        if outcomes:
+            await db.execute(update(self.model), outcomes)
+
+    async def get_id_range_before(
+        self, db: AsyncSession, *, cutoff: datetime
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """(min id, max id) of the rows created at or before `cutoff`."""
+        result = await db.execute(
+            select(func.min(self.model.id), func.max(self.model.id)).filter(
+                self.model.created_at <= cutoff
+            )
+        )
+        return tuple(result.one())
+
+    async def delete_batch(
+        self,
+        db: AsyncSession,
+        *,
+        after_id: int,
+        last_id: int,
+        cutoff: datetime,
+        limit: int,
+    ) -> List[Any]:
+        """
+        Delete the next `limit` rows created by `cutoff`, in id order, with
+        ids in (after_id, last_id]; returns them.
+        """
+        batch = (
+            select(self.model.id)
+            .filter(
+                self.model.id > after_id,
+                self.model.id <= last_id,
+                self.model.created_at <= cutoff,
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        result = await db.execute(
+            delete(self.model)
+            .where(self.model.id.in_(batch.scalar_subquery()))
+            .returning(*self.model.__table__.columns)
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+    async def get_created_between(
+        self,
+        db: AsyncSession,
+        *,
+        start: datetime,
+        end: datetime,
+        after_id: int,
+        limit: int,
+    ) -> List[Any]:
+        """Keyset page (by id) of the rows created in [start, end)."""
+        result = await db.execute(
+            select(*self.model.__table__.columns)
+            .filter(
+                self.model.created_at >= start,
+                self.model.created_at < end,
+                self.model.id > after_id,
+            )
+            .order_by(self.model.id)
+            .limit(limit)
+        )
+        return result.all()
+
+    async def is_partitioned(self, db: AsyncSession) -> bool:
+        result = await db.execute(
+            text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:name)"),
+            {"name": self.model.__tablename__},
+        )
+        return result.scalar() == "p"
+
+    async def get_partitions(self, db: AsyncSession) -> List[date]:
+        """First day of the month of every monthly partition, oldest first."""
+        result = await db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = to_regclass(:name)"
+            ),
+            {"name": self.model.__tablename__},
+        )
+        months = []
+        for (name,) in result.all():
+            match = _PARTITION_NAME.match(name)
+            if match:
+                months.append(date(int(match[1]), int(match[2]), 1))
+        return sorted(months)
+
+    async def create_partition(self, db: AsyncSession, *, month: date) -> None:
+        await db.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+                f"PARTITION OF {self.model.__tablename__} "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+        )
+
+    async def try_lock_partition(self, db: AsyncSession, *, month: date) -> bool:
+        """
+        Claim a partition for the rest of the transaction. False when another
+        transaction is already archiving or dropping it.
+        """
+        result = await db.execute(
+            text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"),
+            {"name": partition_name(month)},
+        )
+        return result.scalar()
+
+    async def drop_partition(self, db: AsyncSession, *, month: date) -> None:
+        await db.execute(text(f"DROP TABLE IF EXISTS {partition_name(month)}"))
+
+
+failed_order_repo = FailedOrderRepository(FailedOrder)
@@ -1,11 +1,207 @@
-from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from app.core.repository import BaseRepository
-from app.models.inventory import Inventory
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Row,
+    String,
+    Table,
+    column,
+    delete,
+    literal,
+    select,
+    func,
+    and_,
+    case,
+    or_,
+    tuple_,
+    union_all,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import noload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.schema import CreateTable
+from app.core.pagination import decode_cursor, keyset_page
+from app.core.repository import BaseRepository, CountStrategy
+from app.models.inventory import (
+    Inventory,
+    InventoryBucket,
+    InventorySnapshot,
+    InventorySnapshotRollup,
+    SnapshotResolution,
+)
 from app.schemas.inventory import InventoryCreate, InventoryUpdate
 
 
+def _bucket_available(inventory_id_col):
+    """Correlated sum of free stock held in an inventory row's buckets."""
+    return (
+        select(
+            func.coalesce(
+                func.sum(InventoryBucket.quantity - InventoryBucket.reserved_quantity),
+                0,
+            )
+        )
+        .filter(InventoryBucket.inventory_id == inventory_id_col)
+        .scalar_subquery()
+    )
+
+
+_BUCKET_WIDTH = {
+    SnapshotResolution.MINUTE: timedelta(minutes=1),
+    SnapshotResolution.HOUR: timedelta(hours=1),
+}
+
+
+def truncate_to_bucket(moment: datetime, resolution: SnapshotResolution) -> datetime:
+    """Start of the minute or hour bucket containing `moment`."""
+    if resolution == SnapshotResolution.HOUR:
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(second=0, microsecond=0)
+
+
+def _tier_columns(tier: SnapshotResolution) -> list:
+    """
+    Columns of one snapshot storage tier in the rollup shape, so raw rows and
+    rollups of any resolution can be folded by the same query.
+    """
+    if tier == SnapshotResolution.RAW:
+        s = InventorySnapshot
+        return [
+            s.inventory_id,
+            s.timestamp.label("bucket_start"),
+            literal(1).label("samples"),
+            s.quantity.label("quantity_min"),
+            s.quantity.label("quantity_max"),
+            s.quantity.label("quantity_last"),
+            s.reserved_quantity.label("reserved_min"),
+            s.reserved_quantity.label("reserved_max"),
+            s.reserved_quantity.label("reserved_last"),
+            s.timestamp.label("last_timestamp"),
+        ]
+    r = InventorySnapshotRollup
+    return [
+        r.inventory_id,
+        r.bucket_start,
+        r.samples,
+        r.quantity_min,
+        r.quantity_max,
+        r.quantity_last,
+        r.reserved_min,
+        r.reserved_max,
+        r.reserved_last,
+        r.last_timestamp,
+    ]
+
+
+def _fold(rows, resolution: SnapshotResolution):
+    """Group tier rows into `resolution` buckets per inventory row."""
+    bucket = func.date_trunc(resolution.value, rows.c.bucket_start, type_=DateTime)
+
+    def newest(col):
+        return array_agg(aggregate_order_by(col, rows.c.last_timestamp.desc()))[1]
+
+    return select(
+        literal(resolution.value).label("resolution"),
+        rows.c.inventory_id,
+        bucket.label("bucket_start"),
+        func.sum(rows.c.samples).label("samples"),
+        func.min(rows.c.quantity_min).label("quantity_min"),
+        func.max(rows.c.quantity_max).label("quantity_max"),
+        newest(rows.c.quantity_last).label("quantity_last"),
+        func.min(rows.c.reserved_min).label("reserved_min"),
+        func.max(rows.c.reserved_max).label("reserved_max"),
+        newest(rows.c.reserved_last).label("reserved_last"),
+        func.max(rows.c.last_timestamp).label("last_timestamp"),
+    ).group_by(rows.c.inventory_id, bucket)
+
+
+def _snapshot_buckets(
+    resolution: SnapshotResolution,
+    *,
+    scope=None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Subquery of `resolution` buckets, complete whatever compaction has got to.
+
+    Compaction moves the oldest rows of a tier first, so every bucket that
+    starts before the oldest row still held in a finer tier (raw rows, and
+    minute rollups for hour buckets) is already whole in its rollup and is
+    read as stored, straight off the (resolution, bucket_start) index. Only
+    the buckets from there on are folded together with the finer tiers.
+    `scope` is an optional select of the inventory ids to include.
+    """
+    r = InventorySnapshotRollup
+    finer = [SnapshotResolution.RAW]
+    oldest = [select(func.min(InventorySnapshot.timestamp)).scalar_subquery()]
+    if resolution == SnapshotResolution.HOUR:
+        finer.append(SnapshotResolution.MINUTE)
+        oldest.append(
+            select(func.min(r.bucket_start))
+            .filter(r.resolution == SnapshotResolution.MINUTE.value)
+            .scalar_subquery()
+        )
+    # NULL when no finer rows are left: every bucket is settled
+    boundary = func.date_trunc(resolution.value, func.least(*oldest), type_=DateTime)
+
+    def bounded(part, model, start):
+        if scope is not None:
+            part = part.filter(model.inventory_id.in_(scope))
+        # Bounds on bucket starts; every row of a bucket shares them
+        if since:
+            part = part.filter(start >= truncate_to_bucket(since, resolution))
+        if until:
+            part = part.filter(start < until)
+        return part
+
+    settled = bounded(
+        select(
+            literal(resolution.value).label("resolution"), *_tier_columns(resolution)
+        ).filter(
+            r.resolution == resolution.value,
+            or_(boundary.is_(None), r.bucket_start < boundary),
+        ),
+        r,
+        r.bucket_start,
+    )
+
+    tail = []
+    for tier in (*finer, resolution):
+        columns = _tier_columns(tier)
+        part = select(*columns)
+        if tier == SnapshotResolution.RAW:
+            model = InventorySnapshot
+        else:
+            model = r
+            part = part.filter(r.resolution == tier.value)
+        start = columns[1]
+        tail.append(bounded(part.filter(start >= boundary), model, start))
+    folded = _fold(union_all(*tail).subquery("tiers"), resolution)
+
+    return union_all(settled, folded).subquery("buckets")
+
+
+# Per-transaction staging table for bulk stock syncs
+_sync_stage = Table(
+    "inventory_sync_stage",
+    MetaData(),
+    Column("product_id", Integer, nullable=False),
+    Column("quantity", Integer, nullable=False),
+    Column("batch_id", String),
+    Column("location_id", String),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
 class InventoryRepository(BaseRepository[Inventory, InventoryCreate, InventoryUpdate]):
     async def get_by_product_and_store(
         self, db: AsyncSession, *, product_id: int, store_id: int
@@ -15,79 +211,814 @@ class InventoryRepository(BaseRepository[Inventory, InventoryCreate, InventoryUp
                 Inventory.product_id == product_id, Inventory.store_id == store_id
             )
         )
-        return result.scalars().first()
+        inventory = result.scalars().first()
+        if inventory:
+            await self.load_buckets(db, [inventory])
+        return inventory
+
+    async def load_buckets(self, db: AsyncSession, rows: Iterable[Inventory]) -> None:
+        """
+        Attach the buckets of the sharded rows among `rows` in one query; no
+        query at all when none of them is sharded.
+        """
+        sharded = {inv.id: inv for inv in rows if inv.bucket_count > 1}
+        if not sharded:
+            return
+        result = await db.execute(
+            select(InventoryBucket)
+            .filter(InventoryBucket.inventory_id.in_(sharded))
+            .order_by(InventoryBucket.inventory_id, InventoryBucket.bucket_index)
+        )
+        buckets: Dict[int, List[InventoryBucket]] = {id_: [] for id_ in sharded}
+        for bucket in result.scalars().all():
+            buckets[bucket.inventory_id].append(bucket)
+        for id_, rows_buckets in buckets.items():
+            set_committed_value(sharded[id_], "buckets", rows_buckets)
 
     async def get_by_product_and_store_for_update(
         self, db: AsyncSession, *, product_id: int, store_id: int
     ) -> Optional[Inventory]:
         result = await db.execute(
             select(Inventory)
+            .options(noload(Inventory.buckets))
             .filter(Inventory.product_id == product_id, Inventory.store_id == store_id)
             .with_for_update()
         )
         return result.scalars().first()
 
-    async def get_by_store(
-        self, db: AsyncSession, *, store_id: int, skip: int = 0, limit: int = 100
-    ) -> Tuple[List[Inventory], int]:
-        query = select(Inventory).filter(Inventory.store_id == store_id)
-        count_query = (
-            select(func.count())
-            .select_from(Inventory)
+    async def get_many_for_update(
+        self, db: AsyncSession, *, store_id: int, product_ids: Iterable[int]
+    ) -> List[Inventory]:
+        """
+        Lock every inventory row of a cart in a single statement.
+
+        Rows are locked in canonical (store_id, product_id) order so that two
+        carts sharing SKUs always acquire their locks in the same sequence and
+        cannot deadlock, whatever order the items were added in.
+        Buckets are not loaded: only the parent pool is reserved from here.
+        """
+        result = await db.execute(
+            select(Inventory)
+            .options(noload(Inventory.buckets))
+            .filter(
+                Inventory.store_id == store_id,
+                Inventory.product_id.in_(sorted(set(product_ids))),
+            )
+            .order_by(Inventory.store_id, Inventory.product_id)
+            .with_for_update()
+        )
+        return list(result.scalars().all())
+
+    async def reserve_conditional(
+        self, db: AsyncSession, *, store_id: int, quantities: Dict[int, int]
+    ) -> List[Row]:
+        """
+        Reserve a whole cart with one guarded UPDATE ... RETURNING.
+
+        Only rows that still have enough available stock are updated; rows
+        failing the guard are simply absent from the result, so the caller
+        compares the returned product ids with what it asked for and rolls
+        back on any shortfall. The CTE locks the matched rows in canonical
+        product order inside the same statement, keeping concurrent multi-SKU
+        carts deadlock-free without a separate SELECT round trip.
+        """
+        requested = values(
+            column("product_id", Integer), column("qty", Integer), name="requested"
+        ).data(sorted(quantities.items()))
+
+        locked = (
+            select(Inventory.id, requested.c.qty)
+            .join(requested, Inventory.product_id == requested.c.product_id)
             .filter(Inventory.store_id == store_id)
+            .order_by(Inventory.product_id)
+            .with_for_update(of=Inventory)
+            .cte("locked")
+        )
+        stmt = (
+            update(Inventory)
+            .where(
+                Inventory.id == locked.c.id,
+                (Inventory.quantity - Inventory.reserved_quantity) >= locked.c.qty,
+            )
+            .values(
+                reserved_quantity=Inventory.reserved_quantity + locked.c.qty,
+                last_snapshot_at=datetime.utcnow(),
+            )
+            .returning(
+                Inventory.id,
+                Inventory.product_id,
+                Inventory.quantity,
+                Inventory.reserved_quantity,
+            )
+        )
+        result = await db.execute(
+            stmt, execution_options={"synchronize_session": False}
+        )
+        return list(result.all())
+
+    async def add_reserved(
+        self, db: AsyncSession, *, increments: Dict[int, int]
+    ) -> None:
+        """
+        Apply {inventory_id: quantity} reservations with one UPDATE ... FROM
+        (VALUES ...). The rows must already be locked by the caller.
+        """
+        requested = values(
+            column("id", Integer), column("qty", Integer), name="increments"
+        ).data(sorted(increments.items()))
+        await db.execute(
+            update(Inventory)
+            .where(Inventory.id == requested.c.id)
+            .values(
+                reserved_quantity=Inventory.reserved_quantity + requested.c.qty,
+                last_snapshot_at=datetime.utcnow(),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+
+    async def lock_many_for_update(
+        self,
+        db: AsyncSession,
+        *,
+        keys: Iterable[Tuple[int, int]],
+        regular_only: bool = False,
+    ) -> None:
+        """
+        Lock the rows of many (store_id, product_id) keys, possibly across
+        stores, in canonical order. With regular_only, sharded rows are left
+        for fold_buckets, which locks them bucket-first like checkouts do.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        query = select(Inventory.id).filter(
+            tuple_(Inventory.store_id, Inventory.product_id).in_(keys)
+        )
+        if regular_only:
+            query = query.filter(Inventory.bucket_count <= 1)
+        await db.execute(
+            query.order_by(Inventory.store_id, Inventory.product_id).with_for_update()
         )
 
-        total_count = (await db.execute(count_query)).scalar_one()
+    async def apply_stock_deltas(
+        self, db: AsyncSession, *, deltas: Dict[Tuple[int, int], Tuple[int, int]]
+    ) -> List[Row]:
+        """
+        Apply {(store_id, product_id): (quantity_delta, reserved_delta)} with
+        one UPDATE ... FROM (VALUES ...). The rows must already be locked by
+        the caller; reserved_quantity never drops below zero. Returns
+        (store_id, product_id, available) as written, buckets included.
+        """
+        if not deltas:
+            return []
+        changes = values(
+            column("store_id", Integer),
+            column("product_id", Integer),
+            column("qty", Integer),
+            column("reserved", Integer),
+            name="deltas",
+        ).data(sorted((s, p, dq, dr) for (s, p), (dq, dr) in deltas.items()))
+        result = await db.execute(
+            update(Inventory)
+            .where(
+                Inventory.store_id == changes.c.store_id,
+                Inventory.product_id == changes.c.product_id,
+            )
+            .values(
+                quantity=Inventory.quantity + changes.c.qty,
+                reserved_quantity=func.greatest(
+                    Inventory.reserved_quantity + changes.c.reserved, 0
+                ),
+            )
+            .returning(
+                Inventory.store_id,
+                Inventory.product_id,
+                (
+                    Inventory.quantity
+                    - Inventory.reserved_quantity
+                    + _bucket_available(Inventory.id)
+                ).label("available"),
+            ),
+            execution_options={"synchronize_session": False},
+        )
+        return list(result.all())
+
+    async def stage_sync_rows(
+        self,
+        db: AsyncSession,
+        *,
+        rows: List[Tuple[int, int, Optional[str], Optional[str]]],
+    ) -> None:
+        """
+        COPY (product_id, quantity, batch_id, location_id) rows into a temp
+        table that lives until the end of the transaction.
+        """
+        await db.execute(CreateTable(_sync_stage))
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            _sync_stage.name,
+            records=rows,
+            columns=[c.name for c in _sync_stage.columns],
+        )
+
+    async def take_sharded_from_stage(
+        self, db: AsyncSession, *, store_id: int
+    ) -> List[Row]:
+        """
+        Remove the staged rows of sharded inventory (they are applied through
+        the bucket-aware path) and return them with their inventory id.
+        """
+        result = await db.execute(
+            delete(_sync_stage)
+            .where(
+                Inventory.store_id == store_id,
+                Inventory.product_id == _sync_stage.c.product_id,
+                Inventory.bucket_count > 1,
+            )
+            .returning(
+                Inventory.id,
+                _sync_stage.c.product_id,
+                _sync_stage.c.quantity,
+                _sync_stage.c.batch_id,
+                _sync_stage.c.location_id,
+            )
+        )
+        return sorted(result.all(), key=lambda row: row.product_id)
+
+    async def upsert_from_stage(
+        self, db: AsyncSession, *, store_id: int, now: datetime
+    ) -> List[Row]:
+        """
+        Insert or overwrite the stock of every staged row in one statement,
+        in product order. An existing row is only updated if the new quantity
+        still covers its reserved_quantity and something actually changed.
+        Returns (id, quantity, reserved_quantity) of the rows written.
+        """
+        stmt = pg_insert(Inventory).from_select(
+            [
+                "store_id",
+                "product_id",
+                "quantity",
+                "reserved_quantity",
+                "batch_id",
+                "location_id",
+                "bucket_count",
+                "last_snapshot_at",
+            ],
+            select(
+                literal(store_id),
+                _sync_stage.c.product_id,
+                _sync_stage.c.quantity,
+                literal(0),
+                _sync_stage.c.batch_id,
+                _sync_stage.c.location_id,
+                literal(1),
+                literal(now),
+            ).order_by(_sync_stage.c.product_id),
+        )
+        batch_id = func.coalesce(stmt.excluded.batch_id, Inventory.batch_id)
+        location_id = func.coalesce(stmt.excluded.location_id, Inventory.location_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["store_id", "product_id"],
+            set_={
+                "quantity": stmt.excluded.quantity,
+                "batch_id": batch_id,
+                "location_id": location_id,
+                "last_snapshot_at": stmt.excluded.last_snapshot_at,
+            },
+            where=and_(
+                Inventory.reserved_quantity <= stmt.excluded.quantity,
+                tuple_(
+                    Inventory.quantity, Inventory.batch_id, Inventory.location_id
+                ).is_distinct_from(
+                    tuple_(stmt.excluded.quantity, batch_id, location_id)
+                ),
+            ),
+        ).returning(
+            Inventory.id,
+            Inventory.product_id,
+            Inventory.quantity,
+            Inventory.reserved_quantity,
+        )
+        result = await db.execute(stmt)
+        return result.all()
+
+    async def get_stage_rejects(self, db: AsyncSession, *, store_id: int) -> List[Row]:
+        """
+        Staged rows whose inventory still differs after the upsert, i.e. the
+        ones held back because the new quantity is below reserved_quantity.
+        """
+        result = await db.execute(
+            select(_sync_stage.c.product_id, Inventory.reserved_quantity)
+            .join(
+                Inventory,
+                and_(
+                    Inventory.store_id == store_id,
+                    Inventory.product_id == _sync_stage.c.product_id,
+                ),
+            )
+            .filter(Inventory.quantity != _sync_stage.c.quantity)
+        )
+        return result.all()
+
+    async def get_available_by_products(
+        self, db: AsyncSession, *, store_id: int, product_ids: Iterable[int]
+    ) -> Dict[int, int]:
+        result = await db.execute(
+            select(
+                Inventory.product_id, Inventory.quantity - Inventory.reserved_quantity
+            ).filter(
+                Inventory.store_id == store_id,
+                Inventory.product_id.in_(set(product_ids)),
+            )
+        )
+        return {product_id: available for product_id, available in result.all()}
+
+    async def get_by_store(
+        self,
+        db: AsyncSession,
+        *,
+        store_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[Inventory], Optional[int]]:
+        query = select(Inventory).filter(Inventory.store_id == store_id)
+        total_count = await self.count(
+            db,
+            select(Inventory.id).filter(Inventory.store_id == store_id),
+            count_strategy,
+        )
         result = await db.execute(query.offset(skip).limit(limit))
-        return list(result.scalars().all()), total_count
+        items = list(result.scalars().all())
+        await self.load_buckets(db, items)
+        return items, total_count
 
     async def get_low_stock(
         self, db: AsyncSession, *, threshold: int = 10, store_id: Optional[int] = None
     ) -> List[Inventory]:
+        parent_available = Inventory.quantity - Inventory.reserved_quantity
         query = select(Inventory).filter(
-            (Inventory.quantity - Inventory.reserved_quantity) <= threshold
+            or_(
+                and_(Inventory.bucket_count <= 1, parent_available <= threshold),
+                and_(
+                    Inventory.bucket_count > 1,
+                    parent_available + _bucket_available(Inventory.id) <= threshold,
+                ),
+            )
         )
         if store_id:
             query = query.filter(Inventory.store_id == store_id)
 
         result = await db.execute(query)
-        return list(result.scalars().all())
+        items = list(result.scalars().all())
+        await self.load_buckets(db, items)
+        return items
 
-    async def aggregate_stock(self, db: AsyncSession, *, product_id: int) -> int:
-        query = select(
-            func.sum(Inventory.quantity - Inventory.reserved_quantity)
-        ).filter(Inventory.product_id == product_id)
+    async def get_available_by_store(
+        self, db: AsyncSession, *, keys: Optional[Iterable[Tuple[int, int]]] = None
+    ) -> List[Row]:
+        """
+        (store_id, product_id, available) of every inventory row, or of the
+        given (store_id, product_id) keys, buckets included.
+        """
+        if keys is not None:
+            result = await db.execute(
+                select(
+                    Inventory.store_id,
+                    Inventory.product_id,
+                    (
+                        Inventory.quantity
+                        - Inventory.reserved_quantity
+                        + _bucket_available(Inventory.id)
+                    ).label("available"),
+                ).filter(
+                    tuple_(Inventory.store_id, Inventory.product_id).in_(list(keys))
+                )
+            )
+            return list(result.all())
+
+        buckets = (
+            select(
+                InventoryBucket.inventory_id,
+                func.sum(
+                    InventoryBucket.quantity - InventoryBucket.reserved_quantity
+                ).label("free"),
+            )
+            .group_by(InventoryBucket.inventory_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                Inventory.store_id,
+                Inventory.product_id,
+                (
+                    Inventory.quantity
+                    - Inventory.reserved_quantity
+                    + func.coalesce(buckets.c.free, 0)
+                ).label("available"),
+            ).outerjoin(buckets, buckets.c.inventory_id == Inventory.id)
+        )
+        return list(result.all())
+
+    async def aggregate_stock(
+        self,
+        db: AsyncSession,
+        *,
+        product_ids: Iterable[int],
+        store_id: Optional[int] = None,
+    ) -> Dict[int, int]:
+        """
+        {product_id: available} for many products with one GROUP BY. Across
+        all stores the product list is looked up on ix_inventory_product_store;
+        within one store it is a range on ix_inventory_store_product. Buckets
+        are only summed for sharded rows. Products without inventory are left
+        out.
+        """
+        available = (
+            Inventory.quantity
+            - Inventory.reserved_quantity
+            + case(
+                (Inventory.bucket_count > 1, _bucket_available(Inventory.id)),
+                else_=0,
+            )
+        )
+        query = (
+            select(Inventory.product_id, func.sum(available))
+            .filter(Inventory.product_id.in_(set(product_ids)))
+            .group_by(Inventory.product_id)
+        )
+        if store_id is not None:
+            query = query.filter(Inventory.store_id == store_id)
         result = await db.execute(query)
-        return result.scalar() or 0
+        return {product_id: total for product_id, total in result.all()}
+
+    async def get_sharded(self, db: AsyncSession) -> List[Row]:
+        result = await db.execute(
+            select(
+                Inventory.id,
+                Inventory.store_id,
+                Inventory.product_id,
+                Inventory.bucket_count,
+            ).filter(Inventory.bucket_count > 1)
+        )
+        return list(result.all())
+
+    async def get_sharded_ids(
+        self, db: AsyncSession, *, keys: Iterable[Tuple[int, int]]
+    ) -> List[int]:
+        """
+        Ids of the sharded rows among (store_id, product_id) keys, returned in
+        the same canonical order checkouts use to take their locks.
+        """
+        keys = set(keys)
+        if not keys:
+            return []
+        result = await db.execute(
+            select(Inventory.id)
+            .filter(
+                tuple_(Inventory.store_id, Inventory.product_id).in_(keys),
+                Inventory.bucket_count > 1,
+            )
+            .order_by(Inventory.store_id, Inventory.product_id)
+        )
+        return list(result.scalars().all())
+
+    async def lock_with_buckets(
+        self, db: AsyncSession, *, inventory_id: int
+    ) -> Tuple[Optional[Inventory], List[InventoryBucket]]:
+        """
+        Lock a sharded row and all of its buckets.
+
+        Buckets are always locked first (by bucket_index) and the parent row
+        last. Checkouts hold at most one of these rows per SKU, so keeping
+        this order everywhere rules out deadlocks with rebalancing.
+        """
+        buckets = await db.execute(
+            select(InventoryBucket)
+            .filter(InventoryBucket.inventory_id == inventory_id)
+            .order_by(InventoryBucket.bucket_index)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        parent = await db.execute(
+            select(Inventory)
+            .filter(Inventory.id == inventory_id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        inventory = parent.scalars().first()
+        locked = list(buckets.scalars().all())
+        if inventory:
+            set_committed_value(inventory, "buckets", locked)
+        return inventory, locked
+
+    async def reserve_from_bucket(
+        self, db: AsyncSession, *, inventory_id: int, bucket_index: int, quantity: int
+    ) -> Optional[Row]:
+        result = await db.execute(
+            update(InventoryBucket)
+            .where(
+                InventoryBucket.inventory_id == inventory_id,
+                InventoryBucket.bucket_index == bucket_index,
+                (InventoryBucket.quantity - InventoryBucket.reserved_quantity)
+                >= quantity,
+            )
+            .values(reserved_quantity=InventoryBucket.reserved_quantity + quantity)
+            .returning(InventoryBucket.id, InventoryBucket.reserved_quantity),
+            execution_options={"synchronize_session": False},
+        )
+        return result.first()
+
+    async def get_bucket_levels(self, db: AsyncSession) -> List[Row]:
+        """
+        Free stock of every sharded row: parent pool, emptiest bucket and total.
+        Read without locks, used to decide which rows need rebalancing.
+        """
+        bucket_free = InventoryBucket.quantity - InventoryBucket.reserved_quantity
+        levels = (
+            select(
+                InventoryBucket.inventory_id,
+                func.min(bucket_free).label("min_bucket_free"),
+                func.sum(bucket_free).label("bucket_free"),
+            )
+            .group_by(InventoryBucket.inventory_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                Inventory.id,
+                Inventory.bucket_count,
+                (Inventory.quantity - Inventory.reserved_quantity).label("parent_free"),
+                levels.c.min_bucket_free,
+                levels.c.bucket_free,
+            )
+            .join(levels, levels.c.inventory_id == Inventory.id)
+            .filter(Inventory.bucket_count > 1)
+        )
+        return list(result.all())
 
     async def get_snapshots(
         self,
         db: AsyncSession,
         *,
         store_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
         skip: int = 0,
-        limit: int = 50
-    ) -> Tuple[List[InventorySnapshot], int]:
-        from app.models.inventory import InventorySnapshot
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[Row], Optional[int], Optional[str]]:
+        """
+        Raw snapshots newest first, selecting only the columns of the
+        timeline response (product name and store id included) in one
+        statement.
+        """
         from app.models.product import Product
 
         query = (
-            select(InventorySnapshot)
-            .join(Inventory)
-            .join(Product)
-            .order_by(InventorySnapshot.timestamp.desc())
+            select(
+                InventorySnapshot.id,
+                InventorySnapshot.inventory_id,
+                Inventory.store_id,
+                Product.name.label("product_name"),
+                InventorySnapshot.quantity,
+                InventorySnapshot.reserved_quantity,
+                InventorySnapshot.timestamp,
+                InventorySnapshot.reason,
+            )
+            .join(Inventory, Inventory.id == InventorySnapshot.inventory_id)
+            .join(Product, Product.id == Inventory.product_id)
+            .order_by(InventorySnapshot.timestamp.desc(), InventorySnapshot.id.desc())
         )
-        count_query = select(func.count()).select_from(InventorySnapshot)
+        count_query = select(InventorySnapshot.id)
 
         if store_id:
             query = query.filter(Inventory.store_id == store_id)
             count_query = count_query.join(Inventory).filter(
                 Inventory.store_id == store_id
             )
+        if since:
+            query = query.filter(InventorySnapshot.timestamp >= since)
+            count_query = count_query.filter(InventorySnapshot.timestamp >= since)
+        if until:
+            query = query.filter(InventorySnapshot.timestamp < until)
+            count_query = count_query.filter(InventorySnapshot.timestamp < until)
 
-        total_count = (await db.execute(count_query)).scalar_one()
-        result = await db.execute(query.offset(skip).limit(limit))
-        return list(result.scalars().all()), total_count
+        # Keyset on (timestamp, id): a row comparison the index can seek to
+        if cursor:
+            last_ts, last_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            query = query.filter(
+                tuple_(InventorySnapshot.timestamp, InventorySnapshot.id)
+                < tuple_(last_ts, last_id)
+            )
+        else:
+            query = query.offset(skip)
+
+        total_count = await self.count(db, count_query, count_strategy)
+        result = await db.execute(query.limit(limit + 1))
+        items, next_cursor = keyset_page(
+            list(result.all()), limit, key=lambda s: (s.timestamp, s.id)
+        )
+        return items, total_count, next_cursor
+
+    async def get_snapshot_buckets(
+        self,
+        db: AsyncSession,
+        *,
+        resolution: SnapshotResolution,
+        store_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[Row], Optional[int], Optional[str]]:
+        """Snapshot history in minute or hour buckets, newest first."""
+        from app.models.product import Product
+
+        upper = until
+        if cursor:
+            last_start, last_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            bound = last_start + _BUCKET_WIDTH[resolution]
+            upper = bound if upper is None else min(upper, bound)
+
+        scope = None
+        if store_id:
+            scope = select(Inventory.id).filter(Inventory.store_id == store_id)
+        buckets = _snapshot_buckets(resolution, scope=scope, since=since, until=upper)
+        query = (
+            select(buckets, Inventory.store_id, Product.name.label("product_name"))
+            .join(Inventory, Inventory.id == buckets.c.inventory_id)
+            .join(Product, Product.id == Inventory.product_id)
+            .order_by(buckets.c.bucket_start.desc(), buckets.c.inventory_id.desc())
+        )
+        count_query = select(buckets.c.inventory_id)
+
+        if cursor:
+            query = query.filter(
+                tuple_(buckets.c.bucket_start, buckets.c.inventory_id)
+                < tuple_(last_start, last_id)
+            )
+        else:
+            query = query.offset(skip)
+
+        total_count = await self.count(db, count_query, count_strategy)
+        result = await db.execute(query.limit(limit + 1))
+        items, next_cursor = keyset_page(
+            list(result.all()), limit, key=lambda b: (b.bucket_start, b.inventory_id)
+        )
+        return items, total_count, next_cursor
+
+    async def stream_snapshot_series(
+        self,
+        db: AsyncSession,
+        *,
+        resolution: SnapshotResolution,
+        store_id: Optional[int] = None,
+        product_id: Optional[int] = None,
+        inventory_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> AsyncIterator[Row]:
+        """
+        Timeline points ordered by inventory row, then time, read through a
+        server-side cursor. Bucket resolutions report the last value of each
+        bucket as quantity / reserved_quantity, plus the bucket's quantity
+        range.
+        """
+        from app.models.product import Product
+
+        scope = select(Inventory.id)
+        if store_id:
+            scope = scope.filter(Inventory.store_id == store_id)
+        if product_id:
+            scope = scope.filter(Inventory.product_id == product_id)
+        if inventory_id:
+            scope = scope.filter(Inventory.id == inventory_id)
+        scoped = scope.whereclause is not None
+
+        if resolution == SnapshotResolution.RAW:
+            s = InventorySnapshot
+            points = select(
+                s.inventory_id,
+                s.timestamp,
+                s.quantity,
+                s.reserved_quantity,
+            )
+            if scoped:
+                points = points.filter(s.inventory_id.in_(scope))
+            if since:
+                points = points.filter(s.timestamp >= since)
+            if until:
+                points = points.filter(s.timestamp < until)
+            points = points.subquery("points")
+        else:
+            buckets = _snapshot_buckets(
+                resolution, scope=scope if scoped else None, since=since, until=until
+            )
+            points = select(
+                buckets.c.inventory_id,
+                buckets.c.bucket_start.label("timestamp"),
+                buckets.c.quantity_last.label("quantity"),
+                buckets.c.reserved_last.label("reserved_quantity"),
+                buckets.c.quantity_min,
+                buckets.c.quantity_max,
+            ).subquery("points")
+
+        query = (
+            select(points, Inventory.store_id, Product.name.label("product_name"))
+            .join(Inventory, Inventory.id == points.c.inventory_id)
+            .join(Product, Product.id == Inventory.product_id)
+            .order_by(points.c.inventory_id, points.c.timestamp)
+            .execution_options(yield_per=1000)
+        )
+        result = await db.stream(query)
+        async for row in result:
+            yield row
+
+    async def compact_snapshots(
+        self,
+        db: AsyncSession,
+        *,
+        source: SnapshotResolution,
+        target: SnapshotResolution,
+        cutoff: datetime,
+        limit: int,
+    ) -> Tuple[int, int]:
+        """
+        Move up to `limit` of the oldest `source` rows before `cutoff` into
+        `target` rollups in one statement: the rows are deleted, folded into
+        buckets and merged into existing buckets on conflict. Rows locked by
+        someone else are skipped. Returns (rows moved, buckets written).
+        """
+        r = InventorySnapshotRollup
+        if source == SnapshotResolution.RAW:
+            model, start = InventorySnapshot, InventorySnapshot.timestamp
+            candidates = select(model.id)
+        else:
+            model, start = r, r.bucket_start
+            candidates = select(model.id).filter(r.resolution == source.value)
+        victims = (
+            candidates.filter(start < cutoff)
+            .order_by(start, model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("victims")
+        )
+        moved = (
+            delete(model)
+            .where(model.id == victims.c.id)
+            .returning(*_tier_columns(source))
+            .cte("moved")
+        )
+        folded = _fold(moved, target)
+
+        stmt = pg_insert(r).from_select(
+            [c.name for c in folded.selected_columns], folded
+        )
+        newer = stmt.excluded.last_timestamp >= r.last_timestamp
+        merged = (
+            stmt.on_conflict_do_update(
+                index_elements=["resolution", "inventory_id", "bucket_start"],
+                set_={
+                    "samples": r.samples + stmt.excluded.samples,
+                    "quantity_min": func.least(
+                        r.quantity_min, stmt.excluded.quantity_min
+                    ),
+                    "quantity_max": func.greatest(
+                        r.quantity_max, stmt.excluded.quantity_max
+                    ),
+                    "quantity_last": case(
+                        (newer, stmt.excluded.quantity_last), else_=r.quantity_last
+                    ),
+                    "reserved_min": func.least(
+                        r.reserved_min, stmt.excluded.reserved_min
+                    ),
+                    "reserved_max": func.greatest(
+                        r.reserved_max, stmt.excluded.reserved_max
+                    ),
+                    "reserved_last": case(
+                        (newer, stmt.excluded.reserved_last), else_=r.reserved_last
+                    ),
+                    "last_timestamp": func.greatest(
+                        r.last_timestamp, stmt.excluded.last_timestamp
+                    ),
+                },
+            )
+            .returning(r.id)
+            .cte("merged")
+        )
+        result = await db.execute(
+            select(
+                select(func.count()).select_from(moved).scalar_subquery(),
+                select(func.count()).select_from(merged).scalar_subquery(),
+            )
+        )
+        return tuple(result.one())
 
 
 inventory_repo = InventoryRepository(Inventory)
@@ -1,10 +1,15 @@
-from typing import List, Optional, Tuple
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from app.core.repository import BaseRepository
-from app.models.order import Order, OrderStatus
+from sqlalchemy import Row, null, select, func, union_all, update
+from app.core.pagination import decode_cursor, keyset_page
+from app.core.repository import BaseRepository, CountStrategy
+from app.models.order import Order, OrderItem, OrderStatus, ReservationStatus
 from app.schemas.order import OrderCreate, OrderUpdate
 
+# Orders that count towards a store's load
+_OPEN_STATUSES = (OrderStatus.PENDING, OrderStatus.CONFIRMED, OrderStatus.PACKING)
+
 
 class OrderRepository(BaseRepository[Order, OrderCreate, OrderUpdate]):
     async def get_by_idempotency_key(
@@ -15,6 +20,142 @@ class OrderRepository(BaseRepository[Order, OrderCreate, OrderUpdate]):
         )
         return result.scalars().first()
 
+    async def get_ids_by_idempotency_keys(
+        self, db: AsyncSession, *, idempotency_keys: Iterable[str]
+    ) -> Dict[str, int]:
+        result = await db.execute(
+            select(Order.idempotency_key, Order.id).filter(
+                Order.idempotency_key.in_(set(idempotency_keys))
+            )
+        )
+        return {key: order_id for key, order_id in result.all()}
+
+    async def lock_for_transition(
+        self, db: AsyncSession, *, order_ids: Iterable[int]
+    ) -> List[Row]:
+        """Lock orders by id (ascending) and return their (id, store_id, status)."""
+        result = await db.execute(
+            select(self.model.id, self.model.store_id, self.model.status)
+            .filter(self.model.id.in_(set(order_ids)))
+            .order_by(self.model.id)
+            .with_for_update()
+        )
+        return list(result.all())
+
+    async def get_item_lines(
+        self, db: AsyncSession, *, order_ids: Iterable[int]
+    ) -> List[Row]:
+        """
+        (order_id, product_id, quantity, reservation_status) of many orders.
+        The item rows are locked, so the expiry worker cannot release them
+        between this read and the caller's update.
+        """
+        result = await db.execute(
+            select(
+                OrderItem.order_id,
+                OrderItem.product_id,
+                OrderItem.quantity,
+                OrderItem.reservation_status,
+            )
+            .filter(OrderItem.order_id.in_(set(order_ids)))
+            .order_by(OrderItem.id)
+            .with_for_update()
+        )
+        return list(result.all())
+
+    async def release_expired_items(
+        self,
+        db: AsyncSession,
+        *,
+        now: datetime,
+        limit: int,
+        order_ids: Optional[Iterable[int]] = None,
+    ) -> Tuple[int, Dict[Tuple[int, int], int], Optional[datetime]]:
+        """
+        Mark up to `limit` expired active reservations RELEASED in one
+        statement and return (items released, {(store_id, product_id):
+        units}, earliest expiry released). The units are for the caller to
+        give back to inventory in the same transaction.
+
+        Items locked by someone else (a transition or another sweeper) are
+        skipped rather than waited for. `order_ids` narrows the candidates.
+        """
+        expired = (
+            select(
+                OrderItem.id,
+                Order.store_id,
+                OrderItem.product_id,
+                OrderItem.quantity,
+                OrderItem.reservation_expires_at,
+            )
+            .join(Order, Order.id == OrderItem.order_id)
+            .filter(
+                OrderItem.reservation_status == ReservationStatus.ACTIVE,
+                OrderItem.reservation_expires_at <= now,
+            )
+            .order_by(OrderItem.id)
+            .limit(limit)
+            .with_for_update(of=OrderItem, skip_locked=True)
+        )
+        if order_ids is not None:
+            expired = expired.filter(OrderItem.order_id.in_(set(order_ids)))
+        expired = expired.cte("expired")
+
+        released = (
+            update(OrderItem)
+            .where(OrderItem.id == expired.c.id)
+            .values(reservation_status=ReservationStatus.RELEASED)
+            .returning(
+                expired.c.store_id,
+                expired.c.product_id,
+                expired.c.quantity,
+                expired.c.reservation_expires_at,
+            )
+            .cte("released")
+        )
+        result = await db.execute(
+            select(
+                released.c.store_id,
+                released.c.product_id,
+                func.count(),
+                func.sum(released.c.quantity),
+                func.min(released.c.reservation_expires_at),
+            ).group_by(released.c.store_id, released.c.product_id)
+        )
+
+        items = 0
+        units: Dict[Tuple[int, int], int] = {}
+        oldest = None
+        for store_id, product_id, count, quantity, expiry in result.all():
+            items += count
+            units[(store_id, product_id)] = quantity
+            oldest = expiry if oldest is None else min(oldest, expiry)
+        return items, units, oldest
+
+    async def get_reservation_expiries(
+        self,
+        db: AsyncSession,
+        *,
+        until: datetime,
+        order_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, datetime]]:
+        """
+        (order_id, earliest expiry) of orders holding active reservations that
+        expire by `until`. `order_ids` narrows the candidates.
+        """
+        query = (
+            select(OrderItem.order_id, func.min(OrderItem.reservation_expires_at))
+            .filter(
+                OrderItem.reservation_status == ReservationStatus.ACTIVE,
+                OrderItem.reservation_expires_at <= until,
+            )
+            .group_by(OrderItem.order_id)
+        )
+        if order_ids is not None:
+            query = query.filter(OrderItem.order_id.in_(set(order_ids)))
+        result = await db.execute(query)
+        return [tuple(row) for row in result.all()]
+
     async def get_multi_with_filters(
         self,
         db: AsyncSession,
@@ -24,9 +165,38 @@ class OrderRepository(BaseRepository[Order, OrderCreate, OrderUpdate]):
         user_id: Optional[int] = None,
         store_id: Optional[int] = None,
         status: Optional[OrderStatus] = None,
-    ) -> Tuple[List[Order], int]:
-        query = select(self.model)
-        count_query = select(func.count()).select_from(self.model)
+        cursor: Optional[str] = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        summary: bool = False,
+    ) -> Tuple[Union[List[Order], List[Row]], Optional[int], Optional[str]]:
+        """
+        Newest orders first. With a cursor the page starts right after the
+        cursor's order id (keyset) and `skip` is ignored; every page returns
+        the cursor of the next one, or None on the last page.
+
+        summary=True returns plain rows of the order columns plus an item
+        count from a single Core query, skipping the items/timeline loads.
+        """
+        if summary:
+            item_count = (
+                select(func.count(OrderItem.id))
+                .filter(OrderItem.order_id == self.model.id)
+                .correlate(self.model)
+                .scalar_subquery()
+            )
+            query = select(
+                self.model.id,
+                self.model.user_id,
+                self.model.store_id,
+                self.model.status,
+                self.model.total_amount,
+                self.model.idempotency_key,
+                self.model.checkout_latency_ms,
+                self.model.created_at,
+                item_count.label("item_count"),
+            )
+        else:
+            query = select(self.model)
 
         filters = []
         if user_id:
@@ -38,54 +208,98 @@ class OrderRepository(BaseRepository[Order, OrderCreate, OrderUpdate]):
 
         if filters:
             query = query.filter(*filters)
-            count_query = count_query.filter(*filters)
 
-        total_count = (await db.execute(count_query)).scalar_one()
-        result = await db.execute(
-            query.order_by(self.model.id.desc()).offset(skip).limit(limit)
+        total_count = await self.count(
+            db, select(self.model.id).filter(*filters), count_strategy
         )
-        return list(result.scalars().all()), total_count
 
-    async def get_store_load_metrics(self, db: AsyncSession, *, store_id: int) -> dict:
-        pending_query = (
-            select(func.count())
-            .select_from(Order)
-            .filter(Order.store_id == store_id, Order.status == OrderStatus.PENDING)
-        )
-        active_query = (
-            select(func.count())
-            .select_from(Order)
+        query = query.order_by(self.model.id.desc())
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.filter(self.model.id < last_id)
+        else:
+            query = query.offset(skip)
+        result = await db.execute(query.limit(limit + 1))
+        rows = result.all() if summary else result.scalars().all()
+        items, next_cursor = keyset_page(list(rows), limit, key=lambda o: (o.id,))
+        return items, total_count, next_cursor
+
+    async def get_store_load_counts(
+        self, db: AsyncSession, *, store_id: int, since: datetime
+    ) -> Tuple[int, int, Dict[datetime, int]]:
+        """
+        Pending and active (confirmed/packing) order counts of a store, plus
+        orders created per minute since `since`, in one round trip. The two
+        halves are separate branches of a UNION ALL so each stays a range
+        scan: open statuses over (store_id, status), the window over
+        (store_id, created_at).
+        """
+        minute = func.date_trunc("minute", self.model.created_at)
+        by_status = (
+            select(self.model.status, null().label("minute"), func.count())
             .filter(
-                Order.store_id == store_id,
-                Order.status.in_([OrderStatus.CONFIRMED, OrderStatus.PACKING]),
+                self.model.store_id == store_id,
+                self.model.status.in_(_OPEN_STATUSES),
             )
+            .group_by(self.model.status)
         )
+        by_minute = (
+            select(null(), minute, func.count())
+            .filter(self.model.store_id == store_id, self.model.created_at >= since)
+            .group_by(minute)
+        )
+        result = await db.execute(union_all(by_status, by_minute))
 
-        # Smoothed factor: Orders in last 15 minutes
-        from datetime import datetime, timedelta
+        pending = active = 0
+        created_per_minute: Dict[datetime, int] = {}
+        for status, created_minute, orders in result.all():
+            if created_minute is not None:
+                created_per_minute[created_minute] = orders
+            elif status == OrderStatus.PENDING:
+                pending = orders
+            else:
+                active += orders
+        return pending, active, created_per_minute
 
-        recent_cutoff = datetime.utcnow() - timedelta(minutes=15)
-        recent_query = (
-            select(func.count())
-            .select_from(Order)
-            .filter(Order.store_id == store_id, Order.created_at >= recent_cutoff)
+    async def get_load_counts_by_store(
+        self,
+        db: AsyncSession,
+        *,
+        since: datetime,
+        store_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[int, Tuple[int, int, int]]:
+        """
+        store_id -> (pending, active, created since `since`) for many stores
+        in one round trip, split into the same two UNION ALL branches as
+        get_store_load_counts. Stores without open or recent orders are
+        absent from the result.
+        """
+        by_status = (
+            select(self.model.store_id, self.model.status, func.count())
+            .filter(self.model.status.in_(_OPEN_STATUSES))
+            .group_by(self.model.store_id, self.model.status)
+        )
+        recent = (
+            select(self.model.store_id, null(), func.count())
+            .filter(self.model.created_at >= since)
+            .group_by(self.model.store_id)
         )
+        if store_ids is not None:
+            ids = set(store_ids)
+            by_status = by_status.filter(self.model.store_id.in_(ids))
+            recent = recent.filter(self.model.store_id.in_(ids))
 
-        pending_count = (await db.execute(pending_query)).scalar_one()
-        active_count = (await db.execute(active_query)).scalar_one()
-        recent_count = (await db.execute(recent_query)).scalar_one()
-
-        # Heuristic: base load + (velocity * constant)
-        base_load = pending_count + (active_count * 1.5)
-        smoothing_velocity = recent_count / 15.0  # orders per minute
-
-        return {
-            "store_id": store_id,
-            "pending_orders_count": pending_count,
-            "active_orders_count": active_count,
-            "recent_velocity_per_min": round(smoothing_velocity, 2),
-            "total_load_score": float(base_load + (smoothing_velocity * 5)),
-        }
+        result = await db.execute(union_all(by_status, recent))
+        counts: Dict[int, List[int]] = {}
+        for store_id, status, orders in result.all():
+            entry = counts.setdefault(store_id, [0, 0, 0])
+            if status is None:
+                entry[2] = orders
+            elif status == OrderStatus.PENDING:
+                entry[0] = orders
+            else:
+                entry[1] += orders
+        return {store_id: tuple(entry) for store_id, entry in counts.items()}
 
 
 order_repo = OrderRepository(Order)
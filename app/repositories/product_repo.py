@@ -1,12 +1,25 @@
-from typing import List, Optional, Tuple
-from sqlalchemy import select, desc, func
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.repository import BaseRepository
+from app.core.repository import BaseRepository, CountStrategy
 from app.models.product import Product
 from app.schemas.product import ProductCreate, ProductUpdate
 
 
 class ProductRepository(BaseRepository[Product, ProductCreate, ProductUpdate]):
+    async def get_prices(
+        self, db: AsyncSession, *, ids: Iterable[int]
+    ) -> Dict[int, float]:
+        """
+        Fetch prices for many products in one query, keyed by product id.
+        Only the two needed columns are selected, so the eager `category`
+        join and `inventory_items` selectin load are skipped.
+        """
+        result = await db.execute(
+            select(self.model.id, self.model.price).filter(self.model.id.in_(set(ids)))
+        )
+        return {row.id: row.price for row in result.all()}
+
     async def get_multi_with_filters(
         self,
         db: AsyncSession,
@@ -18,10 +31,10 @@ class ProductRepository(BaseRepository[Product, ProductCreate, ProductUpdate]):
         category_id: Optional[int] = None,
         sort_by: Optional[str] = "id",
         sort_desc: bool = False,
-    ) -> Tuple[List[Product], int]:
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[Product], Optional[int]]:
         # Base query
         query = select(self.model)
-        count_query = select(func.count()).select_from(self.model)
 
         # Filters
         filters = []
@@ -34,11 +47,11 @@ class ProductRepository(BaseRepository[Product, ProductCreate, ProductUpdate]):
 
         if filters:
             query = query.filter(*filters)
-            count_query = count_query.filter(*filters)
 
         # Total count
-        count_result = await db.execute(count_query)
-        total_count = count_result.scalar_one()
+        total_count = await self.count(
+            db, select(self.model.id).filter(*filters), count_strategy
+        )
 
         # Sorting logic
         if sort_by and hasattr(self.model, sort_by):
@@ -41,5 +41,13 @@ class StoreRepository(BaseRepository[Store, StoreCreate, StoreUpdate]):
         result = await db.execute(query)
         return list(result.all())
 
+    async def get_active_ids(self, db: AsyncSession) -> List[int]:
+        result = await db.execute(
+            select(self.model.id)
+            .filter(self.model.is_active.is_(True))
+            .order_by(self.model.id)
+        )
+        return list(result.scalars().all())
+
 
 store_repo = StoreRepository(Store)
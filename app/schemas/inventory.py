@@ -1,5 +1,6 @@
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
+from pydantic import AliasChoices, Field
 from app.schemas.base import BaseSchema
 
 
@@ -24,24 +25,73 @@ class InventoryUpdate(InventoryBase):
 
 class InventoryResponse(InventoryBase):
     id: int
+    # Sharded rows report the sum of the parent row and its buckets
+    quantity: int = Field(validation_alias=AliasChoices("total_quantity", "quantity"))
+    reserved_quantity: int = Field(
+        validation_alias=AliasChoices("total_reserved_quantity", "reserved_quantity")
+    )
     available_quantity: int
+    bucket_count: int = 1
+
+
+class InventorySyncItem(BaseSchema):
+    product_id: int
+    quantity: int = Field(..., ge=0)  # on-hand stock reported by the warehouse
+    batch_id: Optional[str] = None
+    location_id: Optional[str] = None
+
+
+class InventorySyncRequest(BaseSchema):
+    store_id: int
+    items: List[InventorySyncItem] = Field(..., min_length=1, max_length=10000)
+
+
+class InventorySyncError(BaseSchema):
+    product_id: int
+    error: str
+
+
+class InventorySyncResponse(BaseSchema):
+    store_id: int
+    synced: int
+    changed: int
+    failed: int
+    errors: List[InventorySyncError]
+    timestamp: datetime
+
+
+class InventoryBucketConfig(BaseSchema):
+    bucket_count: int = Field(..., ge=1, le=64)
 
 
 class InventoryListResponse(BaseSchema):
     items: List[InventoryResponse]
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
     skip: int
     limit: int
 
 
 class AggregateStockResponse(BaseSchema):
     product_id: int
+    store_id: Optional[int] = None
     total_available_quantity: int
 
 
+class AggregateStockBatchRequest(BaseSchema):
+    product_ids: List[int] = Field(..., min_length=1, max_length=500)
+    store_id: Optional[int] = None
+
+
+class AggregateStockBatchResponse(BaseSchema):
+    store_id: Optional[int] = None
+    # product_id -> total available quantity (0 when not stocked)
+    quantities: Dict[int, int]
+
+
 class InventorySnapshotResponse(BaseSchema):
     id: int
     inventory_id: int
+    store_id: int
     product_name: str
     quantity: int
     reserved_quantity: int
@@ -50,7 +100,51 @@ class InventorySnapshotResponse(BaseSchema):
 
 
 class InventorySnapshotListResponse(BaseSchema):
+    resolution: str = "raw"
     items: List[InventorySnapshotResponse]
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+class InventorySnapshotBucketResponse(BaseSchema):
+    inventory_id: int
+    store_id: int
+    product_name: str
+    bucket_start: datetime
+    samples: int
+    quantity_min: int
+    quantity_max: int
+    quantity_last: int
+    reserved_min: int
+    reserved_max: int
+    reserved_last: int
+
+
+class InventorySnapshotBucketListResponse(BaseSchema):
+    resolution: str  # "minute" or "hour"
+    items: List[InventorySnapshotBucketResponse]
+    total: Optional[int] = None
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
+
+
+class InventorySnapshotSeries(BaseSchema):
+    """One inventory row's timeline as parallel arrays, oldest point first."""
+
+    inventory_id: int
+    store_id: int
+    product_name: str
+    timestamps: List[datetime]
+    quantity: List[int]
+    reserved_quantity: List[int]
+    # Bucket resolutions only: range of quantity within each bucket
+    quantity_min: Optional[List[int]] = None
+    quantity_max: Optional[List[int]] = None
+
+
+class InventorySnapshotSeriesResponse(BaseSchema):
+    resolution: str
+    series: List[InventorySnapshotSeries]
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from datetime import datetime
+from pydantic import Field
 from app.schemas.base import BaseSchema
 from app.models.order import OrderStatus, ReservationStatus
 
@@ -39,6 +40,29 @@ class OrderUpdate(BaseSchema):
     status: Optional[OrderStatus] = None
 
 
+class OrderTransitionRequest(BaseSchema):
+    status: OrderStatus
+    notes: Optional[str] = None
+
+
+class OrderBulkTransitionRequest(OrderTransitionRequest):
+    order_ids: List[int] = Field(..., min_length=1, max_length=500)
+
+
+class OrderTransitionResult(BaseSchema):
+    order_id: int
+    status: str  # transitioned | rejected
+    from_status: Optional[OrderStatus] = None
+    to_status: OrderStatus
+    error: Optional[str] = None
+
+
+class OrderBulkTransitionResponse(BaseSchema):
+    results: List[OrderTransitionResult]
+    transitioned: int
+    rejected: int
+
+
 class OrderStatusHistoryResponse(BaseSchema):
     status: OrderStatus
     timestamp: datetime
@@ -53,11 +77,47 @@ class OrderResponse(OrderBase):
     checkout_latency_ms: Optional[float] = None
 
 
+class OrderSummaryResponse(BaseSchema):
+    id: int
+    user_id: int
+    store_id: int
+    status: OrderStatus
+    total_amount: float
+    idempotency_key: str
+    checkout_latency_ms: Optional[float] = None
+    created_at: datetime
+    item_count: int
+
+
+class OrderSummaryListResponse(BaseSchema):
+    items: List[OrderSummaryResponse]
+    total: Optional[int] = None  # None when requested with total=none
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
 class OrderListResponse(BaseSchema):
     items: List[OrderResponse]
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
     skip: int
     limit: int
+    next_cursor: Optional[str] = None
+
+
+class OrderBatchResult(BaseSchema):
+    idempotency_key: str
+    status: str  # created, idempotent, failed
+    order_id: Optional[int] = None
+    failed_order_id: Optional[int] = None  # DLQ reference when status == failed
+    error: Optional[str] = None
+
+
+class OrderBatchResponse(BaseSchema):
+    results: List[OrderBatchResult]
+    created: int
+    idempotent: int
+    failed: int
 
 
 class StoreLoadMetrics(BaseSchema):
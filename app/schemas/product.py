@@ -34,6 +34,6 @@ class ProductResponse(ProductBase):
 
 class ProductListResponse(BaseSchema):
     items: List[ProductResponse]
-    total: int
+    total: Optional[int] = None  # None when requested with total=none
     skip: int
     limit: int
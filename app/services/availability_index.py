@@ -0,0 +1,190 @@
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import Row, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.repositories.inventory_repo import inventory_repo
+
+_STAGED = "staged_availability"
+
+
+class AvailabilityIndex:
+    """
+    In-process free stock per product and store.
+
+    Each product has a slot holding its total across stores plus two
+    parallel arrays: sorted store ids and the free stock in each. The index
+    is bulk-loaded from the database by the first reconcile pass, then kept
+    current by this process's commits: reservation, release and sync code
+    stages changes on the session, and they are applied once the transaction
+    commits (a rollback drops them). Changes made by other processes are
+    picked up by the reconcile pass every
+    AVAILABILITY_RECONCILE_INTERVAL_SECONDS. Until the first load, or with
+    the index disabled, reads return None and callers go to the database.
+    """
+
+    def __init__(self):
+        self._slots: Dict[int, int] = {}  # product_id -> slot
+        self._totals = array("q")
+        self._store_ids: List[array] = []
+        self._available: List[array] = []
+        self.loaded_at: Optional[float] = None
+        # Keys changed by commits while a reconcile read is in flight
+        self._touched: Optional[Set[Tuple[int, int]]] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AVAILABILITY_INDEX_ENABLED
+
+    @property
+    def ready(self) -> bool:
+        return self.enabled and self.loaded_at is not None
+
+    def total(self, product_id: int) -> Optional[int]:
+        """Free stock of a product across all stores."""
+        if not self.ready:
+            return None
+        slot = self._slots.get(product_id)
+        return self._totals[slot] if slot is not None else 0
+
+    def available(self, store_id: int, product_id: int) -> Optional[int]:
+        """Free stock of a product in one store; None if not indexed."""
+        if not self.ready:
+            return None
+        slot = self._slots.get(product_id)
+        if slot is None:
+            return None
+        stores = self._store_ids[slot]
+        i = bisect_left(stores, store_id)
+        if i == len(stores) or stores[i] != store_id:
+            return None
+        return self._available[slot][i]
+
+    def stage(self, db: AsyncSession, deltas: Dict[Tuple[int, int], int]) -> None:
+        """Record {(store_id, product_id): change in free stock} for `db`'s commit."""
+        if self.enabled:
+            staged = db.info.setdefault(_STAGED, [])
+            staged.extend((key, delta, False) for key, delta in deltas.items())
+
+    def stage_value(
+        self, db: AsyncSession, store_id: int, product_id: int, available: int
+    ) -> None:
+        """Record the new free stock of one row for `db`'s commit."""
+        if self.enabled:
+            db.info.setdefault(_STAGED, []).append(
+                ((store_id, product_id), available, True)
+            )
+
+    def _committed(self, session: Session) -> None:
+        for (store_id, product_id), value, absolute in session.info.pop(_STAGED, ()):
+            if self.loaded_at is not None:
+                self._apply(store_id, product_id, value, absolute)
+            if self._touched is not None:
+                self._touched.add((store_id, product_id))
+
+    def _rolled_back(self, session: Session) -> None:
+        session.info.pop(_STAGED, None)
+
+    def _apply(
+        self, store_id: int, product_id: int, value: int, absolute: bool
+    ) -> None:
+        slot = self._slots.get(product_id)
+        if slot is None:
+            slot = self._slots[product_id] = len(self._totals)
+            self._totals.append(0)
+            self._store_ids.append(array("q"))
+            self._available.append(array("q"))
+        stores, available = self._store_ids[slot], self._available[slot]
+        i = bisect_left(stores, store_id)
+        if i == len(stores) or stores[i] != store_id:
+            stores.insert(i, store_id)
+            available.insert(i, 0)
+        delta = value - available[i] if absolute else value
+        available[i] += delta
+        self._totals[slot] += delta
+
+    def _load(self, rows: Iterable[Tuple[int, int, int]]) -> None:
+        """Replace the index with (store_id, product_id, available) rows."""
+        slots: Dict[int, int] = {}
+        totals = array("q")
+        store_ids: List[array] = []
+        available: List[array] = []
+        for store_id, product_id, free in sorted(rows, key=lambda r: (r[1], r[0])):
+            slot = slots.get(product_id)
+            if slot is None:
+                slot = slots[product_id] = len(totals)
+                totals.append(0)
+                store_ids.append(array("q"))
+                available.append(array("q"))
+            store_ids[slot].append(store_id)
+            available[slot].append(free)
+            totals[slot] += free
+        self._slots, self._totals = slots, totals
+        self._store_ids, self._available = store_ids, available
+
+    async def _read(
+        self, keys: Optional[Set[Tuple[int, int]]] = None
+    ) -> Tuple[List[Row], Set[Tuple[int, int]]]:
+        """
+        Read free stock from the database, together with the keys changed by
+        commits of this process while the read was running.
+        """
+        self._touched = set()
+        try:
+            async with async_session_factory() as db:
+                rows = await inventory_repo.get_available_by_store(db, keys=keys)
+            return rows, self._touched
+        finally:
+            self._touched = None
+
+    async def reconcile(self) -> int:
+        """
+        Load the index, or compare it with the database and correct drifted
+        entries. Entries changed by a commit of this process while the read
+        was running are left for the next pass; on the first load, which
+        applies no commits, those entries are read once more as soon as
+        commits are being applied. Returns the entries loaded or corrected.
+        """
+        if not self.enabled:
+            return 0
+        started = time.monotonic()
+        rows, touched = await self._read()
+
+        if self.loaded_at is None:
+            self._load(rows)
+            self.loaded_at = time.monotonic()
+            if touched:
+                fresh, changed = await self._read(touched)
+                for store_id, product_id, free in fresh:
+                    if (store_id, product_id) not in changed:
+                        self._apply(store_id, product_id, free, True)
+            logger.info(
+                "availability_index_loaded",
+                products=len(self._slots),
+                rows=len(rows),
+                duration_ms=round((time.monotonic() - started) * 1000, 1),
+            )
+            return len(rows)
+
+        corrected = 0
+        for store_id, product_id, free in rows:
+            if (store_id, product_id) in touched:
+                continue
+            if self.available(store_id, product_id) != free:
+                self._apply(store_id, product_id, free, True)
+                corrected += 1
+        self.loaded_at = time.monotonic()
+        if corrected:
+            logger.info("availability_index_reconciled", corrected=corrected)
+        return corrected
+
+
+availability_index = AvailabilityIndex()
+
+event.listen(Session, "after_commit", availability_index._committed)
+event.listen(Session, "after_rollback", availability_index._rolled_back)
@@ -0,0 +1,145 @@
+import asyncio
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.repositories.failed_order_repo import add_months, failed_order_repo
+
+
+class DLQRetention:
+    """
+    Removes DLQ rows older than DLQ_RETENTION_DAYS without a long scan or a
+    single huge transaction.
+
+    Unpartitioned table: the id range of expired rows is looked up through
+    the created_at index, then walked in id order and deleted
+    DLQ_RETENTION_BATCH_SIZE rows at a time, one transaction per batch,
+    pausing DLQ_RETENTION_PAUSE_MS in between. Gaps in the ids cost neither
+    a statement nor a pause.
+
+    Partitioned table (scripts/partition_failed_orders.py): monthly partitions
+    that are entirely past the cutoff are dropped, upcoming months are
+    created, and the rows of the partially expired month go through the
+    batched delete.
+
+    With DLQ_ARCHIVE_DIR set, rows are appended to a gzip JSON-lines file
+    before they are removed.
+    """
+
+    async def run(self) -> int:
+        """Apply the retention policy; returns the number of rows deleted in batches."""
+        cutoff = datetime.utcnow() - timedelta(days=settings.DLQ_RETENTION_DAYS)
+        async with async_session_factory() as db:
+            partitioned = await failed_order_repo.is_partitioned(db)
+            await db.commit()
+        dropped = await self._drop_partitions(cutoff) if partitioned else 0
+        deleted = await self._delete_batches(cutoff)
+
+        logger.info(
+            "dlq_cleanup_completed",
+            deleted=deleted,
+            partitions_dropped=dropped,
+            cutoff=cutoff.isoformat(),
+        )
+        return deleted
+
+    async def ensure_partitions(self, today: date) -> None:
+        """Create the partitions for this month and the months ahead."""
+        first = today.replace(day=1)
+        async with async_session_factory() as db:
+            for offset in range(settings.DLQ_PARTITION_MONTHS_AHEAD + 1):
+                await failed_order_repo.create_partition(
+                    db, month=add_months(first, offset)
+                )
+            await db.commit()
+
+    async def _delete_batches(self, cutoff: datetime) -> int:
+        batch = settings.DLQ_RETENTION_BATCH_SIZE
+        deleted = 0
+        async with async_session_factory() as db:
+            first_id, last_id = await failed_order_repo.get_id_range_before(
+                db, cutoff=cutoff
+            )
+            await db.commit()
+            if first_id is None:
+                return 0
+
+            after_id = first_id - 1
+            while True:
+                rows = await failed_order_repo.delete_batch(
+                    db,
+                    after_id=after_id,
+                    last_id=last_id,
+                    cutoff=cutoff,
+                    limit=batch,
+                )
+                if not rows:
+                    break
+                self._archive(rows)
+                await db.commit()
+                deleted += len(rows)
+                if len(rows) < batch:
+                    break
+                after_id = max(row.id for row in rows)
+                await asyncio.sleep(settings.DLQ_RETENTION_PAUSE_MS / 1000)
+        return deleted
+
+    async def _drop_partitions(self, cutoff: datetime) -> int:
+        await self.ensure_partitions(datetime.utcnow().date())
+        dropped = 0
+        async with async_session_factory() as db:
+            for month in await failed_order_repo.get_partitions(db):
+                end = add_months(month, 1)
+                if datetime(end.year, end.month, end.day) > cutoff:
+                    break
+                # Overlapping leaders must not archive the same month twice
+                if not await failed_order_repo.try_lock_partition(db, month=month):
+                    continue
+                archived = 0
+                if settings.DLQ_ARCHIVE_DIR:
+                    archived = await self._archive_month(db, month, end)
+                await failed_order_repo.drop_partition(db, month=month)
+                await db.commit()
+                dropped += 1
+                logger.info(
+                    "dlq_partition_dropped", month=month.isoformat(), archived=archived
+                )
+        return dropped
+
+    async def _archive_month(self, db: AsyncSession, month: date, end: date) -> int:
+        archived = 0
+        last_id = 0
+        while True:
+            rows = await failed_order_repo.get_created_between(
+                db,
+                start=datetime(month.year, month.month, month.day),
+                end=datetime(end.year, end.month, end.day),
+                after_id=last_id,
+                limit=settings.DLQ_RETENTION_BATCH_SIZE,
+            )
+            if not rows:
+                return archived
+            self._archive(rows)
+            archived += len(rows)
+            last_id = rows[-1].id
+
+    def _archive(self, rows: List[Any]) -> None:
+        if not rows or not settings.DLQ_ARCHIVE_DIR:
+            return
+        os.makedirs(settings.DLQ_ARCHIVE_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.DLQ_ARCHIVE_DIR,
+            f"failed_orders-{datetime.utcnow():%Y%m%d}.jsonl.gz",
+        )
+        # Appending adds a gzip member; readers see one continuous stream
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(row._mapping), default=str) + "\n")
+
+
+dlq_retention = DLQRetention()
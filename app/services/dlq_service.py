@@ -0,0 +1,165 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.models.order import FailedOrder, Order
+from app.repositories.failed_order_repo import failed_order_repo
+from app.repositories.order_repo import order_repo
+from app.schemas.order import OrderCreate
+from app.services.dlq_writer import classify_error, next_retry_at
+from app.services.order_service import order_service
+
+
+class DLQService:
+    """
+    Replays Dead Letter Queue entries.
+
+    Replays go through the regular idempotent checkout with DLQ recording
+    switched off, so a failed attempt updates its own row (retry_count, error,
+    error class, next retry time) instead of adding a new one, and a replay of
+    an order that was created in the meantime resolves to that order.
+    """
+
+    async def replay(
+        self,
+        db: AsyncSession,
+        *,
+        store_id: Optional[int] = None,
+        error_class: Optional[str] = None,
+        min_age_seconds: Optional[float] = None,
+        max_age_seconds: Optional[float] = None,
+        limit: Optional[int] = None,
+        due_only: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Lease matching rows, replay them with bounded concurrency (each
+        attempt in its own session) and write all outcomes back in one
+        statement. Returns one result per replayed row.
+        """
+        now = datetime.utcnow()
+        claimed = await failed_order_repo.claim_for_replay(
+            db,
+            now=now,
+            lease_until=now + timedelta(seconds=settings.DLQ_REPLAY_LEASE_SECONDS),
+            limit=limit or settings.DLQ_REPLAY_BATCH_SIZE,
+            due_only=due_only,
+            store_id=store_id,
+            error_class=error_class,
+            created_before=(
+                now - timedelta(seconds=min_age_seconds)
+                if min_age_seconds is not None
+                else None
+            ),
+            created_after=(
+                now - timedelta(seconds=max_age_seconds)
+                if max_age_seconds is not None
+                else None
+            ),
+        )
+        await db.commit()
+        if not claimed:
+            return []
+
+        semaphore = asyncio.Semaphore(settings.DLQ_REPLAY_CONCURRENCY)
+
+        async def attempt(row) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._attempt(row.id, row.payload, row.retry_count)
+
+        results = await asyncio.gather(*(attempt(row) for row in claimed))
+        await failed_order_repo.apply_outcomes(
+            db, outcomes=[self._outcome_row(r) for r in results]
+        )
+        await db.commit()
+
+        logger.info(
+            "dlq_replay_completed",
+            attempted=len(results),
+            resolved=sum(r["status"] == "resolved" for r in results),
+            rescheduled=sum(r["next_retry_at"] is not None for r in results),
+            abandoned=sum(r["status"] == "abandoned" for r in results),
+            due_only=due_only,
+        )
+        return results
+
+    async def replay_failed_order(
+        self, db: AsyncSession, failed_order_id: int
+    ) -> Order:
+        """
+        Retry a single failed order from the DLQ now, regardless of its
+        schedule.
+        """
+        failed_order = await db.get(FailedOrder, failed_order_id)
+        if not failed_order:
+            raise HTTPException(status_code=404, detail="Failed order not found")
+
+        result = await self._attempt(
+            failed_order.id, failed_order.payload, failed_order.retry_count
+        )
+        await failed_order_repo.apply_outcomes(db, outcomes=[self._outcome_row(result)])
+        await db.commit()
+
+        if result["status"] != "resolved":
+            raise HTTPException(
+                status_code=500, detail=f"Replay failed again: {result['error']}"
+            )
+        return await order_repo.get(db, id=result["order_id"])
+
+    async def _attempt(
+        self, failed_order_id: int, payload: str, retry_count: int
+    ) -> Dict[str, Any]:
+        retry_count += 1
+        try:
+            order_in = OrderCreate(**json.loads(payload))
+            async with async_session_factory() as session:
+                order = await order_service.create_order(
+                    session, order_in, record_failure=False
+                )
+                order_id = order.id
+        except Exception as e:
+            error = str(e)
+            error_class = classify_error(error)
+            retry_at = next_retry_at(error_class, retry_count, datetime.utcnow())
+            logger.warning(
+                "dlq_replay_failed",
+                failed_order_id=failed_order_id,
+                error_class=error_class,
+                retry_count=retry_count,
+                error=error,
+            )
+            return {
+                "failed_order_id": failed_order_id,
+                "status": "failed" if retry_at else "abandoned",
+                "retry_count": retry_count,
+                "error_class": error_class,
+                "next_retry_at": retry_at,
+                "error": error,
+            }
+
+        return {
+            "failed_order_id": failed_order_id,
+            "status": "resolved",
+            "retry_count": retry_count,
+            "order_id": order_id,
+            "next_retry_at": None,
+        }
+
+    def _outcome_row(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        row = {
+            "id": result["failed_order_id"],
+            "status": result["status"],
+            "retry_count": result["retry_count"],
+            "next_retry_at": result["next_retry_at"],
+        }
+        if result["status"] != "resolved":
+            row["error_message"] = f"Retry failed: {result['error']}"
+            row["error_class"] = result["error_class"]
+        return row
+
+
+dlq_service = DLQService()
@@ -0,0 +1,335 @@
+import asyncio
+import glob
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.models.order import FailedOrder
+from app.schemas.order import OrderCreate
+
+STOCK_OUT = "stock_out"
+TRANSIENT = "transient"
+INVALID = "invalid"
+UNKNOWN = "unknown"
+
+# Error classes worth retrying automatically; invalid requests never succeed
+RETRYABLE_CLASSES = {STOCK_OUT, TRANSIENT, UNKNOWN}
+
+_TRANSIENT_MARKERS = (
+    "OperationalError",
+    "InterfaceError",
+    "DeadlockDetected",
+    "deadlock detected",
+    "SerializationFailure",
+    "could not serialize",
+    "TimeoutError",
+    "timed out",
+    "ConnectionDoesNotExist",
+    "connection was closed",
+    "QueuePool limit",
+)
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def classify_error(error: str) -> str:
+    """Bucket a checkout failure message into an error class."""
+    if "Insufficient stock" in error:
+        return STOCK_OUT
+    if "not found" in error:
+        return INVALID
+    if any(marker in error for marker in _TRANSIENT_MARKERS):
+        return TRANSIENT
+    return UNKNOWN
+
+
+def next_retry_at(
+    error_class: str, retry_count: int, now: datetime
+) -> Optional[datetime]:
+    """
+    Exponential backoff for automatic retries: base * 2^retry_count seconds,
+    capped. None when the row should not be retried automatically.
+    """
+    if error_class not in RETRYABLE_CLASSES or retry_count >= settings.DLQ_MAX_RETRIES:
+        return None
+    delay = min(
+        settings.DLQ_RETRY_BASE_SECONDS * (2**retry_count),
+        settings.DLQ_RETRY_MAX_SECONDS,
+    )
+    return now + timedelta(seconds=delay)
+
+
+def failed_order_row(order_in: OrderCreate, error: str, now: datetime) -> dict:
+    """Column values for a new FailedOrder row, classified and scheduled."""
+    error_class = classify_error(error)
+    return {
+        "user_id": order_in.user_id,
+        "store_id": order_in.store_id,
+        "payload": json.dumps(order_in.model_dump(), default=str),
+        "error_message": error,
+        "idempotency_key": order_in.idempotency_key,
+        "error_class": error_class,
+        "next_retry_at": next_retry_at(error_class, 0, now),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class DLQWriter:
+    """
+    Records failed checkouts off the request path.
+
+    `record` only enqueues; a background task drains the bounded queue and
+    inserts FailedOrder rows in batches. When the queue is full, or a batch
+    cannot be written because the database is the thing failing, rows are
+    appended to a local JSON-lines spill file (in a worker thread) and
+    re-ingested by the drainer after its next successful write, or on a
+    timer while it is idle.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        # Serialises appends with the rename that claims the file for replay
+        self._spill_lock = threading.Lock()
+        self._spilled = True  # unknown until the first replay
+        self._pending_spills: Set[asyncio.Task] = set()
+
+    def record(self, order_in: OrderCreate, error: str) -> None:
+        now = datetime.utcnow()
+        entry = (order_in, error, now)
+        if self._queue is None:
+            self._spill_in_background([self._to_row(entry)])
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            logger.warning(
+                "dlq_queue_full_spilled", idempotency_key=order_in.idempotency_key
+            )
+            self._spill_in_background([self._to_row(entry)])
+
+    def _to_row(self, entry) -> dict:
+        order_in, error, created_at = entry
+        return failed_order_row(order_in, error, created_at)
+
+    def _spill(self, rows: List[dict]) -> None:
+        lines = [json.dumps(row, default=str) + "\n" for row in rows]
+        with self._spill_lock:
+            with open(settings.DLQ_SPILL_PATH, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self._spilled = True
+
+    def _spill_in_background(self, rows: List[dict]) -> None:
+        """Append rows to the spill file without blocking the event loop."""
+        task = asyncio.ensure_future(asyncio.to_thread(self._spill, rows))
+        self._pending_spills.add(task)
+        task.add_done_callback(self._spill_done)
+
+    def _spill_done(self, task: asyncio.Task) -> None:
+        self._pending_spills.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("dlq_spill_failed", error=str(task.exception()))
+
+    async def _insert(self, rows: List[dict]) -> None:
+        async with async_session_factory() as db:
+            await db.execute(insert(FailedOrder), rows)
+            await db.commit()
+
+    async def _write(self, rows: List[dict]) -> bool:
+        """Insert a batch, spilling it on failure. Returns whether it was inserted."""
+        try:
+            await self._insert(rows)
+            return True
+        except Exception as e:
+            logger.error("dlq_batch_write_failed", error=str(e), rows=len(rows))
+            await asyncio.to_thread(self._spill, rows)
+            return False
+
+    async def _write_shielded(self, rows: List[dict]) -> bool:
+        """
+        Write a batch that cancelling the caller cannot interrupt: a cancelled
+        caller waits for the batch to be inserted (or spilled), then re-raises.
+        """
+        write = asyncio.ensure_future(self._write(rows))
+        try:
+            return await asyncio.shield(write)
+        except asyncio.CancelledError:
+            await write
+            raise
+
+    async def _drain_batch(self, batch: List[tuple]) -> None:
+        """
+        Wait for one entry (returning empty-handed after the spill replay
+        interval), then collect more for up to the flush interval. Entries
+        are appended to `batch` as they are taken off the queue, so the
+        caller still holds them if the drain is cancelled.
+        """
+        try:
+            batch.append(
+                await asyncio.wait_for(
+                    self._queue.get(), settings.DLQ_SPILL_REPLAY_INTERVAL_SECONDS
+                )
+            )
+        except asyncio.TimeoutError:
+            return
+        deadline = asyncio.get_running_loop().time() + (
+            settings.DLQ_FLUSH_INTERVAL_MS / 1000
+        )
+        while len(batch) < settings.DLQ_FLUSH_BATCH_SIZE:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    async def run(self) -> None:
+        """
+        Drain the queue in batches until cancelled. Spilled rows are replayed
+        at start, after the next successful write once something has been
+        spilled, and every DLQ_SPILL_REPLAY_INTERVAL_SECONDS while idle.
+        """
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.DLQ_QUEUE_MAX_SIZE)
+        loop = asyncio.get_running_loop()
+        await self.replay_spill()
+        next_replay = loop.time() + settings.DLQ_SPILL_REPLAY_INTERVAL_SECONDS
+        while True:
+            batch: List[tuple] = []
+            try:
+                await self._drain_batch(batch)
+            except asyncio.CancelledError:
+                # Already taken off the queue, so flush() would not see them
+                if batch:
+                    self._spill([self._to_row(entry) for entry in batch])
+                raise
+            if batch:
+                replay = await self._write_shielded(
+                    [self._to_row(entry) for entry in batch]
+                )
+            else:
+                replay = loop.time() >= next_replay
+            if replay and self._spilled:
+                await self.replay_spill()
+                next_replay = loop.time() + settings.DLQ_SPILL_REPLAY_INTERVAL_SECONDS
+
+    def _claim_spill_files(self) -> List[str]:
+        """
+        Take ownership of everything waiting to be replayed: files left
+        behind by replays of processes that have since died, then the live
+        spill file. Each is renamed first so concurrent spills go to a fresh
+        file and two processes never claim the same one.
+        """
+        path = settings.DLQ_SPILL_PATH
+        candidates = []
+        for leftover in sorted(glob.glob(f"{glob.escape(path)}.replaying-*")):
+            owner = leftover.rsplit("-", 1)[-1].split(".")[0]
+            if not owner.isdigit():
+                continue
+            # This process replays one file at a time, so its own are orphans too
+            if int(owner) == os.getpid() or not _process_alive(int(owner)):
+                candidates.append(leftover)
+        candidates.append(path)
+
+        claimed = []
+        # Under the spill lock so no append is half-way into a renamed file
+        with self._spill_lock:
+            self._spilled = False
+            for candidate in candidates:
+                target = f"{path}.replaying-{os.getpid()}.{uuid.uuid4().hex[:8]}"
+                try:
+                    os.replace(candidate, target)
+                except FileNotFoundError:
+                    continue
+                claimed.append(target)
+        return claimed
+
+    def _read_spill(self, replaying: str) -> List[dict]:
+        """
+        Parse a claimed spill file. Lines that cannot be turned back into a
+        FailedOrder row are moved to `<DLQ_SPILL_PATH>.rejected` for manual
+        inspection instead of blocking the rest of the file.
+        """
+        rows, rejected = [], []
+        with open(replaying, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(self._parse_spilled(line))
+                except (ValueError, KeyError, TypeError):
+                    rejected.append(line if line.endswith("\n") else line + "\n")
+        if rejected:
+            with open(
+                f"{settings.DLQ_SPILL_PATH}.rejected", "a", encoding="utf-8"
+            ) as f:
+                f.writelines(rejected)
+            logger.warning(
+                "dlq_spill_lines_rejected", file=replaying, lines=len(rejected)
+            )
+        return rows
+
+    def _parse_spilled(self, line: str) -> dict:
+        row = json.loads(line)
+        row["created_at"] = datetime.fromisoformat(row["created_at"])
+        row["updated_at"] = datetime.fromisoformat(row["updated_at"])
+        # Files spilled before rows were classified lack these columns
+        if "error_class" not in row:
+            row["error_class"] = classify_error(row["error_message"])
+            row["next_retry_at"] = next_retry_at(
+                row["error_class"], 0, row["created_at"]
+            )
+        elif row["next_retry_at"]:
+            row["next_retry_at"] = datetime.fromisoformat(row["next_retry_at"])
+        return row
+
+    async def replay_spill(self) -> int:
+        """
+        Re-ingest rows spilled to the local file, including files orphaned by
+        a replay that crashed part way. File work runs in a worker thread; on
+        a failed insert the rows are spilled back and retried next time.
+        """
+        total = 0
+        size = settings.DLQ_FLUSH_BATCH_SIZE
+        for replaying in await asyncio.to_thread(self._claim_spill_files):
+            rows = await asyncio.to_thread(self._read_spill, replaying)
+            for i in range(0, len(rows), size):
+                await self._write(rows[i : i + size])
+            await asyncio.to_thread(os.remove, replaying)
+            total += len(rows)
+        if total:
+            logger.info("dlq_spill_replayed", rows=total)
+        return total
+
+    async def flush(self) -> None:
+        """
+        Write whatever is still queued once the drainer has stopped, and wait
+        for spills still running in worker threads.
+        """
+        if self._pending_spills:
+            await asyncio.gather(*self._pending_spills, return_exceptions=True)
+        if self._queue is not None:
+            entries = []
+            while not self._queue.empty():
+                entries.append(self._queue.get_nowait())
+            self._queue = None
+            if entries:
+                await self._write_shielded([self._to_row(entry) for entry in entries])
+
+
+dlq_writer = DLQWriter()
@@ -1,41 +1,65 @@
+import random
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.repository import CountStrategy
+from app.db.session import async_session_factory
 from app.repositories.inventory_repo import inventory_repo
-from app.models.inventory import Inventory, InventorySnapshot
+from app.repositories.product_repo import product_repo
+from app.repositories.store_repo import store_repo
+from app.models.inventory import (
+    Inventory,
+    InventoryBucket,
+    InventorySnapshot,
+    SnapshotResolution,
+)
+from app.services.availability_index import availability_index
+from app.services.snapshot_writer import snapshot_writer
 
 
 class InventoryService:
-    async def create_snapshot(
-        self, db: AsyncSession, inventory: Inventory, reason: str
-    ) -> Optional[InventorySnapshot]:
-        # Snapshot Sampling: Only log critical events or 1 in every 5 updates
-        import random
-
-        is_critical = reason in ["manual_adjustment", "stock_out", "audit_failure"]
-        should_sample = random.random() < 0.2  # 20% sampling
-
-        if not is_critical and not should_sample:
-            inventory.last_snapshot_at = (
-                datetime.utcnow()
-            )  # Update timestamp even if no snapshot
-            return None
-
-        snapshot = InventorySnapshot(
-            inventory_id=inventory.id,
+    def __init__(self):
+        # (store_id, product_id) -> (inventory_id, bucket_count) for sharded rows
+        self._sharded: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._sharded_loaded_at = 0.0
+        # (product_id, store_id or None) -> available, for reads the
+        # availability index cannot answer
+        self._available_cache: TTLCache[int] = TTLCache(
+            maxsize=settings.AGGREGATE_CACHE_SIZE,
+            ttl=settings.AGGREGATE_CACHE_TTL_SECONDS,
+        )
+
+    def create_snapshot(
+        self, db: AsyncSession, inventory: Inventory, reason: str, delta: int = 0
+    ) -> None:
+        """
+        Stage a snapshot of `inventory` after a change of `delta` available
+        units. It is sampled and written by the snapshot writer once the
+        transaction commits.
+        """
+        available = inventory.quantity - inventory.reserved_quantity
+        snapshot_writer.stage(
+            db,
+            inventory.id,
             quantity=inventory.quantity,
             reserved_quantity=inventory.reserved_quantity,
-            timestamp=datetime.utcnow(),
             reason=reason,
+            previous_available=available - delta,
         )
-        db.add(snapshot)
-        inventory.last_snapshot_at = snapshot.timestamp
-        return snapshot
+        inventory.last_snapshot_at = datetime.utcnow()
 
     async def check_availability(
         self, db: AsyncSession, product_id: int, store_id: int, quantity: int
     ) -> bool:
+        available = availability_index.available(store_id, product_id)
+        if available is not None:
+            return available >= quantity
         inventory = await inventory_repo.get_by_product_and_store(
             db, product_id=product_id, store_id=store_id
         )
@@ -55,27 +79,548 @@ class InventoryService:
                 detail=f"Inventory for product {product_id} not found in store {store_id}",
             )
 
-        if inventory.available_quantity < quantity:
+        available = inventory.quantity - inventory.reserved_quantity
+        if available < quantity:
             raise HTTPException(
                 status_code=400,
-                detail=f"Insufficient stock for product {product_id}. Available: {inventory.available_quantity}, Requested: {quantity}",
+                detail=f"Insufficient stock for product {product_id}. Available: {available}, Requested: {quantity}",
             )
 
         # Lock / Reserve
         inventory.reserved_quantity += quantity
         db.add(inventory)
 
-        # Create Snapshot
-        await self.create_snapshot(db, inventory, reason="stock_reservation")
+        self.create_snapshot(db, inventory, "stock_reservation", delta=-quantity)
+        availability_index.stage(db, {(store_id, product_id): -quantity})
 
         # We DON'T commit here, allowing the caller (e.g. OrderService) to manage the transaction.
         return inventory
 
+    async def reserve_stock_batch(
+        self, db: AsyncSession, store_id: int, quantities: Dict[int, int]
+    ) -> List[Inventory]:
+        """
+        Reserve stock for a whole cart ({product_id: quantity}) in one round trip.
+
+        All rows are locked by a single SELECT ... FOR UPDATE in canonical
+        order, then validated and reserved in memory. Either every line is
+        reserved or an HTTPException is raised before anything is changed.
+        """
+        inventories = await inventory_repo.get_many_for_update(
+            db, store_id=store_id, product_ids=quantities.keys()
+        )
+        by_product = {inv.product_id: inv for inv in inventories}
+
+        for product_id, quantity in quantities.items():
+            inventory = by_product.get(product_id)
+            if not inventory:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Inventory for product {product_id} not found in store {store_id}",
+                )
+            # Parent pool only: sharded rows keep the rest of their stock in buckets
+            available = inventory.quantity - inventory.reserved_quantity
+            if available < quantity:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Insufficient stock for product {product_id}. Available: {available}, Requested: {quantity}",
+                )
+
+        for inventory in inventories:
+            quantity = quantities[inventory.product_id]
+            inventory.reserved_quantity += quantity
+            self.create_snapshot(db, inventory, "stock_reservation", delta=-quantity)
+        availability_index.stage(
+            db, {(store_id, pid): -q for pid, q in quantities.items()}
+        )
+
+        # As with reserve_stock, the caller owns the transaction.
+        return inventories
+
+    async def reserve_stock_conditional(
+        self, db: AsyncSession, store_id: int, quantities: Dict[int, int]
+    ) -> None:
+        """
+        Reserve a cart with a single guarded UPDATE instead of SELECT ... FOR UPDATE.
+
+        Row locks are only taken by the UPDATE itself, so issuing it as the
+        last statement before commit keeps them held for one statement rather
+        than the whole checkout. On a shortfall the rows that did match have
+        already been updated, so the caller must roll back.
+        """
+        rows = await inventory_repo.reserve_conditional(
+            db, store_id=store_id, quantities=quantities
+        )
+        reserved = {row.product_id for row in rows}
+
+        missing = [pid for pid in quantities if pid not in reserved]
+        if missing:
+            available = await inventory_repo.get_available_by_products(
+                db, store_id=store_id, product_ids=missing
+            )
+            for product_id in missing:
+                if product_id not in available:
+                    raise HTTPException(
+                        status_code=404,
+                        detail=f"Inventory for product {product_id} not found in store {store_id}",
+                    )
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Insufficient stock for product {product_id}. Available: {available[product_id]}, Requested: {quantities[product_id]}",
+                )
+
+        availability_index.stage(
+            db, {(store_id, pid): -q for pid, q in quantities.items()}
+        )
+        for row in rows:
+            snapshot_writer.stage(
+                db,
+                row.id,
+                quantity=row.quantity,
+                reserved_quantity=row.reserved_quantity,
+                reason="stock_reservation",
+                previous_available=row.quantity
+                - row.reserved_quantity
+                + quantities[row.product_id],
+            )
+
+    async def reserve_items(
+        self, db: AsyncSession, store_id: int, quantities: Dict[int, int]
+    ) -> None:
+        """
+        Reserve a cart using the engine selected by settings.RESERVATION_STRATEGY.
+
+        With sharding enabled, lines for sharded rows are reserved from their
+        buckets after the regular lines, in product order.
+        """
+        sharded = {}
+        if settings.INVENTORY_SHARDING_ENABLED:
+            registry = await self._get_sharded_registry(db)
+            sharded = {
+                pid: registry[(store_id, pid)]
+                for pid in quantities
+                if (store_id, pid) in registry
+            }
+
+        regular = {pid: q for pid, q in quantities.items() if pid not in sharded}
+        if regular:
+            if settings.RESERVATION_STRATEGY == "conditional_update":
+                await self.reserve_stock_conditional(db, store_id, regular)
+            else:
+                await self.reserve_stock_batch(db, store_id, regular)
+
+        for product_id in sorted(sharded):
+            inventory_id, bucket_count = sharded[product_id]
+            await self.reserve_from_buckets(
+                db,
+                store_id=store_id,
+                product_id=product_id,
+                inventory_id=inventory_id,
+                bucket_count=bucket_count,
+                quantity=quantities[product_id],
+            )
+            availability_index.stage(
+                db, {(store_id, product_id): -quantities[product_id]}
+            )
+
+    async def reserve_for_carts(
+        self, db: AsyncSession, store_id: int, carts: List[Dict[int, int]]
+    ) -> List[Optional[str]]:
+        """
+        Reserve stock for many carts of one store in a single lock pass.
+
+        The union of SKUs is locked once (regular rows first, then sharded
+        rows, each in product order, as in reserve_items). Carts are then
+        served in submission order against the in-memory availability. A cart
+        that cannot be served in full reserves nothing and gets an error
+        message. Returns one entry per cart: None on success, else the error.
+        """
+        product_ids = {pid for cart in carts for pid in cart}
+        sharded: Dict[int, int] = {}
+        if settings.INVENTORY_SHARDING_ENABLED:
+            registry = await self._get_sharded_registry(db)
+            sharded = {
+                pid: registry[(store_id, pid)][0]
+                for pid in product_ids
+                if (store_id, pid) in registry
+            }
+
+        rows = await inventory_repo.get_many_for_update(
+            db, store_id=store_id, product_ids=product_ids - sharded.keys()
+        )
+        regular = {inv.product_id: inv for inv in rows}
+        available = {
+            pid: inv.quantity - inv.reserved_quantity for pid, inv in regular.items()
+        }
+
+        pooled: Dict[int, Tuple[Inventory, List[InventoryBucket]]] = {}
+        for pid in sorted(sharded):
+            parent, buckets = await inventory_repo.lock_with_buckets(
+                db, inventory_id=sharded[pid]
+            )
+            if parent:
+                self._collapse(parent, buckets)
+                pooled[pid] = (parent, buckets)
+                available[pid] = parent.quantity - parent.reserved_quantity
+
+        errors: List[Optional[str]] = []
+        taken: Dict[int, int] = {}
+        for cart in carts:
+            error = None
+            for pid, quantity in cart.items():
+                if pid not in available:
+                    error = f"Inventory for product {pid} not found in store {store_id}"
+                    break
+                if available[pid] < quantity:
+                    error = f"Insufficient stock for product {pid}. Available: {available[pid]}, Requested: {quantity}"
+                    break
+            if error is None:
+                for pid, quantity in cart.items():
+                    available[pid] -= quantity
+                    taken[pid] = taken.get(pid, 0) + quantity
+            errors.append(error)
+
+        increments = {regular[pid].id: q for pid, q in taken.items() if pid in regular}
+        if increments:
+            await inventory_repo.add_reserved(db, increments=increments)
+        for pid, (parent, buckets) in pooled.items():
+            parent.reserved_quantity += taken.get(pid, 0)
+            self._redistribute(parent, buckets)
+        availability_index.stage(db, {(store_id, pid): -q for pid, q in taken.items()})
+
+        for pid, quantity in taken.items():
+            if pid in regular:
+                inventory = regular[pid]
+                # add_reserved bypassed the loaded object, which still has the old value
+                snapshot_writer.stage(
+                    db,
+                    inventory.id,
+                    quantity=inventory.quantity,
+                    reserved_quantity=inventory.reserved_quantity + quantity,
+                    reason="stock_reservation",
+                    previous_available=inventory.quantity - inventory.reserved_quantity,
+                )
+
+        return errors
+
+    # --- Split-counter (sharded) inventory ---
+
+    async def _get_sharded_registry(
+        self, db: AsyncSession
+    ) -> Dict[Tuple[int, int], Tuple[int, int]]:
+        if (
+            time.monotonic() - self._sharded_loaded_at
+            > settings.INVENTORY_SHARD_REGISTRY_TTL_SECONDS
+        ):
+            rows = await inventory_repo.get_sharded(db)
+            self._sharded = {
+                (row.store_id, row.product_id): (row.id, row.bucket_count)
+                for row in rows
+            }
+            self._sharded_loaded_at = time.monotonic()
+        return self._sharded
+
+    def invalidate_sharded_registry(self) -> None:
+        self._sharded_loaded_at = 0.0
+
+    def _collapse(self, parent: Inventory, buckets: List[InventoryBucket]) -> None:
+        """Move all stock and reservations from the buckets into the parent pool."""
+        for bucket in buckets:
+            parent.quantity += bucket.quantity
+            parent.reserved_quantity += bucket.reserved_quantity
+            bucket.quantity = 0
+            bucket.reserved_quantity = 0
+
+    def _fold(self, parent: Inventory, buckets: List[InventoryBucket]) -> None:
+        """Move only the reserved units into the parent, leaving free stock in place."""
+        for bucket in buckets:
+            parent.quantity += bucket.reserved_quantity
+            parent.reserved_quantity += bucket.reserved_quantity
+            bucket.quantity -= bucket.reserved_quantity
+            bucket.reserved_quantity = 0
+
+    def _redistribute(self, parent: Inventory, buckets: List[InventoryBucket]) -> None:
+        """
+        Spread free stock evenly over the parent pool and the buckets.
+        Totals are preserved; the parent keeps one share plus the remainder.
+        """
+        free = (parent.quantity - parent.reserved_quantity) + sum(
+            b.available_quantity for b in buckets
+        )
+        share = max(free, 0) // (len(buckets) + 1)
+        for bucket in buckets:
+            moved = bucket.reserved_quantity + share - bucket.quantity
+            bucket.quantity += moved
+            parent.quantity -= moved
+
+    async def reserve_from_buckets(
+        self,
+        db: AsyncSession,
+        *,
+        store_id: int,
+        product_id: int,
+        inventory_id: int,
+        bucket_count: int,
+        quantity: int,
+    ) -> None:
+        """
+        Reserve one line of a sharded row.
+
+        A random bucket is tried first, then its siblings, each with a
+        guarded single-row UPDATE. When no bucket can cover the line the
+        buckets and then the parent are locked, pooled and respread. The
+        parent is never locked on its own here, so this path takes locks in
+        the same buckets-then-parent order as rebalancing and folding.
+
+        The probes run inside a savepoint: an UPDATE that waited on a busy
+        bucket keeps its row lock even when the guard then fails, so those
+        out-of-order locks are released before the ordered fallback.
+        """
+        probes = await db.begin_nested()
+        start = random.randrange(bucket_count)
+        for offset in range(bucket_count):
+            reserved = await inventory_repo.reserve_from_bucket(
+                db,
+                inventory_id=inventory_id,
+                bucket_index=(start + offset) % bucket_count,
+                quantity=quantity,
+            )
+            if reserved:
+                await probes.commit()
+                return
+        await probes.rollback()
+
+        parent, buckets = await inventory_repo.lock_with_buckets(
+            db, inventory_id=inventory_id
+        )
+        if not parent:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Inventory for product {product_id} not found in store {store_id}",
+            )
+
+        self._collapse(parent, buckets)
+        available = parent.quantity - parent.reserved_quantity
+        if available < quantity:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for product {product_id}. Available: {available}, Requested: {quantity}",
+            )
+        parent.reserved_quantity += quantity
+        self._redistribute(parent, buckets)
+
+    async def fold_buckets(
+        self, db: AsyncSession, keys: Iterable[Tuple[int, int]]
+    ) -> None:
+        """
+        Move bucket reservations of the given (store_id, product_id) rows into
+        their parent rows, so release/consume paths can work on the parent
+        alone. Unsharded keys are ignored. The caller owns the transaction.
+        """
+        for inventory_id in await inventory_repo.get_sharded_ids(db, keys=keys):
+            parent, buckets = await inventory_repo.lock_with_buckets(
+                db, inventory_id=inventory_id
+            )
+            if parent:
+                self._fold(parent, buckets)
+
+    async def apply_stock_deltas(
+        self, db: AsyncSession, deltas: Dict[Tuple[int, int], Tuple[int, int]]
+    ) -> None:
+        """
+        Apply {(store_id, product_id): (quantity_delta, reserved_delta)} with
+        one UPDATE. Rows are locked in the checkout order (regular rows, then
+        sharded rows with buckets folded in) so this can run alongside
+        checkouts without deadlocking. The caller owns the transaction.
+        """
+        if not deltas:
+            return
+        await inventory_repo.lock_many_for_update(
+            db, keys=deltas.keys(), regular_only=settings.INVENTORY_SHARDING_ENABLED
+        )
+        if settings.INVENTORY_SHARDING_ENABLED:
+            await self.fold_buckets(db, deltas.keys())
+        # Stage what the UPDATE wrote: reserved_quantity is clamped at zero
+        for store_id, product_id, available in await inventory_repo.apply_stock_deltas(
+            db, deltas=deltas
+        ):
+            availability_index.stage_value(db, store_id, product_id, available)
+
+    async def rebalance_buckets(self, db: AsyncSession, inventory_id: int) -> None:
+        parent, buckets = await inventory_repo.lock_with_buckets(
+            db, inventory_id=inventory_id
+        )
+        if parent and buckets:
+            self._redistribute(parent, buckets)
+
+    async def configure_buckets(
+        self, db: AsyncSession, inventory_id: int, bucket_count: int
+    ) -> Inventory:
+        """
+        Turn split-counter mode on (bucket_count > 1), resize it, or turn it
+        off (bucket_count == 1). All stock is pooled into the parent first, so
+        reported totals never change.
+        """
+        parent, buckets = await inventory_repo.lock_with_buckets(
+            db, inventory_id=inventory_id
+        )
+        if not parent:
+            raise HTTPException(status_code=404, detail="Inventory not found")
+
+        self._collapse(parent, buckets)
+        wanted = bucket_count if bucket_count > 1 else 0
+        for bucket in buckets[wanted:]:
+            await db.delete(bucket)
+        kept = buckets[:wanted]
+        for index in range(len(kept), wanted):
+            bucket = InventoryBucket(
+                inventory_id=parent.id,
+                bucket_index=index,
+                quantity=0,
+                reserved_quantity=0,
+            )
+            db.add(bucket)
+            kept.append(bucket)
+
+        parent.bucket_count = bucket_count
+        self._redistribute(parent, kept)
+        await db.commit()
+        self.invalidate_sharded_registry()
+
+        await db.refresh(parent, attribute_names=["buckets"])
+        return parent
+
+    async def sync_inventory(
+        self, db: AsyncSession, *, store_id: int, items: List
+    ) -> dict:
+        """
+        Apply a warehouse stock feed for one store in a single transaction.
+
+        Each line sets the on-hand quantity of a SKU (batch_id / location_id
+        are kept when omitted). Valid lines are COPY-staged into a temp table
+        and upserted with one statement; sharded SKUs go through their
+        buckets instead. A line fails when its product is unknown, it appears
+        twice in the feed, or its quantity is below the stock already
+        reserved. Changed rows get one snapshot each, inserted in bulk.
+        """
+        if not await store_repo.get_existing_ids(db, [store_id]):
+            raise HTTPException(status_code=404, detail="Store not found")
+
+        errors: Dict[int, str] = {}
+        counts: Dict[int, int] = {}
+        for item in items:
+            counts[item.product_id] = counts.get(item.product_id, 0) + 1
+        known = await product_repo.get_existing_ids(db, counts.keys())
+        for product_id, count in counts.items():
+            if product_id not in known:
+                errors[product_id] = "Product not found"
+            elif count > 1:
+                errors[product_id] = "Product listed more than once"
+
+        rows = [
+            (item.product_id, item.quantity, item.batch_id, item.location_id)
+            for item in items
+            if item.product_id not in errors
+        ]
+        now = datetime.utcnow()
+        snapshots = []
+        if rows:
+            await inventory_repo.stage_sync_rows(db, rows=rows)
+            sharded = await inventory_repo.take_sharded_from_stage(
+                db, store_id=store_id
+            )
+            # Regular rows first, then sharded rows: the checkout lock order
+            for row in await inventory_repo.upsert_from_stage(
+                db, store_id=store_id, now=now
+            ):
+                snapshots.append((row.id, row.quantity, row.reserved_quantity))
+                availability_index.stage_value(
+                    db, store_id, row.product_id, row.quantity - row.reserved_quantity
+                )
+            for row in await inventory_repo.get_stage_rejects(db, store_id=store_id):
+                errors[row.product_id] = (
+                    f"Quantity below reserved stock ({row.reserved_quantity})"
+                )
+
+            for row in sharded:
+                parent, buckets = await inventory_repo.lock_with_buckets(
+                    db, inventory_id=row.id
+                )
+                reserved = parent.reserved_quantity + sum(
+                    b.reserved_quantity for b in buckets
+                )
+                on_hand = parent.quantity + sum(b.quantity for b in buckets)
+                if row.quantity < reserved:
+                    errors[row.product_id] = (
+                        f"Quantity below reserved stock ({reserved})"
+                    )
+                    continue
+                if row.quantity == on_hand and (
+                    row.batch_id in (None, parent.batch_id)
+                    and row.location_id in (None, parent.location_id)
+                ):
+                    continue
+                self._collapse(parent, buckets)
+                parent.quantity = row.quantity
+                parent.batch_id = row.batch_id or parent.batch_id
+                parent.location_id = row.location_id or parent.location_id
+                parent.last_snapshot_at = now
+                self._redistribute(parent, buckets)
+                snapshots.append((parent.id, row.quantity, parent.reserved_quantity))
+                availability_index.stage_value(
+                    db, store_id, row.product_id, row.quantity - reserved
+                )
+
+            if snapshots:
+                await db.execute(
+                    insert(InventorySnapshot),
+                    [
+                        {
+                            "inventory_id": inventory_id,
+                            "quantity": quantity,
+                            "reserved_quantity": reserved,
+                            "timestamp": now,
+                            "reason": "warehouse_sync",
+                        }
+                        for inventory_id, quantity, reserved in snapshots
+                    ],
+                )
+        await db.commit()
+
+        failed = sum(1 for item in items if item.product_id in errors)
+        logger.info(
+            "inventory_synced",
+            store_id=store_id,
+            lines=len(items),
+            changed=len(snapshots),
+            failed=failed,
+        )
+        return {
+            "store_id": store_id,
+            "synced": len(items) - failed,
+            "changed": len(snapshots),
+            "failed": failed,
+            "errors": [
+                {"product_id": product_id, "error": error}
+                for product_id, error in errors.items()
+            ],
+            "timestamp": now,
+        }
+
     async def get_inventory_by_store(
-        self, db: AsyncSession, store_id: int, skip: int = 0, limit: int = 100
-    ) -> Tuple[List[Inventory], int]:
+        self,
+        db: AsyncSession,
+        store_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[Inventory], Optional[int]]:
         return await inventory_repo.get_by_store(
-            db, store_id=store_id, skip=skip, limit=limit
+            db,
+            store_id=store_id,
+            skip=skip,
+            limit=limit,
+            count_strategy=count_strategy,
         )
 
     async def get_low_stock_items(
@@ -85,8 +630,48 @@ class InventoryService:
             db, threshold=threshold, store_id=store_id
         )
 
-    async def get_total_available_stock(self, db: AsyncSession, product_id: int) -> int:
-        return await inventory_repo.aggregate_stock(db, product_id=product_id)
+    async def get_total_available_stock(
+        self, db: AsyncSession, product_id: int, store_id: Optional[int] = None
+    ) -> int:
+        """Free stock of a product across all stores, or in one store."""
+        totals = await self.get_available_stock_many(
+            db, product_ids=[product_id], store_id=store_id
+        )
+        return totals[product_id]
+
+    async def get_available_stock_many(
+        self,
+        db: AsyncSession,
+        product_ids: Iterable[int],
+        store_id: Optional[int] = None,
+    ) -> Dict[int, int]:
+        """
+        {product_id: free stock} across all stores, or in one store. Served
+        from the availability index once it is loaded, else from a short-TTL
+        cache; whatever is left is read with one GROUP BY query.
+        """
+        totals: Dict[int, int] = {}
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            if store_id is None:
+                available = availability_index.total(product_id)
+            else:
+                available = availability_index.available(store_id, product_id)
+            if available is None:
+                available = self._available_cache.get((product_id, store_id))
+            if available is None:
+                missing.append(product_id)
+            else:
+                totals[product_id] = available
+
+        if missing:
+            found = await inventory_repo.aggregate_stock(
+                db, product_ids=missing, store_id=store_id
+            )
+            for product_id in missing:
+                totals[product_id] = found.get(product_id, 0)
+                self._available_cache.set((product_id, store_id), totals[product_id])
+        return totals
 
     async def get_inventory_item(
         self, db: AsyncSession, product_id: int, store_id: int
@@ -95,16 +680,105 @@ class InventoryService:
             db, product_id=product_id, store_id=store_id
         )
 
+    def pick_snapshot_resolution(
+        self, since: Optional[datetime], now: datetime
+    ) -> SnapshotResolution:
+        """
+        Finest tier still holding all of the window from `since`: raw rows
+        younger than SNAPSHOT_RAW_RETENTION_HOURS, minute buckets younger than
+        SNAPSHOT_MINUTE_RETENTION_DAYS, hour buckets beyond that.
+        """
+        if since is None:
+            return SnapshotResolution.HOUR
+        if since >= now - timedelta(hours=settings.SNAPSHOT_RAW_RETENTION_HOURS):
+            return SnapshotResolution.RAW
+        if since >= now - timedelta(days=settings.SNAPSHOT_MINUTE_RETENTION_DAYS):
+            return SnapshotResolution.MINUTE
+        return SnapshotResolution.HOUR
+
     async def get_snapshots(
         self,
         db: AsyncSession,
         store_id: Optional[int] = None,
+        resolution: SnapshotResolution = SnapshotResolution.RAW,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
         skip: int = 0,
         limit: int = 50,
-    ) -> Tuple[List[InventorySnapshot], int]:
-        return await inventory_repo.get_snapshots(
-            db, store_id=store_id, skip=skip, limit=limit
+        cursor: Optional[str] = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[SnapshotResolution, List[Any], Optional[int], Optional[str]]:
+        """
+        Snapshot history at `resolution` (AUTO picks one from `since`).
+        Returns the resolution served with the page: snapshot rows for RAW,
+        bucket rows otherwise.
+        """
+        if resolution == SnapshotResolution.AUTO:
+            resolution = self.pick_snapshot_resolution(since, datetime.utcnow())
+        page = dict(
+            store_id=store_id,
+            since=since,
+            until=until,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            count_strategy=count_strategy,
+        )
+        if resolution == SnapshotResolution.RAW:
+            return resolution, *await inventory_repo.get_snapshots(db, **page)
+        return resolution, *await inventory_repo.get_snapshot_buckets(
+            db, resolution=resolution, **page
         )
 
+    async def stream_snapshot_series(
+        self,
+        *,
+        resolution: SnapshotResolution,
+        store_id: Optional[int] = None,
+        product_id: Optional[int] = None,
+        inventory_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Yield one columnar series per inventory row as soon as its points have
+        been read. Uses its own session, since a streamed response outlives
+        the request's dependencies.
+        """
+        bucketed = resolution != SnapshotResolution.RAW
+        series = None
+        async with async_session_factory() as db:
+            async for row in inventory_repo.stream_snapshot_series(
+                db,
+                resolution=resolution,
+                store_id=store_id,
+                product_id=product_id,
+                inventory_id=inventory_id,
+                since=since,
+                until=until,
+            ):
+                if series is None or series["inventory_id"] != row.inventory_id:
+                    if series is not None:
+                        yield series
+                    series = {
+                        "inventory_id": row.inventory_id,
+                        "store_id": row.store_id,
+                        "product_name": row.product_name,
+                        "timestamps": [],
+                        "quantity": [],
+                        "reserved_quantity": [],
+                    }
+                    if bucketed:
+                        series["quantity_min"] = []
+                        series["quantity_max"] = []
+                series["timestamps"].append(row.timestamp.isoformat())
+                series["quantity"].append(row.quantity)
+                series["reserved_quantity"].append(row.reserved_quantity)
+                if bucketed:
+                    series["quantity_min"].append(row.quantity_min)
+                    series["quantity_max"].append(row.quantity_max)
+        if series is not None:
+            yield series
+
 
 inventory_service = InventoryService()
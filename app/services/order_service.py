@@ -1,13 +1,22 @@
 import time
-import json
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
-from sqlalchemy import select, func
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
+from app.repositories.failed_order_repo import failed_order_repo
 from app.repositories.order_repo import order_repo
 from app.repositories.product_repo import product_repo
+from app.repositories.store_repo import store_repo
+from app.repositories.user_repo import user_repo
+from app.services.dlq_writer import dlq_writer, failed_order_row
 from app.services.inventory_service import inventory_service
+from app.services.reservation_scheduler import reservation_scheduler
+from app.services.store_load import (
+    compute_load_metrics,
+    load_window_start,
+    store_load_tracker,
+)
 from app.schemas.order import OrderCreate
 from app.models.order import (
     Order,
@@ -16,11 +25,114 @@ from app.models.order import (
     OrderStatusHistory,
     FailedOrder,
 )
+from app.core.batching import MicroBatcher
+from app.core.cache import TTLCache
+from app.core.pagination import decode_cursor, keyset_page
+from app.core.repository import CountStrategy
+from app.core.config import settings
 from app.core.logging import logger
+from app.core.singleflight import SingleFlight
+from app.db.session import async_session_factory
+
+# Default reservation expiry
+RESERVATION_TTL = timedelta(minutes=15)
 
 
 class OrderService:
-    async def create_order(self, db: AsyncSession, order_in: OrderCreate) -> Order:
+    def __init__(self):
+        # idempotency_key -> order id of recently completed checkouts
+        self._completed_keys: TTLCache[int] = TTLCache(
+            maxsize=settings.IDEMPOTENCY_CACHE_SIZE,
+            ttl=settings.IDEMPOTENCY_CACHE_TTL_SECONDS,
+        )
+        self._inflight = SingleFlight()
+        # Multi-store load snapshots, keyed by the requested store ids
+        self._stores_load: TTLCache[List[dict]] = TTLCache(
+            maxsize=256, ttl=settings.STORE_LOAD_SNAPSHOT_TTL_SECONDS
+        )
+        self._stores_load_flight = SingleFlight()
+        self._checkout_batcher: MicroBatcher[OrderCreate, dict] = MicroBatcher(
+            self._run_checkout_batch,
+            window_ms=settings.CHECKOUT_BATCH_WINDOW_MS,
+            max_size=settings.CHECKOUT_BATCH_MAX_SIZE,
+        )
+
+    async def create_order(
+        self, db: AsyncSession, order_in: OrderCreate, record_failure: bool = True
+    ) -> Order:
+        """
+        Idempotent checkout entry point.
+
+        Keys completed recently are answered from the local cache with a
+        primary-key read. Concurrent requests with the same key are coalesced:
+        only the first runs the checkout, the others await its outcome and
+        then load the resulting order in their own session.
+
+        With record_failure=False (DLQ replays) a failed checkout is not
+        pushed to the DLQ again; the original exception is re-raised instead.
+        """
+        key = order_in.idempotency_key
+        cached_id = self._completed_keys.get(key)
+        if cached_id is not None:
+            order = await order_repo.get(db, id=cached_id)
+            if order:
+                logger.info(
+                    "idempotency_hit",
+                    idempotency_key=key,
+                    order_id=order.id,
+                    source="cache",
+                )
+                return order
+
+        leader_order: Optional[Order] = None
+        is_leader = False
+
+        async def checkout() -> int:
+            nonlocal leader_order, is_leader
+            is_leader = True
+            if settings.CHECKOUT_BATCH_WINDOW_MS > 0 and record_failure:
+                return await self._create_order_batched(order_in)
+            leader_order = await self._create_order(db, order_in, record_failure)
+            return leader_order.id
+
+        order_id = await self._inflight.do(key, checkout)
+        if leader_order is not None:
+            return leader_order
+
+        if not is_leader:
+            logger.info(
+                "idempotency_hit",
+                idempotency_key=key,
+                order_id=order_id,
+                source="in_flight",
+            )
+        return await order_repo.get(db, id=order_id)
+
+    async def _create_order_batched(self, order_in: OrderCreate) -> int:
+        """
+        Queue the checkout with others for the same store; they are executed
+        together in one transaction. Returns the order id or raises like the
+        unbatched path does.
+        """
+        result = await self._checkout_batcher.submit(order_in.store_id, order_in)
+        if result["status"] == "failed":
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to create order. Recorded in DLQ. Error: {result['error']}",
+            )
+        return result["order_id"]
+
+    async def _run_checkout_batch(
+        self, store_id: int, orders_in: List[OrderCreate]
+    ) -> List[dict]:
+        async with async_session_factory() as db:
+            results = await self.create_orders_batch(db, orders_in)
+        logger.info("checkout_batch_flushed", store_id=store_id, size=len(orders_in))
+        return results
+
+    async def _create_order(
+        self, db: AsyncSession, order_in: OrderCreate, record_failure: bool = True
+    ) -> Order:
         start_time = time.time()
 
         # 1. Idempotency Check
@@ -33,42 +145,40 @@ class OrderService:
                 idempotency_key=order_in.idempotency_key,
                 order_id=existing_order.id,
             )
+            self._completed_keys.set(order_in.idempotency_key, existing_order.id)
             return existing_order
 
         # 2. Reserve Inventory and calculate total
         try:
             total_amount = 0.0
             order_items_to_create = []
-            # Default reservation expiry: 15 minutes
-            expiry_time = datetime.utcnow() + timedelta(minutes=15)
+            expiry_time = datetime.utcnow() + RESERVATION_TTL
 
+            # Collapse duplicate lines so each SKU is validated against its total
+            requested = {}
             for item in order_in.items:
-                # Fetch product for price
-                product = await product_repo.get(db, id=item.product_id)
-                if not product:
-                    raise ValueError(f"Product {item.product_id} not found")
-
-                # Reserve stock (this now uses FOR UPDATE locking)
-                await inventory_service.reserve_stock(
-                    db,
-                    product_id=item.product_id,
-                    store_id=order_in.store_id,
-                    quantity=item.quantity,
+                requested[item.product_id] = (
+                    requested.get(item.product_id, 0) + item.quantity
                 )
 
-                # Prepare OrderItem
+            # Fetch all prices in one query
+            prices = await product_repo.get_prices(db, ids=requested.keys())
+            for product_id in requested:
+                if product_id not in prices:
+                    raise ValueError(f"Product {product_id} not found")
+
+            for item in order_in.items:
+                price = prices[item.product_id]
                 db_item = OrderItem(
                     product_id=item.product_id,
                     quantity=item.quantity,
-                    price_at_order=product.price,
+                    price_at_order=price,
                     reservation_expires_at=expiry_time,
                 )
                 order_items_to_create.append(db_item)
-                total_amount += product.price * item.quantity
+                total_amount += price * item.quantity
 
             # 3. Create Order
-            checkout_latency = (time.time() - start_time) * 1000
-
             db_order = Order(
                 user_id=order_in.user_id,
                 store_id=order_in.store_id,
@@ -76,7 +186,6 @@ class OrderService:
                 idempotency_key=order_in.idempotency_key,
                 status=OrderStatus.PENDING,
                 items=order_items_to_create,
-                checkout_latency_ms=round(checkout_latency, 2),
             )
 
             # Record initial timeline entry
@@ -84,23 +193,31 @@ class OrderService:
                 OrderStatusHistory(status=OrderStatus.PENDING, notes="Order created")
             )
 
+            # Insert the order rows before touching inventory so that constraint
+            # failures surface without holding stock locks, and the locks taken
+            # below are only held for the reservation itself and the commit.
             db.add(db_order)
+            await db.flush()
+
+            # 4. Lock and reserve every line at once (canonical order)
+            await inventory_service.reserve_items(
+                db, store_id=order_in.store_id, quantities=requested
+            )
+
+            db_order.checkout_latency_ms = round((time.time() - start_time) * 1000, 2)
             await db.commit()
             await db.refresh(db_order)
+            self._completed_keys.set(order_in.idempotency_key, db_order.id)
+            store_load_tracker.record_created(order_in.store_id)
+            reservation_scheduler.schedule([db_order.id], expiry_time)
             return db_order
 
         except Exception as e:
             await db.rollback()
-            # Push to DLQ: FailedOrder
-            failed_order = FailedOrder(
-                user_id=order_in.user_id,
-                store_id=order_in.store_id,
-                payload=json.dumps(order_in.model_dump(), default=str),
-                error_message=str(e),
-                idempotency_key=order_in.idempotency_key,
-            )
-            db.add(failed_order)
-            await db.commit()
+            if not record_failure:
+                raise
+            # Push to DLQ: written asynchronously in batches by the DLQ writer
+            dlq_writer.record(order_in, str(e))
 
             logger.error(
                 "order_creation_failed_pushed_to_dlq",
@@ -115,6 +232,286 @@ class OrderService:
 
         return db_order
 
+    async def create_orders_batch(
+        self, db: AsyncSession, orders_in: List[OrderCreate]
+    ) -> List[dict]:
+        """
+        Ingest many orders at once with set-based statements.
+
+        Idempotency keys, prices, users and stores are resolved with one query
+        each. Orders are then grouped by store and every group runs in its own
+        transaction: one lock pass over the group's SKUs, in-memory allocation
+        in submission order, and bulk INSERTs for orders, items, timeline rows
+        and DLQ entries. A group whose transaction fails is retried one order
+        at a time. Returns one result per submitted order, in order.
+        """
+        results: List[Optional[dict]] = [None] * len(orders_in)
+
+        # 1. Idempotency: keys repeated inside the batch resolve to their first
+        # occurrence, keys already stored (or cached) are answered directly.
+        first_index: Dict[str, int] = {}
+        for i, order_in in enumerate(orders_in):
+            first_index.setdefault(order_in.idempotency_key, i)
+
+        existing = await order_repo.get_ids_by_idempotency_keys(
+            db, idempotency_keys=first_index.keys()
+        )
+        for key, i in first_index.items():
+            order_id = existing.get(key)
+            if order_id is not None:
+                self._completed_keys.set(key, order_id)
+                results[i] = {
+                    "idempotency_key": key,
+                    "status": "idempotent",
+                    "order_id": order_id,
+                }
+
+        todo = [i for i in first_index.values() if results[i] is None]
+
+        # 2. Reference data for everything still to create
+        product_ids = {item.product_id for i in todo for item in orders_in[i].items}
+        prices = await product_repo.get_prices(db, ids=product_ids)
+        users = await user_repo.get_existing_ids(
+            db, {orders_in[i].user_id for i in todo}
+        )
+        stores = await store_repo.get_existing_ids(
+            db, {orders_in[i].store_id for i in todo}
+        )
+        await db.commit()
+
+        groups: Dict[int, List[int]] = {}
+        rejected: List[Tuple[int, str]] = []
+        for i in todo:
+            order_in = orders_in[i]
+            missing = [
+                item.product_id
+                for item in order_in.items
+                if item.product_id not in prices
+            ]
+            if order_in.user_id not in users:
+                rejected.append((i, f"User {order_in.user_id} not found"))
+            elif order_in.store_id not in stores:
+                rejected.append((i, f"Store {order_in.store_id} not found"))
+            elif missing:
+                rejected.append((i, f"Product {missing[0]} not found"))
+            else:
+                groups.setdefault(order_in.store_id, []).append(i)
+
+        if rejected:
+            refs = await self._record_failed_batch(
+                db, [(orders_in[i], error) for i, error in rejected]
+            )
+            await db.commit()
+            for i, error in rejected:
+                results[i] = self._failed_result(orders_in[i], error, refs)
+
+        # 3. One transaction per store
+        for store_id in sorted(groups):
+            indexes = groups[store_id]
+            expiry_time = datetime.utcnow() + RESERVATION_TTL
+            try:
+                outcomes = await self._create_store_batch(
+                    db, store_id, [orders_in[i] for i in indexes], prices, expiry_time
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.error(
+                    "order_batch_group_failed", store_id=store_id, error=str(e)
+                )
+                outcomes = await self._create_store_orders_one_by_one(
+                    db, store_id, [orders_in[i] for i in indexes], prices, expiry_time
+                )
+
+            created = 0
+            for i, outcome in zip(indexes, outcomes):
+                results[i] = outcome
+                if outcome["status"] == "created":
+                    created += 1
+                    self._completed_keys.set(
+                        outcome["idempotency_key"], outcome["order_id"]
+                    )
+            if created:
+                store_load_tracker.record_created(store_id, created)
+                reservation_scheduler.schedule(
+                    [o["order_id"] for o in outcomes if o["status"] == "created"],
+                    expiry_time,
+                )
+
+        # 4. In-batch duplicates mirror their first occurrence
+        for i, order_in in enumerate(orders_in):
+            if results[i] is None:
+                first = results[first_index[order_in.idempotency_key]]
+                results[i] = (
+                    {**first, "status": "idempotent"}
+                    if first["status"] != "failed"
+                    else dict(first)
+                )
+
+        logger.info(
+            "order_batch_completed",
+            submitted=len(orders_in),
+            created=sum(r["status"] == "created" for r in results),
+            failed=sum(r["status"] == "failed" for r in results),
+        )
+        return results
+
+    async def _create_store_batch(
+        self,
+        db: AsyncSession,
+        store_id: int,
+        orders_in: List[OrderCreate],
+        prices: Dict[int, float],
+        expiry_time: datetime,
+    ) -> List[dict]:
+        start_time = time.time()
+
+        carts = []
+        for order_in in orders_in:
+            cart: Dict[int, int] = {}
+            for item in order_in.items:
+                cart[item.product_id] = cart.get(item.product_id, 0) + item.quantity
+            carts.append(cart)
+
+        errors = await inventory_service.reserve_for_carts(db, store_id, carts)
+        accepted = [o for o, error in zip(orders_in, errors) if error is None]
+        latency = round((time.time() - start_time) * 1000, 2)
+
+        order_ids: Dict[str, int] = {}
+        if accepted:
+            result = await db.execute(
+                insert(Order).returning(Order.id, Order.idempotency_key),
+                [
+                    {
+                        "user_id": o.user_id,
+                        "store_id": store_id,
+                        "status": OrderStatus.PENDING,
+                        "total_amount": sum(
+                            prices[item.product_id] * item.quantity for item in o.items
+                        ),
+                        "idempotency_key": o.idempotency_key,
+                        "checkout_latency_ms": latency,
+                    }
+                    for o in accepted
+                ],
+            )
+            order_ids = {key: order_id for order_id, key in result.all()}
+
+            await db.execute(
+                insert(OrderItem),
+                [
+                    {
+                        "order_id": order_ids[o.idempotency_key],
+                        "product_id": item.product_id,
+                        "quantity": item.quantity,
+                        "price_at_order": prices[item.product_id],
+                        "reservation_expires_at": expiry_time,
+                    }
+                    for o in accepted
+                    for item in o.items
+                ],
+            )
+            await db.execute(
+                insert(OrderStatusHistory),
+                [
+                    {
+                        "order_id": order_ids[o.idempotency_key],
+                        "status": OrderStatus.PENDING,
+                        "timestamp": datetime.utcnow(),
+                        "notes": "Order created",
+                    }
+                    for o in accepted
+                ],
+            )
+
+        failures = [(o, error) for o, error in zip(orders_in, errors) if error]
+        refs = await self._record_failed_batch(db, failures) if failures else {}
+
+        outcomes = []
+        for order_in, error in zip(orders_in, errors):
+            if error is None:
+                outcomes.append(
+                    {
+                        "idempotency_key": order_in.idempotency_key,
+                        "status": "created",
+                        "order_id": order_ids[order_in.idempotency_key],
+                    }
+                )
+            else:
+                outcomes.append(self._failed_result(order_in, error, refs))
+        return outcomes
+
+    async def _create_store_orders_one_by_one(
+        self,
+        db: AsyncSession,
+        store_id: int,
+        orders_in: List[OrderCreate],
+        prices: Dict[int, float],
+        expiry_time: datetime,
+    ) -> List[dict]:
+        """
+        Fallback for a store group whose bulk transaction failed: retry each
+        order in its own transaction so only the offending orders end up in
+        the DLQ. An order whose idempotency key was committed concurrently is
+        answered as idempotent instead.
+        """
+        outcomes: List[Optional[dict]] = []
+        failures: List[Tuple[OrderCreate, str]] = []
+        for order_in in orders_in:
+            try:
+                outcome = await self._create_store_batch(
+                    db, store_id, [order_in], prices, expiry_time
+                )
+                await db.commit()
+                outcomes.append(outcome[0])
+            except Exception as e:
+                await db.rollback()
+                failures.append((order_in, str(e)))
+                outcomes.append(None)
+
+        if failures:
+            existing = await order_repo.get_ids_by_idempotency_keys(
+                db, idempotency_keys=[o.idempotency_key for o, _ in failures]
+            )
+            failures = [f for f in failures if f[0].idempotency_key not in existing]
+            refs = await self._record_failed_batch(db, failures) if failures else {}
+            await db.commit()
+            errors = {o.idempotency_key: error for o, error in failures}
+            for n, order_in in enumerate(orders_in):
+                if outcomes[n] is not None:
+                    continue
+                key = order_in.idempotency_key
+                if key in existing:
+                    outcomes[n] = {
+                        "idempotency_key": key,
+                        "status": "idempotent",
+                        "order_id": existing[key],
+                    }
+                else:
+                    outcomes[n] = self._failed_result(order_in, errors[key], refs)
+        return outcomes
+
+    async def _record_failed_batch(
+        self, db: AsyncSession, failures: List[Tuple[OrderCreate, str]]
+    ) -> Dict[str, int]:
+        """Bulk-insert DLQ rows, returning idempotency_key -> FailedOrder id."""
+        now = datetime.utcnow()
+        result = await db.execute(
+            insert(FailedOrder).returning(FailedOrder.id, FailedOrder.idempotency_key),
+            [failed_order_row(order_in, error, now) for order_in, error in failures],
+        )
+        return {key: failed_id for failed_id, key in result.all()}
+
+    def _failed_result(
+        self, order_in: OrderCreate, error: str, refs: Dict[str, int]
+    ) -> dict:
+        return {
+            "idempotency_key": order_in.idempotency_key,
+            "status": "failed",
+            "failed_order_id": refs.get(order_in.idempotency_key),
+            "error": error,
+        }
+
     async def get_orders(
         self,
         db: AsyncSession,
@@ -124,7 +521,10 @@ class OrderService:
         user_id: Optional[int] = None,
         store_id: Optional[int] = None,
         status: Optional[OrderStatus] = None,
-    ) -> Tuple[List[Order], int]:
+        cursor: Optional[str] = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+        summary: bool = False,
+    ) -> Tuple[List[Order], Optional[int], Optional[str]]:
         return await order_repo.get_multi_with_filters(
             db,
             skip=skip,
@@ -132,57 +532,77 @@ class OrderService:
             user_id=user_id,
             store_id=store_id,
             status=status,
+            cursor=cursor,
+            count_strategy=count_strategy,
+            summary=summary,
         )
 
     async def get_order(self, db: AsyncSession, order_id: int) -> Optional[Order]:
         return await order_repo.get(db, id=order_id)
 
     async def get_store_load(self, db: AsyncSession, store_id: int) -> dict:
-        return await order_repo.get_store_load_metrics(db, store_id=store_id)
+        metrics = store_load_tracker.get(store_id)
+        if metrics is not None:
+            return metrics
 
-    async def replay_failed_order(
-        self, db: AsyncSession, failed_order_id: int
-    ) -> Order:
+        since = load_window_start()
+        pending, active, created_per_minute = await order_repo.get_store_load_counts(
+            db, store_id=store_id, since=since
+        )
+        return store_load_tracker.seed(store_id, pending, active, created_per_minute)
+
+    async def get_stores_load(
+        self, db: AsyncSession, store_ids: Optional[List[int]] = None
+    ) -> List[dict]:
         """
-        Retry a failed order from the DLQ.
+        Load metrics for many stores (all active stores when store_ids is
+        None) from one grouped query. The result is cached briefly and
+        concurrent callers asking for the same stores share one computation.
         """
-        failed_order = await db.get(FailedOrder, failed_order_id)
-        if not failed_order:
-            raise HTTPException(status_code=404, detail="Failed order not found")
+        key = tuple(sorted(set(store_ids))) if store_ids else None
+        cached = self._stores_load.get(key)
+        if cached is not None:
+            return cached
 
-        # Parse payload back to OrderCreate
-        order_data = json.loads(failed_order.payload)
-        order_in = OrderCreate(**order_data)
-
-        # Attempt to create order again
-        try:
-            # We bypass the idempotency check internal to create_order by calling logic directly
-            # or just call create_order and handle the idempotency hit if it somehow exists
-            # But here we want a fresh attempt.
-            new_order = await self.create_order(db, order_in=order_in)
-
-            # If successful, mark failed order as resolved
-            failed_order.status = "resolved"
-            failed_order.retry_count += 1
-            await db.commit()
-            return new_order
-        except Exception as e:
-            failed_order.retry_count += 1
-            failed_order.error_message = f"Retry failed: {str(e)}"
-            await db.commit()
-            raise HTTPException(
-                status_code=500, detail=f"Replay failed again: {str(e)}"
+        async def compute() -> List[dict]:
+            ids = list(key) if key else await store_repo.get_active_ids(db)
+            since = load_window_start()
+            counts = await order_repo.get_load_counts_by_store(
+                db, since=since, store_ids=ids
             )
+            metrics = [
+                compute_load_metrics(store_id, *counts.get(store_id, (0, 0, 0)))
+                for store_id in ids
+            ]
+            self._stores_load.set(key, metrics)
+            return metrics
+
+        return await self._stores_load_flight.do(key, compute)
 
     async def list_failed_orders(
-        self, db: AsyncSession, skip: int = 0, limit: int = 20
-    ) -> Tuple[List[FailedOrder], int]:
-        query = select(FailedOrder).offset(skip).limit(limit)
-        count_query = select(func.count()).select_from(FailedOrder)
-
-        result = await db.execute(query)
-        total = (await db.execute(count_query)).scalar_one()
-        return list(result.scalars().all()), total
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[FailedOrder], Optional[int], Optional[str]]:
+        """Newest DLQ entries first; keyset on id when a cursor is given."""
+        query = select(FailedOrder).order_by(FailedOrder.id.desc())
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.filter(FailedOrder.id < last_id)
+        else:
+            query = query.offset(skip)
+
+        result = await db.execute(query.limit(limit + 1))
+        total = await failed_order_repo.count(
+            db, select(FailedOrder.id), count_strategy
+        )
+        items, next_cursor = keyset_page(
+            list(result.scalars().all()), limit, key=lambda f: (f.id,)
+        )
+        return items, total, next_cursor
 
 
 order_service = OrderService()
@@ -0,0 +1,205 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from app.core.logging import logger
+from app.models.order import (
+    Order,
+    OrderItem,
+    OrderStatus,
+    OrderStatusHistory,
+    ReservationStatus,
+)
+from app.repositories.order_repo import order_repo
+from app.services.inventory_service import inventory_service
+from app.services.reservation_scheduler import reservation_scheduler
+from app.services.store_load import store_load_tracker
+
+# Allowed moves of the order state machine. Once packed, stock has left the
+# shelf, so an order can no longer be cancelled.
+ALLOWED_TRANSITIONS: Dict[OrderStatus, Tuple[OrderStatus, ...]] = {
+    OrderStatus.PENDING: (OrderStatus.CONFIRMED, OrderStatus.CANCELLED),
+    OrderStatus.CONFIRMED: (OrderStatus.PACKING, OrderStatus.CANCELLED),
+    OrderStatus.PACKING: (OrderStatus.SHIPPED,),
+    OrderStatus.SHIPPED: (OrderStatus.DELIVERED,),
+    OrderStatus.DELIVERED: (),
+    OrderStatus.CANCELLED: (),
+}
+
+# Targets that need every reservation of the order to still be active
+NEEDS_ACTIVE_RESERVATIONS = (OrderStatus.CONFIRMED, OrderStatus.PACKING)
+
+
+class OrderTransitionService:
+    """
+    Moves orders through OrderStatus and applies the stock side effects:
+
+    - CONFIRMED: reservations stop expiring (reservation_expires_at cleared)
+    - PACKING: reservations are consumed; quantity and reserved_quantity
+      both drop and the items become CONSUMED
+    - CANCELLED: active reservations are released back to available stock
+
+    A bulk call runs in one transaction with set-based statements: one lock
+    on the orders, one read of their items, one UPDATE per affected table and
+    one INSERT for the timeline rows.
+    """
+
+    async def transition_many(
+        self,
+        db: AsyncSession,
+        *,
+        order_ids: List[int],
+        status: OrderStatus,
+        notes: Optional[str] = None,
+    ) -> List[dict]:
+        """
+        Move every order to `status`. Orders that are missing, not allowed to
+        make the move or whose reservation expired are rejected and left
+        untouched; the rest are applied together. Returns one result per id,
+        in request order.
+        """
+        orders = {
+            row.id: row
+            for row in await order_repo.lock_for_transition(db, order_ids=order_ids)
+        }
+        lines: Dict[int, List] = defaultdict(list)
+        for line in await order_repo.get_item_lines(db, order_ids=orders.keys()):
+            lines[line.order_id].append(line)
+
+        results: Dict[int, dict] = {}
+        accepted: List = []
+        for order_id in dict.fromkeys(order_ids):
+            order = orders.get(order_id)
+            error = None
+            if order is None:
+                error = "Order not found"
+            elif status not in ALLOWED_TRANSITIONS[order.status]:
+                error = f"Cannot move order from {order.status.value} to {status.value}"
+            elif status in NEEDS_ACTIVE_RESERVATIONS and any(
+                line.reservation_status != ReservationStatus.ACTIVE
+                for line in lines[order_id]
+            ):
+                error = "Reservation is no longer active"
+
+            if error:
+                results[order_id] = {
+                    "order_id": order_id,
+                    "status": "rejected",
+                    "from_status": order.status if order else None,
+                    "to_status": status,
+                    "error": error,
+                }
+            else:
+                accepted.append(order)
+                results[order_id] = {
+                    "order_id": order_id,
+                    "status": "transitioned",
+                    "from_status": order.status,
+                    "to_status": status,
+                }
+
+        if accepted:
+            await self._apply(db, accepted, lines, status, notes)
+        await db.commit()
+
+        for order in accepted:
+            store_load_tracker.record_transition(order.store_id, order.status, status)
+        if status != OrderStatus.PENDING:
+            reservation_scheduler.discard(order.id for order in accepted)
+        logger.info(
+            "orders_transitioned",
+            to_status=status.value,
+            transitioned=len(accepted),
+            rejected=len(results) - len(accepted),
+        )
+        return [results[order_id] for order_id in dict.fromkeys(order_ids)]
+
+    async def transition(
+        self,
+        db: AsyncSession,
+        *,
+        order_id: int,
+        status: OrderStatus,
+        notes: Optional[str] = None,
+    ) -> Order:
+        (result,) = await self.transition_many(
+            db, order_ids=[order_id], status=status, notes=notes
+        )
+        if result["status"] == "rejected":
+            code = 404 if result["from_status"] is None else 409
+            raise HTTPException(status_code=code, detail=result["error"])
+        return await order_repo.get(db, id=order_id)
+
+    async def _apply(
+        self,
+        db: AsyncSession,
+        orders: List,
+        lines: Dict[int, List],
+        status: OrderStatus,
+        notes: Optional[str],
+    ) -> None:
+        order_ids = [order.id for order in orders]
+        active_only = (
+            OrderItem.order_id.in_(order_ids),
+            OrderItem.reservation_status == ReservationStatus.ACTIVE,
+        )
+
+        if status in (OrderStatus.PACKING, OrderStatus.CANCELLED):
+            # PACKING consumes (quantity and reserved drop), CANCELLED releases
+            # (only reserved drops); both touch active reservations only.
+            consume = status == OrderStatus.PACKING
+            deltas: Dict[Tuple[int, int], Tuple[int, int]] = {}
+            for order in orders:
+                for line in lines[order.id]:
+                    if line.reservation_status != ReservationStatus.ACTIVE:
+                        continue
+                    key = (order.store_id, line.product_id)
+                    qty, reserved = deltas.get(key, (0, 0))
+                    deltas[key] = (
+                        qty - line.quantity if consume else qty,
+                        reserved - line.quantity,
+                    )
+
+            await inventory_service.apply_stock_deltas(db, deltas)
+            await db.execute(
+                update(OrderItem)
+                .where(*active_only)
+                .values(
+                    reservation_status=(
+                        ReservationStatus.CONSUMED
+                        if consume
+                        else ReservationStatus.RELEASED
+                    )
+                ),
+                execution_options={"synchronize_session": False},
+            )
+        elif status == OrderStatus.CONFIRMED:
+            await db.execute(
+                update(OrderItem)
+                .where(*active_only)
+                .values(reservation_expires_at=None),
+                execution_options={"synchronize_session": False},
+            )
+
+        await db.execute(
+            update(Order).where(Order.id.in_(order_ids)).values(status=status),
+            execution_options={"synchronize_session": False},
+        )
+        now = datetime.utcnow()
+        await db.execute(
+            insert(OrderStatusHistory),
+            [
+                {
+                    "order_id": order_id,
+                    "status": status,
+                    "timestamp": now,
+                    "notes": notes,
+                }
+                for order_id in order_ids
+            ],
+        )
+
+
+order_transition_service = OrderTransitionService()
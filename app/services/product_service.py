@@ -1,5 +1,6 @@
 from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.repository import CountStrategy
 from app.repositories.product_repo import product_repo
 from app.models.product import Product
 
@@ -16,7 +17,8 @@ class ProductService:
         category_id: Optional[int] = None,
         sort_by: Optional[str] = "id",
         sort_desc: bool = False,
-    ) -> Tuple[List[Product], int]:
+        count_strategy: CountStrategy = CountStrategy.EXACT,
+    ) -> Tuple[List[Product], Optional[int]]:
         return await product_repo.get_multi_with_filters(
             db,
             skip=skip,
@@ -26,6 +28,7 @@ class ProductService:
             category_id=category_id,
             sort_by=sort_by,
             sort_desc=sort_desc,
+            count_strategy=count_strategy,
         )
 
     async def get_product(self, db: AsyncSession, product_id: int) -> Optional[Product]:
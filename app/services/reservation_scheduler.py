@@ -0,0 +1,148 @@
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.repositories.order_repo import order_repo
+from app.services.reservation_service import reservation_service
+
+# Delay before retrying orders whose items were locked during a release
+RETRY_DELAY = timedelta(seconds=1)
+
+
+class ReservationExpiryScheduler:
+    """
+    Min-heap of (reservation expiry, order id) that releases stock when a
+    reservation runs out instead of waiting for the next sweep.
+
+    Orders are scheduled by the checkout paths after commit. Orders from
+    elsewhere (another process, before a restart) are loaded from the
+    database at start and refilled by every sweep, but only those expiring
+    within two sweep intervals, so the heap stays bounded by the upcoming
+    expiries. Orders that leave the reservation window (confirmed, packed,
+    cancelled) are dropped lazily. Releases go through the same guarded
+    statement as the sweep, so an entry for an order that was already
+    handled elsewhere is a no-op; orders whose items were skipped because
+    someone else held their lock are pushed back and retried.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Set[int] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RESERVATION_SCHEDULER_ENABLED
+
+    def schedule(self, order_ids: Iterable[int], expires_at: datetime) -> None:
+        if not self.enabled:
+            return
+        head = self._heap[0][0] if self._heap else None
+        for order_id in order_ids:
+            if order_id not in self._scheduled:
+                self._scheduled.add(order_id)
+                heapq.heappush(self._heap, (expires_at, order_id))
+        if self._wakeup is not None and (head is None or expires_at < head):
+            self._wakeup.set()
+
+    def discard(self, order_ids: Iterable[int]) -> None:
+        """Forget orders whose reservations no longer expire."""
+        self._scheduled.difference_update(order_ids)
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def lag_seconds(self) -> float:
+        """How far past its expiry the next entry in the heap is."""
+        while self._heap and self._heap[0][1] not in self._scheduled:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return 0.0
+        return max(0.0, (datetime.utcnow() - self._heap[0][0]).total_seconds())
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        await self.refill()
+        logger.info("reservation_scheduler_started", scheduled=len(self))
+
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = self._pop_due(settings.RESERVATION_SCHEDULER_BATCH_SIZE)
+            if not due:
+                continue
+            try:
+                await self._release(due)
+            except Exception as e:
+                # Left for the safety-net sweep
+                logger.error("reservation_scheduler_failed", error=str(e))
+                await asyncio.sleep(1)
+
+    async def refill(self) -> None:
+        """Schedule orders expiring within the horizon that are not in the heap yet."""
+        horizon = timedelta(seconds=2 * settings.RESERVATION_SWEEP_INTERVAL_SECONDS)
+        async with async_session_factory() as db:
+            expiries = await order_repo.get_reservation_expiries(
+                db, until=datetime.utcnow() + horizon
+            )
+        head = self._heap[0][0] if self._heap else None
+        for order_id, expires_at in expiries:
+            if order_id not in self._scheduled:
+                self._scheduled.add(order_id)
+                self._heap.append((expires_at, order_id))
+        heapq.heapify(self._heap)
+        if self._wakeup is not None and self._heap and self._heap[0][0] != head:
+            self._wakeup.set()
+
+    def _pop_due(self, limit: int) -> List[int]:
+        now = datetime.utcnow()
+        due: List[int] = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            _, order_id = heapq.heappop(self._heap)
+            if order_id in self._scheduled:
+                self._scheduled.discard(order_id)
+                due.append(order_id)
+        return due
+
+    async def _release(self, order_ids: List[int]) -> None:
+        now = datetime.utcnow()
+        chunk_size = settings.RESERVATION_RELEASE_CHUNK_SIZE
+        released = units = 0
+        async with async_session_factory() as db:
+            while True:
+                chunk = await reservation_service.release_expired(
+                    db, now=now, limit=chunk_size, order_ids=order_ids
+                )
+                released += chunk["items"]
+                units += chunk["units"]
+                if chunk["items"] < chunk_size:
+                    break
+            # Items skipped because someone else held their lock
+            leftover = await order_repo.get_reservation_expiries(
+                db, until=now, order_ids=order_ids
+            )
+        if leftover:
+            self.schedule([order_id for order_id, _ in leftover], now + RETRY_DELAY)
+        if released:
+            logger.info(
+                "reservations_expired",
+                orders=len(order_ids),
+                items=released,
+                units=units,
+            )
+
+
+reservation_scheduler = ReservationExpiryScheduler()
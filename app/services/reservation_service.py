@@ -0,0 +1,86 @@
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.repositories.order_repo import order_repo
+from app.services.inventory_service import inventory_service
+
+
+class ReservationService:
+    """
+    Releases expired stock reservations.
+
+    Work is done in chunks of RESERVATION_RELEASE_CHUNK_SIZE items, one
+    transaction each: the chunk's items are flipped to RELEASED in one
+    statement, their quantities are summed per (store, product) in the same
+    statement and given back to inventory with one UPDATE.
+    """
+
+    def __init__(self):
+        # How long past expiry the oldest reservation of the last sweep was
+        self.sweep_lag_seconds = 0.0
+
+    async def release_expired(
+        self,
+        db: AsyncSession,
+        *,
+        now: datetime,
+        limit: int,
+        order_ids: Optional[Iterable[int]] = None,
+    ) -> dict:
+        """
+        Release one chunk of expired reservations and commit. Returns the
+        items and units released, the inventory rows touched and the
+        earliest expiry among them.
+        """
+        items, units, oldest = await order_repo.release_expired_items(
+            db, now=now, limit=limit, order_ids=order_ids
+        )
+        await inventory_service.apply_stock_deltas(
+            db, {key: (0, -quantity) for key, quantity in units.items()}
+        )
+        await db.commit()
+        return {
+            "items": items,
+            "units": sum(units.values()),
+            "inventory_rows": len(units),
+            "oldest_expiry": oldest,
+        }
+
+    async def sweep_expired(self) -> dict:
+        """
+        Release every reservation that has expired by now, chunk by chunk,
+        and log one summary for the sweep.
+        """
+        started = time.monotonic()
+        now = datetime.utcnow()
+        chunk_size = settings.RESERVATION_RELEASE_CHUNK_SIZE
+        summary = {"items": 0, "units": 0, "inventory_rows": 0, "chunks": 0}
+        oldest = None
+
+        async with async_session_factory() as db:
+            while True:
+                chunk = await self.release_expired(db, now=now, limit=chunk_size)
+                if not chunk["items"]:
+                    break
+                for key in ("items", "units", "inventory_rows"):
+                    summary[key] += chunk[key]
+                summary["chunks"] += 1
+                if oldest is None or chunk["oldest_expiry"] < oldest:
+                    oldest = chunk["oldest_expiry"]
+                if chunk["items"] < chunk_size:
+                    break
+
+        self.sweep_lag_seconds = (
+            round((now - oldest).total_seconds(), 1) if oldest else 0.0
+        )
+        summary["lag_seconds"] = self.sweep_lag_seconds
+        summary["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+        logger.info("reservation_sweep_completed", **summary)
+        return summary
+
+
+reservation_service = ReservationService()
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from typing import Tuple
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.models.inventory import SnapshotResolution
+from app.repositories.inventory_repo import inventory_repo, truncate_to_bucket
+
+
+class SnapshotCompaction:
+    """
+    Keeps inventory_snapshots bounded by downsampling history in tiers:
+    raw rows older than SNAPSHOT_RAW_RETENTION_HOURS become minute buckets,
+    minute buckets older than SNAPSHOT_MINUTE_RETENTION_DAYS become hour
+    buckets. Each bucket keeps min / max / last of quantity and reserved
+    quantity plus the number of snapshots folded into it.
+
+    Rows are moved SNAPSHOT_COMPACTION_BATCH_SIZE at a time, oldest first,
+    one transaction per batch; a bucket split across batches or runs is
+    merged into the existing rollup row.
+    """
+
+    async def run(self) -> int:
+        """Compact both tiers; returns the number of rows moved."""
+        now = datetime.utcnow()
+        raw, minute_buckets = await self._compact(
+            SnapshotResolution.RAW,
+            SnapshotResolution.MINUTE,
+            now - timedelta(hours=settings.SNAPSHOT_RAW_RETENTION_HOURS),
+        )
+        minute, hour_buckets = await self._compact(
+            SnapshotResolution.MINUTE,
+            SnapshotResolution.HOUR,
+            now - timedelta(days=settings.SNAPSHOT_MINUTE_RETENTION_DAYS),
+        )
+        logger.info(
+            "snapshot_compaction_completed",
+            raw_rows=raw,
+            minute_buckets=minute_buckets,
+            minute_rows=minute,
+            hour_buckets=hour_buckets,
+        )
+        return raw + minute
+
+    async def _compact(
+        self,
+        source: SnapshotResolution,
+        target: SnapshotResolution,
+        cutoff: datetime,
+    ) -> Tuple[int, int]:
+        # Only whole target buckets, so a bucket is not left half in each tier
+        cutoff = truncate_to_bucket(cutoff, target)
+        batch = settings.SNAPSHOT_COMPACTION_BATCH_SIZE
+        moved_total = buckets_total = 0
+        async with async_session_factory() as db:
+            while True:
+                moved, buckets = await inventory_repo.compact_snapshots(
+                    db, source=source, target=target, cutoff=cutoff, limit=batch
+                )
+                await db.commit()
+                moved_total += moved
+                buckets_total += buckets
+                if moved < batch:
+                    return moved_total, buckets_total
+
+
+snapshot_compaction = SnapshotCompaction()
@@ -0,0 +1,166 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.logging import logger
+from app.db.session import async_session_factory
+from app.models.inventory import InventorySnapshot
+
+_STAGED = "staged_snapshots"
+
+
+class SnapshotPolicy:
+    """
+    Deterministic sampling for one snapshot reason: a change is captured when
+    it is the `every_n`-th change of the row since its last capture and at
+    least `min_interval_seconds` have passed since then. Changes that move
+    available stock across one of SNAPSHOT_THRESHOLDS are always captured.
+    """
+
+    def __init__(self, every_n: int = 1, min_interval_seconds: float = 0.0):
+        self.every_n = max(int(every_n), 1)
+        self.min_interval_seconds = float(min_interval_seconds)
+
+
+def crosses_threshold(before: Optional[int], after: int) -> bool:
+    if before is None:
+        return False
+    return any((before > t) != (after > t) for t in settings.SNAPSHOT_THRESHOLDS)
+
+
+class SnapshotWriter:
+    """
+    Captures inventory snapshots off the checkout path.
+
+    Reservation code stages changes on the session with `stage`; they are
+    handed to the writer only once that transaction commits (a rollback drops
+    them), so snapshots never add rows or time inside the stock lock window.
+    Sampling is decided per (row, reason) by the reason's SnapshotPolicy.
+    Captured changes are coalesced per inventory row, except threshold
+    crossings which are kept as-is, and a background task bulk-inserts them
+    every SNAPSHOT_FLUSH_INTERVAL_MS. Inventory.last_snapshot_at stays with
+    the reservation itself, which already holds the row.
+
+    Sampling state is per process, so with several workers every process
+    samples its own share of the changes.
+    """
+
+    def __init__(self):
+        # (inventory_id, reason) -> (changes since last capture, last capture time)
+        self._sampling: Dict[Tuple[int, str], Tuple[int, Optional[datetime]]] = {}
+        # Coalesced captures, latest state per inventory row
+        self._pending: Dict[int, dict] = {}
+        # Threshold crossings, never coalesced
+        self._crossings: List[dict] = []
+
+    def policy(self, reason: str) -> Optional[SnapshotPolicy]:
+        """Sampling policy for `reason`; None means every change is captured."""
+        params = settings.SNAPSHOT_POLICIES.get(reason)
+        return SnapshotPolicy(**params) if params is not None else None
+
+    def stage(
+        self,
+        db: AsyncSession,
+        inventory_id: int,
+        *,
+        quantity: int,
+        reserved_quantity: int,
+        reason: str,
+        previous_available: Optional[int] = None,
+    ) -> None:
+        """Record a change made in `db`'s transaction, to be sampled on commit."""
+        db.info.setdefault(_STAGED, []).append(
+            (inventory_id, quantity, reserved_quantity, reason, previous_available)
+        )
+
+    def record(
+        self,
+        inventory_id: int,
+        *,
+        quantity: int,
+        reserved_quantity: int,
+        reason: str,
+        previous_available: Optional[int] = None,
+    ) -> bool:
+        """Sample a committed change; returns True if it will be written."""
+        now = datetime.utcnow()
+        row = {
+            "inventory_id": inventory_id,
+            "quantity": quantity,
+            "reserved_quantity": reserved_quantity,
+            "timestamp": now,
+            "reason": reason,
+        }
+        if crosses_threshold(previous_available, quantity - reserved_quantity):
+            self._sampling.pop((inventory_id, reason), None)
+            self._crossings.append(row)
+            return True
+
+        policy = self.policy(reason)
+        if policy is not None:
+            key = (inventory_id, reason)
+            changes, last_at = self._sampling.get(key, (0, None))
+            changes += 1
+            if changes < policy.every_n or (
+                last_at is not None
+                and (now - last_at).total_seconds() < policy.min_interval_seconds
+            ):
+                self._sampling[key] = (changes, last_at)
+                return False
+            self._sampling[key] = (0, now)
+
+        self._pending[inventory_id] = row
+        return True
+
+    def _committed(self, session: Session) -> None:
+        for inventory_id, quantity, reserved, reason, previous in session.info.pop(
+            _STAGED, ()
+        ):
+            self.record(
+                inventory_id,
+                quantity=quantity,
+                reserved_quantity=reserved,
+                reason=reason,
+                previous_available=previous,
+            )
+
+    def _rolled_back(self, session: Session) -> None:
+        session.info.pop(_STAGED, None)
+
+    def _take(self) -> List[dict]:
+        rows = self._crossings + list(self._pending.values())
+        self._crossings = []
+        self._pending = {}
+        return rows
+
+    async def _write(self, rows: List[dict]) -> None:
+        try:
+            async with async_session_factory() as db:
+                await db.execute(insert(InventorySnapshot), rows)
+                await db.commit()
+        except Exception as e:
+            # Sampled history only: drop the batch rather than back up checkouts
+            logger.error("snapshot_batch_write_failed", error=str(e), rows=len(rows))
+
+    async def run(self) -> None:
+        """Write captured snapshots every SNAPSHOT_FLUSH_INTERVAL_MS until cancelled."""
+        while True:
+            await asyncio.sleep(settings.SNAPSHOT_FLUSH_INTERVAL_MS / 1000)
+            rows = self._take()
+            if rows:
+                await self._write(rows)
+
+    async def flush(self) -> None:
+        """Write whatever is still buffered once the flusher has stopped."""
+        rows = self._take()
+        if rows:
+            await self._write(rows)
+
+
+snapshot_writer = SnapshotWriter()
+
+event.listen(Session, "after_commit", snapshot_writer._committed)
+event.listen(Session, "after_rollback", snapshot_writer._rolled_back)
@@ -0,0 +1,136 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from app.core.config import settings
+from app.models.order import OrderStatus
+
+# Velocity window: orders created over the last N minutes
+LOAD_WINDOW_MINUTES = 15
+
+ACTIVE_STATUSES = (OrderStatus.CONFIRMED, OrderStatus.PACKING)
+
+
+def compute_load_metrics(store_id: int, pending: int, active: int, recent: int) -> dict:
+    # Heuristic: base load + (velocity * constant)
+    base_load = pending + (active * 1.5)
+    smoothing_velocity = recent / float(LOAD_WINDOW_MINUTES)  # orders per minute
+
+    return {
+        "store_id": store_id,
+        "pending_orders_count": pending,
+        "active_orders_count": active,
+        "recent_velocity_per_min": round(smoothing_velocity, 2),
+        "total_load_score": float(base_load + (smoothing_velocity * 5)),
+    }
+
+
+def load_window_start() -> datetime:
+    """
+    Naive UTC start of the velocity window: the first minute of the current
+    minute plus the LOAD_WINDOW_MINUTES - 1 before it, so database counts
+    bucket into exactly the minutes the tracker keeps.
+    """
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    return now - timedelta(minutes=LOAD_WINDOW_MINUTES - 1)
+
+
+def _minute(moment: datetime) -> int:
+    """Epoch minute of a naive UTC datetime."""
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() // 60)
+
+
+class _StoreLoad:
+    __slots__ = ("pending", "active", "minutes", "synced_at")
+
+    def __init__(self, pending: int, active: int, minutes: Dict[int, int]):
+        self.pending = pending
+        self.active = active
+        self.minutes = minutes  # epoch minute -> orders created
+        self.synced_at = time.monotonic()
+
+
+class StoreLoadTracker:
+    """
+    In-process store load counters.
+
+    Each store is seeded from the database, then kept current by the order
+    creation and status-change paths of this process. Orders written by
+    other processes are only picked up when the entry is re-seeded, so an
+    entry older than STORE_LOAD_MAX_STALENESS_SECONDS is not served. A bound
+    of 0 disables the tracker and every read goes to the database.
+    """
+
+    def __init__(self):
+        self._stores: Dict[int, _StoreLoad] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.STORE_LOAD_MAX_STALENESS_SECONDS > 0
+
+    def get(self, store_id: int) -> Optional[dict]:
+        entry = self._stores.get(store_id)
+        if entry is None or (
+            time.monotonic() - entry.synced_at
+            > settings.STORE_LOAD_MAX_STALENESS_SECONDS
+        ):
+            return None
+        return self._metrics(store_id, entry)
+
+    def seed(
+        self,
+        store_id: int,
+        pending: int,
+        active: int,
+        created_per_minute: Dict[datetime, int],
+    ) -> dict:
+        """Install fresh database counts for a store and return its metrics."""
+        entry = _StoreLoad(
+            pending,
+            active,
+            {_minute(m): count for m, count in created_per_minute.items()},
+        )
+        if self.enabled:
+            self._stores[store_id] = entry
+        return self._metrics(store_id, entry)
+
+    def record_created(self, store_id: int, count: int = 1) -> None:
+        entry = self._stores.get(store_id)
+        if entry is None:
+            return
+        minute = int(time.time() // 60)
+        entry.pending += count
+        entry.minutes[minute] = entry.minutes.get(minute, 0) + count
+
+    def record_transition(
+        self,
+        store_id: int,
+        old_status: OrderStatus,
+        new_status: OrderStatus,
+        count: int = 1,
+    ) -> None:
+        entry = self._stores.get(store_id)
+        if entry is None:
+            return
+        for status, delta in ((old_status, -count), (new_status, count)):
+            if status == OrderStatus.PENDING:
+                entry.pending = max(0, entry.pending + delta)
+            elif status in ACTIVE_STATUSES:
+                entry.active = max(0, entry.active + delta)
+
+    def invalidate(self, store_id: Optional[int] = None) -> None:
+        if store_id is None:
+            self._stores.clear()
+        else:
+            self._stores.pop(store_id, None)
+
+    def _metrics(self, store_id: int, entry: _StoreLoad) -> dict:
+        # The current minute plus the LOAD_WINDOW_MINUTES - 1 before it
+        first = int(time.time() // 60) - LOAD_WINDOW_MINUTES + 1
+        for minute in [m for m in entry.minutes if m < first]:
+            del entry.minutes[minute]
+        return compute_load_metrics(
+            store_id, entry.pending, entry.active, sum(entry.minutes.values())
+        )
+
+
+store_load_tracker = StoreLoadTracker()
@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+import time
+import uuid
+import random
+
+BASE_URL = "http://localhost:8001/api/v1"
+TOTAL_ORDERS = 500
+BATCH_SIZE = 100
+CONCURRENT_REQUESTS = 20
+STORE_ID = 1
+PRODUCT_ID = 1
+ITEMS_PER_ORDER = 1
+
+
+def build_order() -> dict:
+    return {
+        "user_id": random.randint(1, 100),
+        "store_id": STORE_ID,
+        "items": [{"product_id": PRODUCT_ID, "quantity": ITEMS_PER_ORDER}],
+        "idempotency_key": str(uuid.uuid4()),
+    }
+
+
+async def run_single_path(client: httpx.AsyncClient) -> dict:
+    """POST /orders/ once per order, CONCURRENT_REQUESTS at a time."""
+    semaphore = asyncio.Semaphore(CONCURRENT_REQUESTS)
+
+    async def place(order: dict) -> bool:
+        async with semaphore:
+            res = await client.post(f"{BASE_URL}/orders/", json=order, timeout=30.0)
+            return res.status_code == 200
+
+    orders = [build_order() for _ in range(TOTAL_ORDERS)]
+    start = time.time()
+    results = await asyncio.gather(*(place(o) for o in orders))
+    elapsed = time.time() - start
+    return {"elapsed": elapsed, "created": sum(results)}
+
+
+async def run_batch_path(client: httpx.AsyncClient) -> dict:
+    """POST /orders/batch with BATCH_SIZE orders per request."""
+    orders = [build_order() for _ in range(TOTAL_ORDERS)]
+    chunks = [orders[i : i + BATCH_SIZE] for i in range(0, len(orders), BATCH_SIZE)]
+
+    start = time.time()
+    created = 0
+    for chunk in chunks:
+        res = await client.post(f"{BASE_URL}/orders/batch", json=chunk, timeout=60.0)
+        created += res.json()["created"]
+    elapsed = time.time() - start
+    return {"elapsed": elapsed, "created": created}
+
+
+async def main():
+    print(
+        f"Benchmark: {TOTAL_ORDERS} orders, single path ({CONCURRENT_REQUESTS} concurrent) "
+        f"vs batch ({BATCH_SIZE} per request)"
+    )
+    print(
+        "Make sure the store has at least "
+        f"{2 * TOTAL_ORDERS * ITEMS_PER_ORDER} units of product {PRODUCT_ID}."
+    )
+
+    async with httpx.AsyncClient() as client:
+        single = await run_single_path(client)
+        batch = await run_batch_path(client)
+
+    print("\n" + "=" * 30)
+    print("BATCH BENCHMARK RESULTS")
+    print("=" * 30)
+    for name, result in (("Single", single), ("Batch", batch)):
+        print(
+            f"{name:<8} created={result['created']:<5} "
+            f"time={result['elapsed']:.2f}s "
+            f"throughput={result['created'] / result['elapsed']:.1f} orders/s"
+        )
+    if single["elapsed"] and batch["elapsed"]:
+        print(f"Speedup: {single['elapsed'] / batch['elapsed']:.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,7 +6,7 @@ from app.db.session import engine
 from app.models.user import User
 from app.models.store import Store
 from app.models.product import Product, Category
-from app.models.inventory import Inventory, InventorySnapshot
+from app.models.inventory import Inventory, InventoryBucket, InventorySnapshot
 from app.models.order import Order, OrderItem, OrderStatusHistory, FailedOrder
 
 
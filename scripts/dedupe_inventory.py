@@ -0,0 +1,114 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from app.db.session import engine
+from app.models.inventory import Inventory
+
+# Makes ix_inventory_store_product unique on databases created before the
+# bulk inventory sync, which upserts on (store_id, product_id). Duplicate rows
+# of a store and product are merged into the one with the lowest id: buckets
+# of sharded rows are folded back into their parent first, stock and
+# reservations are summed, snapshots are moved to the kept row and rollups are
+# moved where the kept row has no bucket for the same period (the newest one
+# wins, the rest are dropped). Runs in one transaction and blocks inventory
+# writes while it runs; merged SKUs come out unsharded.
+
+
+async def dedupe_inventory():
+    async with engine.begin() as conn:
+        await conn.execute(text("LOCK TABLE inventory IN EXCLUSIVE MODE"))
+        await conn.execute(
+            text(
+                "CREATE TEMP TABLE inventory_dupes ON COMMIT DROP AS "
+                "SELECT id, keeper FROM ("
+                " SELECT id, min(id) OVER (PARTITION BY store_id, product_id) AS keeper"
+                "  FROM inventory"
+                ") rows WHERE id <> keeper"
+            )
+        )
+        duplicates = await conn.scalar(text("SELECT count(*) FROM inventory_dupes"))
+        print(f"Merging {duplicates} duplicate inventory rows...")
+
+        if duplicates:
+            affected = (
+                "SELECT id FROM inventory_dupes "
+                "UNION SELECT keeper FROM inventory_dupes"
+            )
+            # Fold buckets into their parents so the rows can be summed
+            await conn.execute(
+                text(
+                    "UPDATE inventory i SET"
+                    " quantity = i.quantity + b.quantity,"
+                    " reserved_quantity = i.reserved_quantity + b.reserved_quantity "
+                    "FROM (SELECT inventory_id, sum(quantity) AS quantity,"
+                    "      sum(reserved_quantity) AS reserved_quantity"
+                    "      FROM inventory_buckets GROUP BY inventory_id) b "
+                    "WHERE i.id = b.inventory_id AND i.bucket_count > 1"
+                    f" AND i.id IN ({affected})"
+                )
+            )
+            await conn.execute(
+                text(
+                    f"DELETE FROM inventory_buckets WHERE inventory_id IN ({affected})"
+                )
+            )
+            await conn.execute(
+                text(f"UPDATE inventory SET bucket_count = 1 WHERE id IN ({affected})")
+            )
+
+            await conn.execute(
+                text(
+                    "UPDATE inventory k SET"
+                    " quantity = k.quantity + s.quantity,"
+                    " reserved_quantity = k.reserved_quantity + s.reserved_quantity "
+                    "FROM (SELECT d.keeper, sum(i.quantity) AS quantity,"
+                    "      sum(i.reserved_quantity) AS reserved_quantity"
+                    "      FROM inventory_dupes d JOIN inventory i ON i.id = d.id"
+                    "      GROUP BY d.keeper) s "
+                    "WHERE k.id = s.keeper"
+                )
+            )
+            await conn.execute(
+                text(
+                    "UPDATE inventory_snapshots s SET inventory_id = d.keeper "
+                    "FROM inventory_dupes d WHERE s.inventory_id = d.id"
+                )
+            )
+            await conn.execute(
+                text(
+                    "UPDATE inventory_snapshot_rollups r SET inventory_id = m.keeper "
+                    "FROM (SELECT DISTINCT ON (d.keeper, x.resolution, x.bucket_start)"
+                    "      x.id, d.keeper"
+                    "      FROM inventory_snapshot_rollups x"
+                    "      JOIN inventory_dupes d ON x.inventory_id = d.id"
+                    "      ORDER BY d.keeper, x.resolution, x.bucket_start,"
+                    "      x.last_timestamp DESC) m "
+                    "WHERE r.id = m.id"
+                    " AND NOT EXISTS (SELECT 1 FROM inventory_snapshot_rollups k"
+                    "  WHERE k.inventory_id = m.keeper"
+                    "  AND k.resolution = r.resolution"
+                    "  AND k.bucket_start = r.bucket_start)"
+                )
+            )
+            await conn.execute(
+                text(
+                    "DELETE FROM inventory_snapshot_rollups "
+                    "WHERE inventory_id IN (SELECT id FROM inventory_dupes)"
+                )
+            )
+            await conn.execute(
+                text(
+                    "DELETE FROM inventory WHERE id IN (SELECT id FROM inventory_dupes)"
+                )
+            )
+
+        print("Rebuilding inventory indexes...")
+        await conn.execute(text("DROP INDEX IF EXISTS ix_inventory_store_product"))
+        for index in Inventory.__table__.indexes:
+            await conn.execute(CreateIndex(index, if_not_exists=True))
+
+    print("inventory deduplicated successfully.")
+
+
+if __name__ == "__main__":
+    asyncio.run(dedupe_inventory())
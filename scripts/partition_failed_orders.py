@@ -0,0 +1,65 @@
+import asyncio
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from app.db.session import engine
+from app.models.order import FailedOrder
+from app.repositories.failed_order_repo import add_months, failed_order_repo
+from app.services.dlq_retention import dlq_retention
+
+# Converts failed_orders to a table range-partitioned by month on created_at,
+# so DLQ retention becomes a partition drop. Runs in one transaction and holds
+# an exclusive lock on the table while the rows are copied.
+
+
+async def partition_failed_orders():
+    async with engine.begin() as conn:
+        if await failed_order_repo.is_partitioned(conn):
+            print("failed_orders is already partitioned.")
+            return
+
+        print("Converting failed_orders to monthly partitions...")
+        await conn.execute(text("LOCK TABLE failed_orders IN ACCESS EXCLUSIVE MODE"))
+        await conn.execute(
+            text("ALTER TABLE failed_orders RENAME TO failed_orders_old")
+        )
+        # The partition key has to be part of the primary key
+        await conn.execute(
+            text(
+                "CREATE TABLE failed_orders (LIKE failed_orders_old INCLUDING DEFAULTS) "
+                "PARTITION BY RANGE (created_at)"
+            )
+        )
+        await conn.execute(
+            text("ALTER TABLE failed_orders ADD PRIMARY KEY (id, created_at)")
+        )
+        await conn.execute(
+            text(
+                "CREATE TABLE failed_orders_default PARTITION OF failed_orders DEFAULT"
+            )
+        )
+
+        oldest = await conn.scalar(
+            text("SELECT min(created_at) FROM failed_orders_old")
+        )
+        month = (oldest.date() if oldest else date.today()).replace(day=1)
+        while month <= date.today().replace(day=1):
+            await failed_order_repo.create_partition(conn, month=month)
+            month = add_months(month, 1)
+
+        await conn.execute(
+            text("INSERT INTO failed_orders SELECT * FROM failed_orders_old")
+        )
+        await conn.execute(
+            text("ALTER SEQUENCE failed_orders_id_seq OWNED BY failed_orders.id")
+        )
+        await conn.execute(text("DROP TABLE failed_orders_old"))
+        for index in FailedOrder.__table__.indexes:
+            await conn.execute(CreateIndex(index))
+
+    await dlq_retention.ensure_partitions(date.today())
+    print("failed_orders partitioned successfully.")
+
+
+if __name__ == "__main__":
+    asyncio.run(partition_failed_orders())
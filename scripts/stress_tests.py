@@ -57,6 +57,9 @@ async def run_dlq_stress():
         res = await client.post(f"{BASE_URL}/orders/", json=payload)
         print(f"Order Response: {res.status_code}")
 
+        # DLQ rows are written asynchronously in small batches
+        await asyncio.sleep(1)
+
         # Verify it's in DLQ
         dlq_res = await client.get(f"{BASE_URL}/dlq/")
         dlq_data = dlq_res.json()